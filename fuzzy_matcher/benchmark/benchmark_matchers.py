@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from fuzzy_matcher.dataset_io import read_names_dataset, write_names_dataset
+from fuzzy_matcher.generator.generate_data import (
+    expand_names_dataframe,
+    noisify_dataframe,
+)
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe
+from fuzzy_matcher.pipelines.match_engine import (
+    get_candidates,
+    match_preprocessed_records,
+)
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+BENCHMARK_STRATEGIES = ["baseline", "batch", "indexed", "parallel", "matrix", "tfidf", "rerank", "fields"]
+
+
+def generate_benchmark_datasets(
+    names_df, list_limit: int, noise_sample_size: float, seed: int, target_path: str
+) -> tuple[str, str]:
+    """Given the input names, generate the seeded primary and secondary datasets of a benchmark scale, as parquet files."""
+    primary_path = f"{target_path}/primary_{list_limit}.parquet"
+    secondary_path = f"{target_path}/secondary_{list_limit}.parquet"
+    primary_df = expand_names_dataframe(names_df, list_limit=list_limit)
+    write_names_dataset(primary_df, primary_path)
+    write_names_dataset(
+        noisify_dataframe(primary_df, noise_sample_size, seed=seed), secondary_path
+    )
+    return primary_path, secondary_path
+
+
+def get_peak_rss_mb() -> float:
+    """Get the peak resident memory (MB) of the current process, plus the peak of its terminated children (e.g. pool workers)."""
+    peak_rss = sum(
+        resource.getrusage(who).ru_maxrss
+        for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]
+    )
+    # linux reports kilobytes, macOS bytes
+    return peak_rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def run_benchmark_case(
+    primary_path: str,
+    secondary_path: str,
+    strategy: str,
+    query_limit: int = None,
+    matcher_options: dict = None,
+) -> dict:
+    """Given the benchmark datasets and a matching strategy, run the matching stages and measure them.
+
+    Records the wall time of every stage, the matched queries per second, the number of candidates scored
+    and the peak resident memory of the process (meaningful when every case runs in a fresh process).
+    """
+    stages = {}
+    tic = time.perf_counter()
+    primary_df = read_names_dataset(primary_path)
+    secondary_df = read_names_dataset(secondary_path)
+    stages["read_s"] = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    candidates = get_candidates(preprocess_dataframe(primary_df))
+    preprocessed_secondary_df = preprocess_dataframe(secondary_df)
+    stages["preprocess_s"] = time.perf_counter() - tic
+
+    stats = {}
+    tic = time.perf_counter()
+    try:
+        match_preprocessed_records(
+            preprocessed_secondary_df,
+            candidates,
+            matcher=strategy,
+            sampled_run_size=query_limit,
+            matcher_options=matcher_options,
+            stats=stats,
+        )
+    except ImportError as error:
+        logging.error(f"Skipping `{strategy}` benchmark, missing dependency : {error}")
+        return {"strategy": strategy, "status": "skipped", "reason": str(error)}
+    wall_time = time.perf_counter() - tic
+    for stage in ["exact_match_s", "fuzzy_match_s", "post_processing_s"]:
+        stages[stage] = stats.get(stage, 0.0)
+
+    return {
+        "strategy": strategy,
+        "status": "ok",
+        "primary_records": primary_df.shape[0],
+        "secondary_records": secondary_df.shape[0],
+        "candidates": candidates.shape[0],
+        "fuzzy_queries": stats["fuzzy_queries"],
+        "stages": stages,
+        "wall_time_s": wall_time + stages["read_s"] + stages["preprocess_s"],
+        "queries_per_sec": stats["fuzzy_queries"] / stages["fuzzy_match_s"]
+        if stages["fuzzy_match_s"] > 0
+        else None,
+        "candidates_scored": stats.get("candidates_scored"),
+        "peak_rss_mb": get_peak_rss_mb(),
+    }
+
+
+def run_benchmarks(
+    names_df,
+    list_limits: list["int"],
+    strategies: list["str"] = BENCHMARK_STRATEGIES,
+    noise_sample_size: float = 0.4,
+    query_limit: int = 1000,
+    seed: int = 42,
+    target_path: str = "output_data",
+) -> dict:
+    """Given the input names, run every strategy on seeded datasets of every scale (crossing limit).
+
+    Every case runs in a fresh process, so that the peak memory of one case doesn't hide the next ones.
+    """
+    results = []
+    for list_limit in list_limits:
+        primary_path, secondary_path = generate_benchmark_datasets(
+            names_df, list_limit, noise_sample_size, seed, target_path
+        )
+        for strategy in strategies:
+            logging.info(f"Benchmarking `{strategy}` on crossing limit {list_limit} !")
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(
+                    run_benchmark_case, primary_path, secondary_path, strategy, query_limit
+                ).result()
+            result["list_limit"] = list_limit
+            results.append(result)
+    return {
+        "run": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "noise_sample_size": noise_sample_size,
+            "query_limit": query_limit,
+        },
+        "results": results,
+    }
+
+
+def export_benchmarks(benchmarks: dict, export_path: str) -> None:
+    """Given benchmark results, save them to a json file."""
+    with open(export_path, "w") as export_file:
+        json.dump(benchmarks, export_file, indent=2)
+    logging.info(f"Exported benchmarks to : {export_path} !")
+
+
+def compare_benchmarks(
+    reference: dict, current: dict, tolerance: float = 0.1
+) -> list["dict"]:
+    """Given reference and current benchmark results, flag the cases whose throughput dropped by more than `tolerance`."""
+    reference_results = {
+        (result["list_limit"], result["strategy"]): result
+        for result in reference["results"]
+        if result["status"] == "ok"
+    }
+    regressions = []
+    for result in current["results"]:
+        reference_result = reference_results.get((result["list_limit"], result["strategy"]))
+        if result["status"] != "ok" or reference_result is None:
+            continue
+        if not reference_result["queries_per_sec"] or not result["queries_per_sec"]:
+            continue
+        change = result["queries_per_sec"] / reference_result["queries_per_sec"] - 1
+        if change < -tolerance:
+            regressions.append(
+                {
+                    "list_limit": result["list_limit"],
+                    "strategy": result["strategy"],
+                    "reference_queries_per_sec": reference_result["queries_per_sec"],
+                    "queries_per_sec": result["queries_per_sec"],
+                    "change": change,
+                }
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    pass
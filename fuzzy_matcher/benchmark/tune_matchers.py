@@ -0,0 +1,142 @@
+import json
+import time
+import logging
+import numpy as np
+import pandas as pd
+from fuzzy_matcher.dataset_io import read_names_dataset
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe
+from fuzzy_matcher.pipelines.match_engine import (
+    MATCHERS,
+    get_candidates,
+)
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+# matcher configurations swept by default : (strategy, matcher options)
+DEFAULT_CONFIGURATIONS = [
+    ("batch", {"score_cutoff": 60}),
+    ("batch", {"score_cutoff": 70}),
+    ("batch", {"score_cutoff": 80}),
+    ("batch", {"score_cutoff": 70, "dtype": "uint8"}),
+    ("indexed", {"ngram_size": 2, "min_shared_ratio": 0.3}),
+    ("indexed", {"ngram_size": 3, "min_shared_ratio": 0.3}),
+    ("indexed", {"ngram_size": 3, "min_shared_ratio": 0.5}),
+    ("indexed", {"ngram_size": 4, "min_shared_ratio": 0.5}),
+    ("rerank", {"top_n": 10}),
+    ("rerank", {"top_n": 50}),
+    ("fields", {"top_n": 3}),
+    ("fields", {"top_n": 5}),
+]
+
+
+def get_evaluation_queries(
+    primary_path: str, secondary_path: str, sample_size: int = 1000, seed: int = 42
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Given generated primary and secondary datasets, get the candidates and a sample of the fuzzy matching queries.
+
+    Queries are the distinct secondary names without an exact match in the primary, each with the (processed)
+    name of the primary record it was generated from, as the expected match.
+    """
+    # primary ids are the positions in the primary dataset, the id column keeps duplicated names from being dropped
+    primary_df = read_names_dataset(primary_path)
+    primary_df = preprocess_dataframe(primary_df.assign(primary_id=np.arange(primary_df.shape[0])))
+    secondary_df = read_names_dataset(
+        secondary_path, columns=["first_name", "last_name", "primary_id"]
+    )
+    secondary_df["expected_match"] = (
+        primary_df["full_name_processed"]
+        .to_numpy()[secondary_df["primary_id"].astype(int).to_numpy()]
+    )
+    candidates = get_candidates(primary_df)
+    queries = preprocess_dataframe(secondary_df).drop_duplicates("full_name_processed")
+    queries = queries[~queries["full_name_processed"].isin(candidates["full_name_processed"])]
+    if queries.shape[0] > sample_size:
+        queries = queries.sample(n=sample_size, random_state=seed)
+    return candidates, queries
+
+
+def evaluate_configuration(
+    candidates: pd.DataFrame,
+    queries: pd.DataFrame,
+    strategy: str,
+    matcher_options: dict = None,
+) -> dict:
+    """Given candidates, queries with their expected match and a matcher configuration, measure its throughput and accuracy.
+
+    Precision is the share of the returned matches that are the expected ones, recall the share of the queries matched
+    to their expected match.
+    """
+    matcher_options = dict(matcher_options or {})
+    if "dtype" in matcher_options:
+        matcher_options["dtype"] = np.dtype(matcher_options["dtype"]).type
+    tic = time.perf_counter()
+    matched_df = MATCHERS[strategy](queries, candidates, **matcher_options)
+    elapsed = time.perf_counter() - tic
+
+    expected = queries.set_index("full_name_processed")["expected_match"]
+    is_correct = (
+        matched_df["matched_string"].to_numpy()
+        == expected.reindex(matched_df["string_to_match"]).to_numpy()
+    )
+    correct = int(is_correct.sum())
+    return {
+        "queries_per_sec": queries.shape[0] / elapsed if elapsed > 0 else None,
+        "precision": correct / matched_df.shape[0] if matched_df.shape[0] > 0 else 0.0,
+        "recall": correct / queries.shape[0] if queries.shape[0] > 0 else 0.0,
+    }
+
+
+def get_pareto_front(report: pd.DataFrame) -> pd.Series:
+    """Given a tuning report, flag the configurations for which no other one has both a higher (or equal) recall and throughput."""
+    recalls = report["recall"].to_numpy()
+    throughputs = report["queries_per_sec"].fillna(0).to_numpy()
+    dominated = [
+        bool(
+            (
+                (recalls >= recall)
+                & (throughputs >= throughput)
+                & ((recalls > recall) | (throughputs > throughput))
+            ).any()
+        )
+        for recall, throughput in zip(recalls, throughputs)
+    ]
+    return pd.Series(~np.array(dominated, dtype=bool), index=report.index)
+
+
+def run_tuning(
+    candidates: pd.DataFrame,
+    queries: pd.DataFrame,
+    configurations: list["tuple"] = DEFAULT_CONFIGURATIONS,
+) -> pd.DataFrame:
+    """Given candidates, evaluation queries and matcher configurations, get the precision/recall vs throughput report."""
+    rows = []
+    for strategy, matcher_options in configurations:
+        logging.info(f"Evaluating `{strategy}` with options {matcher_options} !")
+        rows.append(
+            {
+                "strategy": strategy,
+                "matcher_options": json.dumps(matcher_options, sort_keys=True),
+                **evaluate_configuration(candidates, queries, strategy, matcher_options),
+            }
+        )
+    report = pd.DataFrame(rows)
+    report["pareto_optimal"] = get_pareto_front(report)
+    return report.sort_values(["recall", "queries_per_sec"], ascending=False).reset_index(drop=True)
+
+
+def get_cheapest_configuration(report: pd.DataFrame, recall_target: float) -> dict:
+    """Given a tuning report, get the configuration with the highest throughput meeting the recall target (empty if none)."""
+    eligible = report[report["recall"] >= recall_target]
+    if eligible.shape[0] == 0:
+        logging.error(f"No configuration reaches the recall target {recall_target} !")
+        return {}
+    return eligible.sort_values("queries_per_sec", ascending=False).iloc[0].to_dict()
+
+
+if __name__ == "__main__":
+    pass
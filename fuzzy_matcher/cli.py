@@ -0,0 +1,292 @@
+import sys
+import json
+import time
+import logging
+import argparse
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+# run parameters of every command, overridden by the config file sections and then by the `--set` arguments
+DEFAULT_CONFIG = {
+    "generate": {
+        "input_path": "input_data/Customer_Names.csv",
+        "crossing_limit": 500,  # 1.000.000 primary records
+        "noise_sample": 0.4,
+        "target_path": "input_data",
+        "format": "csv",  # csv or parquet
+        "chunk_size": 1000000,
+        "seed": 42,
+    },
+    "index": {
+        "primary_path": "input_data/primary_names_dataset.csv",
+        "index_path": "input_data/primary_names_index.fzi",
+        "ngram_size": 3,
+    },
+    "match": {
+        "mode": "batch",  # batch (whole secondary dataset in memory) or streaming (chunk by chunk)
+        "matcher": "batch",
+        "matcher_options": {},
+        "primary_path": "input_data/primary_names_dataset.csv",
+        "secondary_path": "input_data/secondary_names_dataset.csv",
+        "index_path": None,  # streaming mode only, candidates read from the candidate index
+        "export_path": "output_data/name_matching.csv",
+        "sampled_run_size": None,  # batch mode only
+        "chunk_size": 500000,  # streaming mode only
+        "cache_path": None,
+        "canonical_steps": None,
+        "checkpoint_path": None,  # batch mode only, fuzzy matches checkpointed to resume an interrupted run
+        "checkpoint_batch_size": 10000,  # batch mode only
+        "metrics_path": None,  # .json and .prom (Prometheus textfile) are written
+    },
+    "bench": {
+        "input_path": "input_data/Customer_Names.csv",
+        "list_limits": [10, 50, 100],
+        "strategies": ["baseline", "batch", "indexed", "parallel", "matrix", "tfidf", "rerank", "fields"],
+        "query_limit": 1000,
+        "seed": 42,
+        "datasets_path": "output_data",
+        "export_path": "output_data/benchmarks.json",
+        "reference_path": None,  # previous run to flag regressions against
+        "regression_tolerance": 0.1,
+    },
+}
+
+
+def parse_config_value(value: str):
+    """Given a `--set` value, parse it as json (numbers, lists, null...), keeping it as a plain string otherwise."""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def load_run_config(command: str, config_path: str = None, overrides: list["str"] = None) -> dict:
+    """Given a command, an optional json config file and `key=value` overrides, get the run parameters of the command.
+
+    The config file has one section per command, e.g. `{"match": {"matcher": "fields"}}`. Returns an empty dict
+    if the config file can't be read or sets an unknown parameter.
+    """
+    run_config = dict(DEFAULT_CONFIG[command])
+    file_config = {}
+    if config_path is not None:
+        try:
+            with open(config_path) as config_file:
+                file_config = json.load(config_file).get(command, {})
+        except (OSError, ValueError) as error:
+            logging.error(f"Could not read the config file {config_path} : {error}")
+            return {}
+    for override in overrides or []:
+        key, separator, value = override.partition("=")
+        if separator == "":
+            logging.error(f"Override `{override}` should be written as key=value !")
+            return {}
+        file_config[key.strip()] = parse_config_value(value)
+    unknown_keys = [key for key in file_config if key not in run_config]
+    if len(unknown_keys) > 0:
+        logging.error(f"Unknown `{command}` parameters {unknown_keys}, please use some of : {list(run_config)}")
+        return {}
+    run_config.update(file_config)
+    return run_config
+
+
+def run_generate(run_config: dict) -> int:
+    """Given the generate parameters, generate the primary and secondary datasets, chunk by chunk."""
+    from fuzzy_matcher.dataset_io import DatasetAppender
+    from fuzzy_matcher.generator.generate_data import read_data, iterate_generated_datasets
+
+    input_names_df = read_data(run_config["input_path"])
+    if input_names_df.shape[0] == 0:
+        return 1
+    target = f"{run_config['target_path']}/{{}}_names_dataset.{run_config['format']}"
+    primary_appender = DatasetAppender(target.format("primary"))
+    secondary_appender = DatasetAppender(target.format("secondary"))
+    try:
+        for primary_chunk, secondary_chunk in iterate_generated_datasets(
+            input_df=input_names_df,
+            list_limit=run_config["crossing_limit"],
+            noise_sample_size=run_config["noise_sample"],
+            chunk_size=run_config["chunk_size"],
+            seed=run_config["seed"],
+        ):
+            primary_appender.append(primary_chunk)
+            secondary_appender.append(secondary_chunk)
+    finally:
+        primary_appender.close()
+        secondary_appender.close()
+    return 0
+
+
+def run_index(run_config: dict) -> int:
+    """Given the index parameters, build the candidate index, only if the primary dataset changed since the last build."""
+    from fuzzy_matcher.matcher.candidate_index import load_or_build_candidate_index
+
+    candidate_index = load_or_build_candidate_index(
+        primary_file_path=run_config["primary_path"],
+        index_path=run_config["index_path"],
+        ngram_size=run_config["ngram_size"],
+    )
+    if len(candidate_index) == 0:
+        return 1
+    print(f"Candidate index ready ({candidate_index['size']} candidates) : {run_config['index_path']}")
+    return 0
+
+
+def get_matcher_options(matcher_options: dict) -> dict:
+    """Given json matcher options, convert the ones which are not plain values (score dtype)."""
+    matcher_options = dict(matcher_options or {})
+    if "dtype" in matcher_options:
+        import numpy as np
+
+        matcher_options["dtype"] = np.dtype(matcher_options["dtype"]).type
+    return matcher_options
+
+
+def run_match(run_config: dict) -> int:
+    """Given the match parameters, match the secondary dataset to the primary one and export the results."""
+    from fuzzy_matcher.metrics import PipelineMetrics, export_metrics_json, export_metrics_prometheus
+    from fuzzy_matcher.pipelines import match_engine
+
+    if run_config["matcher"] not in match_engine.MATCHERS:
+        logging.error(f"Unknown matcher `{run_config['matcher']}`, please use one of : {list(match_engine.MATCHERS)}")
+        return 1
+    metrics = PipelineMetrics(run_config["matcher"])
+    matcher_options = get_matcher_options(run_config["matcher_options"])
+    if run_config["mode"] == "streaming":
+        with metrics.stage("load_candidates") as stage:
+            candidates, matcher_options = match_engine.load_matcher_candidates(
+                run_config["primary_path"], run_config["index_path"], run_config["matcher"], matcher_options
+            )
+            stage["rows_out"] = candidates.shape[0]
+        source_counts = match_engine.run_streaming_matching_pipeline(
+            candidates,
+            secondary_file_path=run_config["secondary_path"],
+            export_path=run_config["export_path"],
+            chunk_size=run_config["chunk_size"],
+            matcher=run_config["matcher"],
+            matcher_options=matcher_options,
+            cache_path=run_config["cache_path"],
+            metrics=metrics,
+            canonical_steps=run_config["canonical_steps"],
+        )
+        if len(source_counts) == 0:
+            return 1
+    elif run_config["mode"] == "batch":
+        from fuzzy_matcher.dataset_io import read_names_dataset, write_names_dataset
+
+        with metrics.stage("read") as stage:
+            primary_df = read_names_dataset(run_config["primary_path"])
+            secondary_df = read_names_dataset(run_config["secondary_path"])
+            stage["rows_out"] = primary_df.shape[0] + secondary_df.shape[0]
+        final_df = match_engine.run_matching_pipeline(
+            primary_df,
+            secondary_df,
+            matcher=run_config["matcher"],
+            sampled_run_size=run_config["sampled_run_size"],
+            matcher_options=matcher_options,
+            cache_path=run_config["cache_path"],
+            metrics=metrics,
+            canonical_steps=run_config["canonical_steps"],
+            checkpoint_path=run_config["checkpoint_path"],
+            checkpoint_batch_size=run_config["checkpoint_batch_size"],
+        )
+        if final_df.shape[0] == 0:
+            return 1
+        with metrics.stage("export", rows_in=final_df.shape[0]) as stage:
+            write_names_dataset(final_df, run_config["export_path"])
+            stage["rows_out"] = final_df.shape[0]
+        source_counts = final_df["mapping_source"].value_counts().to_dict()
+    else:
+        logging.error(f"Unknown match mode `{run_config['mode']}`, please use batch or streaming")
+        return 1
+
+    print(f"Exported results to {run_config['export_path']} : {source_counts}")
+    for stage in metrics.get_metrics()["stages"]:
+        print(f"{stage['stage']:>16} : {stage['wall_seconds']:.2f} s, {stage['peak_rss_mb']:.1f} MB")
+    if run_config["metrics_path"] is not None:
+        export_metrics_json(metrics.get_metrics(), f"{run_config['metrics_path']}.json")
+        export_metrics_prometheus(metrics.get_metrics(), f"{run_config['metrics_path']}.prom")
+    return 0
+
+
+def run_bench(run_config: dict) -> int:
+    """Given the bench parameters, benchmark the strategies and flag the regressions against a reference run."""
+    import os
+    from fuzzy_matcher.generator.generate_data import read_data
+    from fuzzy_matcher.benchmark.benchmark_matchers import (
+        run_benchmarks,
+        export_benchmarks,
+        compare_benchmarks,
+    )
+
+    benchmarks = run_benchmarks(
+        read_data(run_config["input_path"]),
+        list_limits=run_config["list_limits"],
+        strategies=run_config["strategies"],
+        query_limit=run_config["query_limit"],
+        seed=run_config["seed"],
+        target_path=run_config["datasets_path"],
+    )
+    export_benchmarks(benchmarks, run_config["export_path"])
+    for result in benchmarks["results"]:
+        if result["status"] == "ok":
+            print(
+                f"{result['strategy']:>10} | {result['candidates']:>8} candidates | "
+                f"{result['queries_per_sec'] or 0:>10.1f} queries/s | {result['peak_rss_mb']:>8.1f} MB"
+            )
+    reference_path = run_config["reference_path"]
+    if reference_path is not None and os.path.exists(reference_path):
+        with open(reference_path) as reference_file:
+            regressions = compare_benchmarks(
+                json.load(reference_file), benchmarks, run_config["regression_tolerance"]
+            )
+        for regression in regressions:
+            print(f"Regression : {regression}")
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+COMMANDS = {
+    "generate": (run_generate, "generate the primary and secondary test datasets"),
+    "index": (run_index, "build the persisted candidate index of the primary dataset"),
+    "match": (run_match, "match the secondary dataset to the primary one"),
+    "bench": (run_bench, "benchmark the matching strategies"),
+}
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the command line parser, with one subcommand per command."""
+    parser = argparse.ArgumentParser(prog="fuzzy-matcher", description="Fuzzy matching of names datasets.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, (_, description) in COMMANDS.items():
+        subparser = subparsers.add_parser(command, help=description, description=description)
+        subparser.add_argument("--config", help="json run config file, with one section per command")
+        subparser.add_argument(
+            "--set",
+            action="append",
+            default=[],
+            metavar="KEY=VALUE",
+            help=f"override a run parameter (json value), among : {', '.join(DEFAULT_CONFIG[command])}",
+        )
+    return parser
+
+
+def main(argv: list["str"] = None) -> int:
+    """Given the command line arguments, run the selected command and get its exit code."""
+    arguments = get_parser().parse_args(argv)
+    run_config = load_run_config(arguments.command, arguments.config, arguments.set)
+    if len(run_config) == 0:
+        return 2
+    tic = time.perf_counter()
+    exit_code = COMMANDS[arguments.command][0](run_config)
+    logging.info(f"Command `{arguments.command}` finished in {time.perf_counter() - tic:.2f} s, exit code {exit_code} !")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
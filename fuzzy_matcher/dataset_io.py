@@ -0,0 +1,116 @@
+import os
+import logging
+import pandas as pd
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+NAME_COLUMNS = ["first_name", "last_name"]
+PARQUET_EXTENSIONS = [".parquet", ".pq"]
+
+
+def get_file_format(file_path: str, file_format: str = None) -> str:
+    """Given a file path and an optional explicit format, get the dataset format: `parquet` or `csv`."""
+    if file_format is not None:
+        return file_format
+    if os.path.splitext(str(file_path))[1].lower() in PARQUET_EXTENSIONS:
+        return "parquet"
+    return "csv"
+
+
+def read_names_dataset(
+    file_path: str, columns: list["str"] = NAME_COLUMNS, file_format: str = None
+) -> pd.DataFrame:
+    """Given a dataset path, read only the given (name) columns of it, as strings.
+
+    Csv values are never parsed as missing, as names such as `Nan` or `NA` are valid names.
+    """
+    if get_file_format(file_path, file_format) == "parquet":
+        return pd.read_parquet(file_path, columns=columns)
+    return pd.read_csv(file_path, usecols=columns, dtype=str, keep_default_na=False)
+
+
+def iterate_names_dataset(
+    file_path: str,
+    chunk_size: int,
+    columns: list["str"] = NAME_COLUMNS,
+    file_format: str = None,
+):
+    """Given a dataset path, yield dataframes of at most `chunk_size` records with the given (name) columns.
+
+    Parquet datasets are read by record batches, so only the row groups of the current chunk are loaded.
+    """
+    if get_file_format(file_path, file_format) == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file_path)
+        for record_batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield record_batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            file_path,
+            usecols=columns,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=chunk_size,
+        )
+
+
+def write_names_dataset(
+    export_data: pd.DataFrame,
+    file_path: str,
+    file_format: str = None,
+    compression: str = "zstd",
+) -> None:
+    """Given a dataframe and a file path, write it as a compressed parquet file or as a csv file."""
+    if get_file_format(file_path, file_format) == "parquet":
+        export_data.to_parquet(file_path, index=False, compression=compression)
+    else:
+        export_data.to_csv(file_path, index=False, sep=",")
+
+
+class DatasetAppender:
+    """Appends dataframes with the same schema to a csv or parquet file, one after the other."""
+
+    def __init__(self, file_path: str, file_format: str = None, compression: str = "zstd"):
+        self.file_path = file_path
+        self.file_format = get_file_format(file_path, file_format)
+        self.compression = compression
+        self.parquet_writer = None
+        self.appended = 0
+
+    def append(self, export_data: pd.DataFrame) -> None:
+        """Given a dataframe, append its records to the file."""
+        if self.file_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(export_data, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(
+                    self.file_path, table.schema, compression=self.compression
+                )
+            # every appended frame becomes (at least) one row group
+            self.parquet_writer.write_table(table.cast(self.parquet_writer.schema))
+        else:
+            export_data.to_csv(
+                self.file_path,
+                index=False,
+                mode="w" if self.appended == 0 else "a",
+                header=self.appended == 0,
+            )
+        self.appended += 1
+
+    def close(self) -> None:
+        """Close the file, writing the parquet footer if needed."""
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+
+if __name__ == "__main__":
+    pass
@@ -1,8 +1,11 @@
 import os
+import re
 import logging
+import numpy as np
 import pandas as pd
 import random
 import string
+from fuzzy_matcher.dataset_io import write_names_dataset
 
 # set logging basic config
 logging.basicConfig(
@@ -92,74 +95,153 @@ def expand_names_dataframe(
     logging.info(
         "Generating original Dataset by crossing first names with last names !"
     )
-    candidate_last_names = input_df["last_name"].unique().tolist()[0:list_limit]
-    expanded_users = []
-    for index, row in input_df.iterrows():
-        for last_name in candidate_last_names:
-            expanded_users.append(
-                {"first_name": row["first_name"], "last_name": last_name}
-            )
-    return pd.DataFrame(expanded_users)
+    candidate_last_names = pd.DataFrame(
+        {"last_name": input_df["last_name"].unique()[0:list_limit]}
+    )
+    # vectorized cross join, every first name (in the input order) followed by all the candidate last names
+    return input_df[["first_name"]].merge(candidate_last_names, how="cross")
 
 
-def noisify_dataframe(input_df: pd.DataFrame, noise_sample_size: float) -> pd.DataFrame:
-    logging.info("Adding noise to original Dataset !")
-    noisification_candidates_df = input_df.sample(frac=noise_sample_size)
-    nosification_candidate_functions = {
-        0: str.upper,
-        1: multiply_suffixes,
-        2: multiply_random_letters,
-        3: str.lower,
-        4: add_random_character
-    }
-    noisified_data = []
-    for index, row in noisification_candidates_df.iterrows():
-
-        d = {
-            "index": index,
-            "first_name": row["first_name"],
-            "last_name": row["last_name"],
-        }
-
-        # Apply the noisification functions to one of the columns, randomly
-        if random.randint(0, 1) == 0:
-            candidate_col = "first_name"
-        else:
-            candidate_col = "last_name"
+def iterate_expanded_names(
+    input_df: pd.DataFrame, list_limit: int = 20, chunk_size: int = 1000000
+):
+    """Given Dataframe containing first_name and last_name as columns, yield the expanded names Dataframe in chunks.
+
+    Chunks hold the same records, with the same (global) index, as `expand_names_dataframe`, without materializing it.
+    """
+    first_names = input_df["first_name"].to_numpy()
+    last_names = input_df["last_name"].unique()[0:list_limit]
+    expanded_size = len(first_names) * len(last_names)
+    for chunk_start in range(0, expanded_size, chunk_size):
+        positions = np.arange(chunk_start, min(chunk_start + chunk_size, expanded_size))
+        yield pd.DataFrame(
+            {
+                "first_name": first_names[positions // len(last_names)],
+                "last_name": last_names[positions % len(last_names)],
+            },
+            index=positions,
+        )
 
-        # apply one of the noisification function randomly
-        candidate_func_number = random.randint(0, 4)
-        candidate_func = nosification_candidate_functions[candidate_func_number]
 
-        # update data based on the random vals
+def multiply_suffixes_vectorized(
+    input_strings: pd.Series, rng: np.random.Generator
+) -> pd.Series:
+    """Given a series of strings, multiply their final letter 2 to 4 times, as multiply_suffixes does."""
+    multiplication_factors = rng.integers(2, 5, size=len(input_strings))
+    return input_strings + input_strings.str[-1:].str.repeat(multiplication_factors - 1)
 
-        d[candidate_col] = candidate_func(d[candidate_col])
 
-        # randomly swap first name with last_name
-        if random.randint(0,5) >= 4:
-            fn = d["first_name"]
-            d["first_name"] = d["last_name"]
-            d["last_name"] = fn
+def multiply_random_letters_vectorized(
+    input_strings: pd.Series, rng: np.random.Generator
+) -> pd.Series:
+    """Given a series of strings, multiply every vowel 1 to 3 times, as multiply_random_letters does."""
+    vowels_count = int(input_strings.str.count("[aeiou]").sum())
+    multiply_factors = iter(rng.integers(1, 4, size=vowels_count).tolist())
+    return input_strings.str.replace(
+        "[aeiou]", lambda match: match.group(0) * next(multiply_factors), regex=True
+    )
 
-        noisified_data.append(d)
 
-    # Combine original data and data containing noise
-    nosified_df = pd.DataFrame(noisified_data)
-    nosified_df = nosified_df.set_index("index")[["first_name", "last_name"]]
+def add_random_character_vectorized(
+    input_strings: pd.Series, rng: np.random.Generator
+) -> pd.Series:
+    """Given a series of strings, insert a random ascii letter at a random position, as add_random_character does."""
+    lengths = input_strings.str.len().to_numpy()
+    positions = rng.integers(0, lengths + 1).tolist()
+    letters = rng.choice(list(string.ascii_letters), size=len(input_strings)).tolist()
+    return pd.Series(
+        [
+            value[:pos] + letter + value[pos:]
+            for value, pos, letter in zip(input_strings.tolist(), positions, letters)
+        ],
+        index=input_strings.index,
+        dtype=input_strings.dtype,
+    )
+
 
-    # index-based merge
-    merged_df = nosified_df.combine_first(input_df)
-    return merged_df
+def noisify_dataframe(
+    input_df: pd.DataFrame,
+    noise_sample_size: float,
+    seed: int | np.random.SeedSequence = None,
+) -> pd.DataFrame:
+    """Given names Dataframe, add noise to a sample (`noise_sample_size` fraction) of its records, in a vectorized way.
+
+    Every sampled record gets one random noise function (upper/lower casing, suffix multiplication, vowel multiplication,
+    random character insertion) on one of its columns and, 2 times out of 6, a swap of the first and last names.
+    Runs with the same seed generate the same noise. The `primary_id` column keeps, for every record, the index
+    of the input record it was generated from (its position in the primary dataset).
+    """
+    logging.info("Adding noise to original Dataset !")
+    rng = np.random.default_rng(seed)
+    noisified_df = input_df[["first_name", "last_name"]].fillna("").astype(str)
+    noisification_candidates_df = noisified_df.sample(
+        frac=noise_sample_size, random_state=rng
+    )
+    nosification_candidate_functions = {
+        0: lambda values, rng: values.str.upper(),
+        1: multiply_suffixes_vectorized,
+        2: multiply_random_letters_vectorized,
+        3: lambda values, rng: values.str.lower(),
+        4: add_random_character_vectorized,
+    }
+    sample_size = noisification_candidates_df.shape[0]
+    candidate_cols = np.where(
+        rng.integers(0, 2, size=sample_size) == 0, "first_name", "last_name"
+    )
+    candidate_func_numbers = rng.integers(0, 5, size=sample_size)
+
+    # apply every noisification function, in bulk, on the column randomly picked for its records
+    for candidate_col in ["first_name", "last_name"]:
+        for func_number, candidate_func in nosification_candidate_functions.items():
+            selected = (candidate_cols == candidate_col) & (candidate_func_numbers == func_number)
+            if selected.any():
+                noisification_candidates_df.loc[
+                    noisification_candidates_df.index[selected], candidate_col
+                ] = candidate_func(noisification_candidates_df.loc[selected, candidate_col], rng)
+
+    # randomly swap first name with last_name
+    swapped = rng.integers(0, 6, size=sample_size) >= 4
+    noisification_candidates_df.loc[
+        noisification_candidates_df.index[swapped], ["first_name", "last_name"]
+    ] = noisification_candidates_df.loc[swapped, ["last_name", "first_name"]].to_numpy()
+
+    # index-based update of the original data with the data containing noise
+    noisified_df.loc[noisification_candidates_df.index] = noisification_candidates_df
+    # ground-truth lineage : the (index) id of the primary record every secondary record was generated from
+    noisified_df["primary_id"] = input_df.index
+    return noisified_df
+
+
+def iterate_generated_datasets(
+    input_df: pd.DataFrame,
+    list_limit: int = 20,
+    noise_sample_size: float = 0.4,
+    chunk_size: int = 1000000,
+    seed: int = None,
+):
+    """Given Dataframe containing first_name and last_name as columns, yield (primary, secondary) dataset chunks.
+
+    Noise is generated per chunk, from a seeded generator spawned for every chunk, so runs with the same seed and
+    chunk size generate the same datasets and the datasets size is only bounded by the disk.
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    for primary_chunk in iterate_expanded_names(input_df, list_limit, chunk_size):
+        secondary_chunk = noisify_dataframe(
+            primary_chunk, noise_sample_size, seed=seed_sequence.spawn(1)[0]
+        )
+        yield primary_chunk, secondary_chunk
 
 
-def export_data(export_data: pd.DataFrame, export_path: str, file_name: str) -> None:
-    """Given export file path and export data, save it to a local csv file."""
+def export_data(
+    export_data: pd.DataFrame, export_path: str, file_name: str, file_format: str = "csv"
+) -> None:
+    """Given export file path and export data, save it to a local csv (or compressed parquet) file."""
     if not os.path.exists(export_path):
         logging.error("Provided path does not exist, stopping export !")
         exit(1)
-    complete_export_file_name = f"{export_path}/{file_name}.csv"
+    complete_export_file_name = f"{export_path}/{file_name}.{file_format}"
     try:
-        export_data.to_csv(complete_export_file_name, index=False, sep=",")
+        write_names_dataset(export_data, complete_export_file_name, file_format)
         logging.info(f"Exported data to : {complete_export_file_name} !")
     except:
         logging.error("Exception encountered while exporting file !")
@@ -0,0 +1,261 @@
+import os
+import json
+import mmap
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fuzzy_matcher.dataset_io import read_names_dataset
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe
+from fuzzy_matcher.matcher.ngram_index import build_ngram_index, sort_tokens
+from fuzzy_matcher.matcher.candidate_store import (
+    CandidateStore,
+    encode_strings,
+    decode_strings,
+)
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+INDEX_MAGIC = b"FZMIDX01"
+INDEX_FORMAT_VERSION = 2
+ARRAY_ALIGNMENT = 64
+INDEX_ARRAYS = [
+    "names",
+    "name_offsets",
+    "sorted_names",
+    "sorted_name_offsets",
+    "first_names",
+    "first_name_offsets",
+    "last_names",
+    "last_name_offsets",
+    "ngram_keys",
+    "posting_offsets",
+    "posting_ids",
+]
+
+
+def get_file_fingerprint(input_file_path: str, ngram_size: int = 3) -> str:
+    """Given a file path, get a content hash of the file, combined with the index build parameters."""
+    file_hash = hashlib.sha256()
+    file_hash.update(f"v{INDEX_FORMAT_VERSION};ngram_size={ngram_size};".encode("utf-8"))
+    with open(input_file_path, "rb") as input_file:
+        for block in iter(lambda: input_file.read(1024 * 1024), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def align_offset(offset: int) -> int:
+    """Given a byte offset, round it up to the next array alignment boundary."""
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+def build_candidate_index(primary_file_path: str, ngram_size: int = 3) -> dict:
+    """Given the primary dataset path, build the candidate index: normalized names, token-sorted names, first / last names and n-gram postings.
+
+    The first / last names are the ones of the first record of every candidate, as for `get_candidates`.
+    """
+    logging.info(f"Building candidate index from : {primary_file_path} !")
+    primary_df = read_names_dataset(primary_file_path)
+    candidate_df = preprocess_dataframe(primary_df).drop_duplicates("full_name_processed")
+    candidates = candidate_df["full_name_processed"].to_numpy(dtype=object)
+    names, name_offsets = encode_strings(candidates)
+    sorted_names, sorted_name_offsets = encode_strings(
+        [sort_tokens(candidate) for candidate in candidates]
+    )
+    first_names, first_name_offsets = encode_strings(candidate_df["first_name"].fillna("").astype(str).tolist())
+    last_names, last_name_offsets = encode_strings(candidate_df["last_name"].fillna("").astype(str).tolist())
+    ngram_index = build_ngram_index(candidates, ngram_size)
+    return {
+        "fingerprint": get_file_fingerprint(primary_file_path, ngram_size),
+        "ngram_size": ngram_size,
+        "size": len(candidates),
+        "names": names,
+        "name_offsets": name_offsets,
+        "sorted_names": sorted_names,
+        "sorted_name_offsets": sorted_name_offsets,
+        "first_names": first_names,
+        "first_name_offsets": first_name_offsets,
+        "last_names": last_names,
+        "last_name_offsets": last_name_offsets,
+        "ngram_keys": ngram_index["ngram_keys"],
+        "posting_offsets": ngram_index["posting_offsets"],
+        "posting_ids": ngram_index["posting_ids"],
+    }
+
+
+def write_candidate_index(candidate_index: dict, index_path: str) -> None:
+    """Given a candidate index, write it to a single file: magic, json header and the aligned raw arrays.
+
+    The file is first written next to the target and then renamed, so readers never see a partial index.
+    """
+    header = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "fingerprint": candidate_index["fingerprint"],
+        "ngram_size": candidate_index["ngram_size"],
+        "size": candidate_index["size"],
+        "arrays": {},
+    }
+    # array offsets are relative to the data section, which starts aligned after the header
+    data_offset = 0
+    for name in INDEX_ARRAYS:
+        array = np.ascontiguousarray(candidate_index[name])
+        header["arrays"][name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": data_offset,
+        }
+        data_offset += align_offset(array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = align_offset(len(INDEX_MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as index_file:
+        index_file.write(INDEX_MAGIC)
+        index_file.write(len(header_bytes).to_bytes(8, "little"))
+        index_file.write(header_bytes)
+        for name in INDEX_ARRAYS:
+            array = np.ascontiguousarray(candidate_index[name])
+            index_file.seek(data_start + header["arrays"][name]["offset"])
+            index_file.write(array.tobytes())
+        index_file.truncate(data_start + data_offset)
+    os.replace(tmp_path, index_path)
+    logging.info(f"Exported candidate index to : {index_path} !")
+
+
+def read_index_header(index_path: str) -> dict:
+    """Given an index path, read its json header, returning an empty dict for files that are not candidate indexes."""
+    with open(index_path, "rb") as index_file:
+        if index_file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+            logging.error("Provided file is not a candidate index !")
+            return {}
+        header_length = int.from_bytes(index_file.read(8), "little")
+        header = json.loads(index_file.read(header_length).decode("utf-8"))
+    header["data_start"] = align_offset(len(INDEX_MAGIC) + 8 + header_length)
+    return header
+
+
+def open_candidate_index(index_path: str) -> dict:
+    """Given an index path, memory-map it and get the index arrays as zero-copy, read-only views of the file."""
+    if not os.path.exists(index_path):
+        logging.error("Provided index path does not exist. Returning empty index.")
+        return {}
+    header = read_index_header(index_path)
+    if len(header) == 0:
+        return {}
+    with open(index_path, "rb") as index_file:
+        # the mapping stays valid after the file is closed and lives as long as the arrays using it
+        mapped_file = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+    candidate_index = {
+        "fingerprint": header["fingerprint"],
+        "ngram_size": header["ngram_size"],
+        "size": header["size"],
+    }
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        candidate_index[name] = np.frombuffer(
+            mapped_file,
+            dtype=dtype,
+            count=count,
+            offset=header["data_start"] + spec["offset"],
+        ).reshape(spec["shape"])
+    return candidate_index
+
+
+def load_or_build_candidate_index(
+    primary_file_path: str, index_path: str, ngram_size: int = 3
+) -> dict:
+    """Given the primary dataset and index paths, open the persisted index, rebuilding it only if the primary data changed.
+
+    Without an `ngram_size` (None), the index keeps the n-gram size it was built with (3 for a new index).
+    """
+    if ngram_size is None and os.path.exists(index_path):
+        ngram_size = read_index_header(index_path).get("ngram_size")
+    ngram_size = 3 if ngram_size is None else ngram_size
+    fingerprint = get_file_fingerprint(primary_file_path, ngram_size)
+    if os.path.exists(index_path):
+        header = read_index_header(index_path)
+        if header.get("fingerprint") == fingerprint:
+            logging.info(f"Candidate index up to date, opening : {index_path} !")
+            return open_candidate_index(index_path)
+        logging.info("Primary data or n-gram size changed since the index was built, rebuilding it !")
+    write_candidate_index(
+        build_candidate_index(primary_file_path, ngram_size), index_path
+    )
+    return open_candidate_index(index_path)
+
+
+def get_candidate_strings(candidate_index: dict, token_sorted: bool = False) -> list["str"]:
+    """Given a candidate index, decode its normalized (or token-sorted) candidate strings."""
+    if token_sorted:
+        return decode_strings(
+            candidate_index["sorted_names"], candidate_index["sorted_name_offsets"]
+        )
+    return decode_strings(candidate_index["names"], candidate_index["name_offsets"])
+
+
+def get_candidate_fields(candidate_index: dict) -> tuple[list["str"], list["str"]]:
+    """Given a candidate index, decode the (first names, last names) of its candidates."""
+    return (
+        decode_strings(candidate_index["first_names"], candidate_index["first_name_offsets"]),
+        decode_strings(candidate_index["last_names"], candidate_index["last_name_offsets"]),
+    )
+
+
+def get_string_column(buffer: np.ndarray, offsets: np.ndarray) -> pd.Series:
+    """Given a utf-8 buffer and its int64 offsets, get its strings as an arrow string column over the same memory, without decoding them."""
+    return pd.Series(
+        pd.array(
+            pa.LargeStringArray.from_buffers(len(offsets) - 1, pa.py_buffer(offsets), pa.py_buffer(buffer)),
+            dtype=pd.StringDtype("pyarrow"),
+        )
+    )
+
+
+def get_column_store(column: pd.Series) -> CandidateStore:
+    """Given a string column, get its strings as a candidate store, over the column memory if it is an arrow string column.
+
+    Arrow string columns (as the index candidates, or any column of the pandas string dtype) already hold a utf-8
+    buffer and its offsets, they are not encoded again. Other columns are encoded to a new compact store.
+    """
+    array = column.array
+    if isinstance(array, pd.arrays.ArrowStringArray):
+        strings = pa.array(array)
+        if strings.null_count == 0:
+            strings = strings.cast(pa.large_string())
+            _, offsets, buffer = strings.buffers()
+            offsets = np.frombuffer(offsets, dtype=np.int64)[strings.offset : strings.offset + len(strings) + 1]
+            buffer = np.frombuffer(buffer, dtype=np.uint8) if buffer is not None else np.empty(0, dtype=np.uint8)
+            if offsets[0] != 0:
+                buffer, offsets = buffer[offsets[0] : offsets[-1]], offsets - offsets[0]
+            return CandidateStore(buffer, offsets)
+    return CandidateStore(*encode_strings(column.to_numpy()))
+
+
+def get_index_candidates(candidate_index: dict) -> pd.DataFrame:
+    """Given a candidate index, get the candidates frame (normalized, token-sorted, first and last names) as views of the index arrays."""
+    return pd.DataFrame(
+        {
+            "full_name_processed": get_string_column(candidate_index["names"], candidate_index["name_offsets"]),
+            "full_name_sorted": get_string_column(candidate_index["sorted_names"], candidate_index["sorted_name_offsets"]),
+            "first_name": get_string_column(candidate_index["first_names"], candidate_index["first_name_offsets"]),
+            "last_name": get_string_column(candidate_index["last_names"], candidate_index["last_name_offsets"]),
+        }
+    )
+
+
+def get_index_store(candidate_index: dict, token_sorted: bool = False) -> CandidateStore:
+    """Given a candidate index, get its normalized (or token-sorted) candidates as a store over the index arrays, without decoding them."""
+    if token_sorted:
+        return CandidateStore(candidate_index["sorted_names"], candidate_index["sorted_name_offsets"])
+    return CandidateStore(candidate_index["names"], candidate_index["name_offsets"])
+
+
+if __name__ == "__main__":
+    pass
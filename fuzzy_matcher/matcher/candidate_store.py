@@ -0,0 +1,154 @@
+import logging
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+# strings gathered at a time when reordering a store, bounding the temporary byte indexes
+TAKE_BLOCK_SIZE = 65536
+
+
+def encode_strings(input_strings: list["str"]) -> tuple[np.ndarray, np.ndarray]:
+    """Given a list of strings, encode them to a single utf-8 buffer and the (n + 1) offsets delimiting them."""
+    input_strings = [str(input_string) for input_string in input_strings]
+    offsets = np.zeros(len(input_strings) + 1, dtype=np.int64)
+    joined = "".join(input_strings)
+    data = joined.encode("utf-8")
+    if len(data) == len(joined):
+        # ascii only : byte offsets are the character offsets
+        offsets[1:] = np.cumsum([len(item) for item in input_strings])
+        return np.frombuffer(data, dtype=np.uint8), offsets
+    encoded = [input_string.encode("utf-8") for input_string in input_strings]
+    offsets[1:] = np.cumsum([len(item) for item in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(buffer: np.ndarray, offsets: np.ndarray) -> list["str"]:
+    """Given a utf-8 buffer and the offsets delimiting its strings, decode them back to a list of strings."""
+    data = buffer.tobytes()
+    bounds = offsets.tolist()
+    text = data.decode("utf-8")
+    if len(text) == len(data):
+        # ascii only : the decoded text is sliced with the byte offsets
+        return [text[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    return [data[start:end].decode("utf-8") for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class CandidateStore:
+    """Compact candidate strings : a single utf-8 buffer and the (n + 1) int64 offsets delimiting the strings.
+
+    The arrays can be views of a memory-mapped candidate index or of a shared memory block, so a store is opened
+    or attached without copying nor unpickling a Python object per candidate. Strings are decoded on demand,
+    one range or selection at a time.
+    """
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_strings(self, start: int = 0, end: int = None) -> np.ndarray:
+        """Given a range of positions, decode its strings."""
+        end = len(self) if end is None else end
+        offsets = self.offsets[start : end + 1]
+        return np.array(
+            decode_strings(self.buffer[offsets[0] : offsets[-1]], offsets - offsets[0]),
+            dtype=object,
+        )
+
+    def take(self, positions: np.ndarray) -> "CandidateStore":
+        """Given candidate positions, get a new compact store of these candidates, in the positions order."""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        buffer = np.empty(offsets[-1], dtype=np.uint8)
+        for block_start in range(0, len(positions), TAKE_BLOCK_SIZE):
+            block_end = min(block_start + TAKE_BLOCK_SIZE, len(positions))
+            # every byte of a taken string is read at the same distance from its string start
+            source = np.repeat(
+                starts[block_start:block_end] - offsets[block_start:block_end],
+                lengths[block_start:block_end],
+            ) + np.arange(offsets[block_start], offsets[block_end])
+            buffer[offsets[block_start] : offsets[block_end]] = self.buffer[source]
+        return CandidateStore(buffer, offsets)
+
+    def take_strings(self, positions: np.ndarray) -> np.ndarray:
+        """Given candidate positions, decode their strings only."""
+        return self.take(positions).get_strings()
+
+    def get_lengths(self) -> np.ndarray:
+        """Get the length (in characters) of every string, without decoding them."""
+        lengths = np.diff(self.offsets)
+        # utf-8 continuation bytes (10xxxxxx) don't start a character
+        continuations = np.flatnonzero((self.buffer & 0xC0) == 0x80)
+        if len(continuations) > 0:
+            lengths -= np.bincount(
+                np.searchsorted(self.offsets, continuations, side="right") - 1,
+                minlength=len(self),
+            )
+        return lengths
+
+
+def build_candidate_store(input_strings: list["str"]) -> CandidateStore:
+    """Given candidate strings, encode them to a compact candidate store."""
+    return CandidateStore(*encode_strings(input_strings))
+
+
+def get_candidate_store(candidates) -> CandidateStore:
+    """Given candidates as a candidate store or as strings, get them as a candidate store."""
+    if isinstance(candidates, CandidateStore):
+        return candidates
+    return build_candidate_store(candidates)
+
+
+def take_candidate_strings(candidates, positions: np.ndarray) -> np.ndarray:
+    """Given candidates as a candidate store or as strings, get the strings at the given positions."""
+    if isinstance(candidates, CandidateStore):
+        return candidates.take_strings(positions)
+    return np.asarray(candidates, dtype=object)[positions]
+
+
+def share_candidate_store(candidate_store: CandidateStore) -> tuple[SharedMemory, dict]:
+    """Given a candidate store, copy it once to a shared memory block (utf-8 buffer followed by the offsets).
+
+    Returns the shared memory block, to be closed and unlinked by the owner, and the spec other processes need to attach to it.
+    """
+    buffer, offsets = candidate_store.buffer, candidate_store.offsets
+    shared_block = SharedMemory(create=True, size=max(1, buffer.nbytes + offsets.nbytes))
+    shared_block.buf[: buffer.nbytes] = buffer.tobytes()
+    shared_block.buf[buffer.nbytes : buffer.nbytes + offsets.nbytes] = offsets.tobytes()
+    spec = {
+        "name": shared_block.name,
+        "buffer_size": buffer.nbytes,
+        "offsets_count": len(offsets),
+    }
+    return shared_block, spec
+
+
+def attach_candidate_store(spec: dict) -> tuple[SharedMemory, CandidateStore]:
+    """Given the spec of a shared candidate store, attach to it without copying it.
+
+    The store arrays are views of the shared memory block, which has to stay open (and referenced) while the store is used.
+    """
+    shared_block = SharedMemory(name=spec["name"])
+    buffer = np.frombuffer(shared_block.buf, dtype=np.uint8, count=spec["buffer_size"])
+    offsets = np.frombuffer(
+        shared_block.buf,
+        dtype=np.int64,
+        count=spec["offsets_count"],
+        offset=spec["buffer_size"],
+    )
+    return shared_block, CandidateStore(buffer, offsets)
+
+
+if __name__ == "__main__":
+    pass
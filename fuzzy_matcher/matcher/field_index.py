@@ -0,0 +1,181 @@
+import logging
+import numpy as np
+import pandas as pd
+from rapidfuzz.process import cdist, cpdist
+from rapidfuzz.fuzz import ratio, token_sort_ratio
+from fuzzy_matcher.matcher.match_datasets import select_top_k
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+
+def get_processed_field(field_values: list["str"]) -> np.ndarray:
+    """Given the values of a name field, apply the same normalization as `preprocess_dataframe` (lower + strip)."""
+    return (
+        pd.Series(field_values, dtype=object)
+        .fillna("")
+        .astype(str)
+        .str.lower()
+        .str.strip()
+        .to_numpy(dtype=object)
+    )
+
+
+def build_field_index(
+    first_names: list["str"], last_names: list["str"], candidate_strings: list["str"]
+) -> dict:
+    """Given the first and last names of every candidate, build the distinct first / last name vocabularies and the hash of the existing pairs.
+
+    A (first name, last name) pair is identified by `first id * last vocabulary size + last id`, and the pairs
+    index gives back the candidate of every existing pair.
+    """
+    first_codes, first_vocabulary = pd.factorize(get_processed_field(first_names))
+    last_codes, last_vocabulary = pd.factorize(get_processed_field(last_names))
+    pair_codes = first_codes.astype(np.int64) * len(last_vocabulary) + last_codes
+    logging.info(
+        f"Field index : {len(first_vocabulary)} first names and {len(last_vocabulary)} last names for {len(pair_codes)} candidates !"
+    )
+    return {
+        "first_vocabulary": np.asarray(first_vocabulary, dtype=object),
+        "last_vocabulary": np.asarray(last_vocabulary, dtype=object),
+        "pair_index": pd.Index(pair_codes),
+        "candidates": np.asarray(candidate_strings, dtype=object),
+    }
+
+
+def get_field_top_n(
+    field_values: np.ndarray, vocabulary: np.ndarray, top_n: int, workers: int = -1
+) -> tuple[np.ndarray, np.ndarray]:
+    """Given field values and a field vocabulary, get the (scores, vocabulary ids) of the `top_n` closest values of every field value."""
+    score_mat = cdist(field_values, vocabulary, scorer=ratio, dtype=np.float32, workers=workers)
+    vocabulary_ids = np.broadcast_to(np.arange(len(vocabulary), dtype=np.int64), score_mat.shape)
+    return select_top_k(score_mat, vocabulary_ids, top_n)
+
+
+def get_pair_grid(
+    first_scores: np.ndarray,
+    first_ids: np.ndarray,
+    last_scores: np.ndarray,
+    last_ids: np.ndarray,
+    first_weights: np.ndarray,
+    last_weights: np.ndarray,
+    n_last_names: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Given the top first / last names of every query, get the combined score and the pair code of every (first, last) combination.
+
+    Field scores are combined by the weight (length) of the query field they were scored for.
+    """
+    combined_scores = (
+        first_weights[:, None, None] * first_scores[:, :, None]
+        + last_weights[:, None, None] * last_scores[:, None, :]
+    ) / (first_weights + last_weights)[:, None, None]
+    pair_codes = first_ids[:, :, None] * n_last_names + last_ids[:, None, :]
+    return combined_scores.reshape(len(first_scores), -1), pair_codes.reshape(len(first_scores), -1)
+
+
+def process_best_field_match(
+    queries: list["str"],
+    query_first_names: list["str"],
+    query_last_names: list["str"],
+    field_index: dict,
+    top_n: int = 5,
+    top_pairs: int = 10,
+    score_cutoff: float = 70,
+    chunk_size: int = 2000,
+    workers: int = -1,
+    stats: dict = None,
+) -> pd.DataFrame:
+    """Given the queries with their first / last names and a field index, match every query field by field.
+
+    Both fields of a query are scored against the small first / last name vocabularies, in both orientations
+    (first as first name and last as last name, then swapped), keeping the `top_n` closest names per field.
+    The (first, last) combinations are ranked by their combined field score, only the pairs existing in the
+    candidates are kept (hash lookup) and the `top_pairs` best are rescored with `token_sort_ratio` on the full
+    names, so scores compare with the other matchers. The search cost scales with the vocabulary sizes instead
+    of the candidates count. Queries without any pair reaching the score cutoff get a `match_index` of -1.
+    If a `stats` dict is provided, the number of scored (value, vocabulary value) and (query, pair) pairs is added to its `candidates_scored`.
+    """
+    columns = ["string_to_match", "similarity_score", "matched_string", "match_index"]
+    first_vocabulary, last_vocabulary = field_index["first_vocabulary"], field_index["last_vocabulary"]
+    if len(field_index["candidates"]) == 0:
+        logging.error("No candidates provided, skipping evaluation !")
+        return pd.DataFrame(columns=columns)
+
+    queries = np.asarray(queries, dtype=object)
+    query_first_names = get_processed_field(query_first_names)
+    query_last_names = get_processed_field(query_last_names)
+    n_first, n_last = min(top_n, len(first_vocabulary)), min(top_n, len(last_vocabulary))
+    best_scores = np.zeros(len(queries), dtype=np.float32)
+    best_indexes = np.full(len(queries), -1, dtype=np.int64)
+    candidates_scored = 0
+    for chunk_start in range(0, len(queries), chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        first_names, last_names = query_first_names[chunk], query_last_names[chunk]
+        # empty fields still weigh, so a query with a single field is not divided by zero
+        first_weights = np.fromiter(map(len, first_names), dtype=np.float32, count=len(first_names)) + 1
+        last_weights = np.fromiter(map(len, last_names), dtype=np.float32, count=len(last_names)) + 1
+
+        pair_scores, pair_codes = [], []
+        for first_field, last_field, first_field_weights, last_field_weights in [
+            (first_names, last_names, first_weights, last_weights),
+            (last_names, first_names, last_weights, first_weights),
+        ]:
+            first_scores, first_ids = get_field_top_n(first_field, first_vocabulary, n_first, workers)
+            last_scores, last_ids = get_field_top_n(last_field, last_vocabulary, n_last, workers)
+            orientation_scores, orientation_codes = get_pair_grid(
+                first_scores,
+                first_ids,
+                last_scores,
+                last_ids,
+                first_field_weights,
+                last_field_weights,
+                len(last_vocabulary),
+            )
+            pair_scores.append(orientation_scores)
+            pair_codes.append(orientation_codes)
+        pair_scores, pair_codes = np.hstack(pair_scores), np.hstack(pair_codes)
+        candidates_scored += 2 * len(first_names) * (len(first_vocabulary) + len(last_vocabulary))
+
+        # only the combinations existing in the candidates are kept
+        pair_rows = field_index["pair_index"].get_indexer(pair_codes.ravel()).reshape(pair_codes.shape)
+        pair_scores[pair_rows < 0] = -1
+        pair_scores, pair_rows = select_top_k(pair_scores, pair_rows, min(top_pairs, pair_rows.shape[1]))
+        pair_rows[pair_scores < 0] = -1
+
+        # rescore the best existing pairs on the full names
+        is_pair = pair_rows >= 0
+        rescored = np.full(pair_rows.shape, -1, dtype=np.float32)
+        rescored[is_pair] = cpdist(
+            np.repeat(queries[chunk], pair_rows.shape[1]).reshape(pair_rows.shape)[is_pair],
+            field_index["candidates"][pair_rows[is_pair]],
+            scorer=token_sort_ratio,
+            dtype=np.float32,
+            workers=workers,
+        )
+        candidates_scored += int(is_pair.sum())
+        rescored, pair_rows = select_top_k(rescored, pair_rows, 1)
+        is_match = (rescored[:, 0] >= score_cutoff) & (pair_rows[:, 0] >= 0)
+        best_scores[chunk] = np.where(is_match, rescored[:, 0], 0)
+        best_indexes[chunk] = np.where(is_match, pair_rows[:, 0], -1)
+
+    if stats is not None:
+        stats["candidates_scored"] = stats.get("candidates_scored", 0) + candidates_scored
+    return pd.DataFrame(
+        {
+            "string_to_match": queries,
+            "similarity_score": best_scores,
+            "matched_string": np.where(
+                best_indexes >= 0, field_index["candidates"][np.maximum(best_indexes, 0)], None
+            ),
+            "match_index": best_indexes,
+        },
+        columns=columns,
+    )
+
+
+if __name__ == "__main__":
+    pass
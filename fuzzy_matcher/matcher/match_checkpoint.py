@@ -0,0 +1,119 @@
+import os
+import json
+import hashlib
+import logging
+import pandas as pd
+from fuzzy_matcher.matcher.result_cache import get_cache_config, get_candidates_fingerprint
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+CHECKPOINT_COLUMNS = ["string_to_match", "matched_string", "similarity_score"]
+
+
+def get_queries_fingerprint(queries: pd.Series) -> str:
+    """Given the ordered queries, get a fingerprint of the queries and of their order (batches are query ranges)."""
+    query_hashes = pd.util.hash_pandas_object(pd.Series(queries, dtype=object), index=False).to_numpy()
+    return hashlib.sha256(query_hashes.tobytes()).hexdigest()
+
+
+def get_checkpoint_job(
+    queries: pd.Series,
+    candidate_names: pd.Series,
+    matcher: str,
+    matcher_options: dict = None,
+    batch_size: int = 10000,
+) -> dict:
+    """Given the queries, the candidates and the matcher configuration, get the (json compatible) job the checkpointed batches depend on."""
+    return {
+        "config": get_cache_config(matcher, matcher_options),
+        "queries": get_queries_fingerprint(queries),
+        "query_count": len(queries),
+        "candidates": get_candidates_fingerprint(pd.Series(candidate_names, dtype=object)),
+        "batch_size": batch_size,
+    }
+
+
+def replace_file(tmp_path: str, path: str) -> None:
+    """Given a fully written temporary file, flush it to disk and move it to its final path in a single step."""
+    with open(tmp_path, "rb") as tmp_file:
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_checkpoint_manifest(checkpoint: dict) -> None:
+    """Given a checkpoint, atomically write its manifest (job and finished batches)."""
+    manifest_path = f"{checkpoint['path']}/manifest.json"
+    with open(f"{manifest_path}.tmp", "w") as manifest_file:
+        json.dump({"job": checkpoint["job"], "batches": checkpoint["batches"]}, manifest_file)
+    replace_file(f"{manifest_path}.tmp", manifest_path)
+
+
+def open_checkpoint(checkpoint_path: str, job: dict) -> dict:
+    """Given a checkpoint directory and a job, open the checkpoint and its finished batches.
+
+    A missing checkpoint, or a checkpoint of another job (other queries, candidates or matcher configuration),
+    starts from no finished batch, the batch files of the other job being removed.
+    """
+    os.makedirs(checkpoint_path, exist_ok=True)
+    checkpoint = {"path": checkpoint_path, "job": job, "batches": []}
+    manifest_path = f"{checkpoint_path}/manifest.json"
+    if not os.path.exists(manifest_path):
+        logging.info("No checkpoint found, matching every batch !")
+        save_checkpoint_manifest(checkpoint)
+        return checkpoint
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest["job"] != job:
+        logging.info("Inputs or matcher configuration changed, discarding the checkpointed batches !")
+        for batch in manifest["batches"]:
+            if os.path.exists(f"{checkpoint_path}/{batch['file']}"):
+                os.remove(f"{checkpoint_path}/{batch['file']}")
+        save_checkpoint_manifest(checkpoint)
+        return checkpoint
+    checkpoint["batches"] = manifest["batches"]
+    logging.info(
+        f"Resuming from {len(checkpoint['batches'])} checkpointed batches "
+        f"({sum(batch['end'] - batch['start'] for batch in checkpoint['batches'])} queries) !"
+    )
+    return checkpoint
+
+
+def get_pending_batches(checkpoint: dict) -> list[tuple[int, int]]:
+    """Given a checkpoint, get the (start, end) query ranges of the batches still to be matched."""
+    finished = {(batch["start"], batch["end"]) for batch in checkpoint["batches"]}
+    query_count, batch_size = checkpoint["job"]["query_count"], checkpoint["job"]["batch_size"]
+    return [
+        (start, min(start + batch_size, query_count))
+        for start in range(0, query_count, batch_size)
+        if (start, min(start + batch_size, query_count)) not in finished
+    ]
+
+
+def save_checkpoint_batch(checkpoint: dict, start: int, end: int, matched_df: pd.DataFrame) -> None:
+    """Given a checkpoint and the results of a query range, persist them, the batch file being written before the manifest refers to it."""
+    batch_file = f"batch_{start:010d}_{end:010d}.parquet"
+    batch_path = f"{checkpoint['path']}/{batch_file}"
+    matched_df[CHECKPOINT_COLUMNS].to_parquet(f"{batch_path}.tmp", index=False)
+    replace_file(f"{batch_path}.tmp", batch_path)
+    checkpoint["batches"].append({"start": start, "end": end, "file": batch_file, "rows": matched_df.shape[0]})
+    save_checkpoint_manifest(checkpoint)
+
+
+def read_checkpoint_batches(checkpoint: dict) -> pd.DataFrame:
+    """Given a checkpoint, read the results of all its finished batches, in the queries order."""
+    batches = sorted(checkpoint["batches"], key=lambda batch: batch["start"])
+    if len(batches) == 0:
+        return pd.DataFrame(columns=CHECKPOINT_COLUMNS)
+    return pd.concat(
+        [pd.read_parquet(f"{checkpoint['path']}/{batch['file']}") for batch in batches],
+        ignore_index=True,
+    )
+
+
+if __name__ == "__main__":
+    pass
@@ -1,8 +1,17 @@
+import re
+import unicodedata
 import numpy as np
 import pandas as pd
 import logging
 from rapidfuzz.process import extractOne, cdist
-from rapidfuzz.fuzz import token_sort_ratio
+from rapidfuzz.fuzz import token_sort_ratio, ratio
+from fuzzy_matcher.matcher.candidate_store import (
+    CandidateStore,
+    encode_strings,
+    decode_strings,
+    get_candidate_store,
+    take_candidate_strings,
+)
 
 # set logging basic config
 logging.basicConfig(
@@ -12,17 +21,108 @@ logging.basicConfig(
 )
 
 
+def get_token_sorted_keys(input_strings: pd.Series) -> pd.Series:
+    """Given a series of strings, get their canonical token-sorted keys, the form compared by token_sort_ratio.
+
+    Scoring these keys with plain `ratio` gives the same scores as `token_sort_ratio` on the original strings,
+    with the tokenization and sorting done once per string instead of once per compared pair.
+    """
+    # a plain comprehension is several times faster than the split / map / join string accessors
+    return pd.Series(
+        [
+            " ".join(sorted(input_string.split())) if isinstance(input_string, str) else input_string
+            for input_string in input_strings.tolist()
+        ],
+        index=input_strings.index,
+        dtype=object,
+    )
+
+
+# noise collapsing steps of `get_canonical_names`, always applied in this order
+CANONICAL_STEPS = ["fold_unicode", "fold_punctuation", "collapse_repeats", "sort_tokens"]
+# compiled, as back-references are not supported by the arrow regex engine of the string columns
+REPEATED_CHARACTERS = re.compile(r"(.)\1+")
+
+
+def collapse_repeated_characters(input_strings: pd.Series) -> pd.Series:
+    """Given a series of strings, collapse the runs of the same character, directly on their utf-8 buffer when they are ascii."""
+    buffer, offsets = encode_strings(input_strings.tolist())
+    if len(buffer) > 0 and buffer.max() >= 0x80:
+        # a multi-byte character can repeat one of its bytes, so only the ascii buffer is collapsed byte by byte
+        return pd.Series(input_strings, dtype=object).str.replace(REPEATED_CHARACTERS, r"\1", regex=True)
+    is_kept = np.ones(len(buffer), dtype=bool)
+    is_kept[1:] = buffer[1:] != buffer[:-1]
+    # the first character of a string never repeats the end of the previous string
+    string_starts = offsets[:-1]
+    is_kept[string_starts[string_starts < len(buffer)]] = True
+    kept_counts = np.zeros(len(buffer) + 1, dtype=np.int64)
+    kept_counts[1:] = np.cumsum(is_kept)
+    return pd.Series(
+        decode_strings(buffer[is_kept], kept_counts[offsets]),
+        index=input_strings.index,
+        dtype=object,
+    )
+
+
+def fold_unicode_names(input_strings: pd.Series) -> pd.Series:
+    """Given a series of strings, strip their accents (NFKD combining marks), keeping every other character, latin or not."""
+    return pd.Series(
+        [
+            input_string
+            if input_string.isascii()
+            else "".join(
+                character
+                for character in unicodedata.normalize("NFKD", input_string)
+                if not unicodedata.combining(character)
+            )
+            for input_string in input_strings.tolist()
+        ],
+        index=input_strings.index,
+        dtype=object,
+    )
+
+
+def get_canonical_names(input_strings: pd.Series, steps: list["str"] = CANONICAL_STEPS) -> pd.Series:
+    """Given a series of normalized names, collapse their noise to a canonical form, with the selected steps.
+
+    `fold_unicode` strips the accents ("zoë" -> "zoe", non latin letters being kept), `fold_punctuation` turns punctuation
+    into spaces, `collapse_repeats` collapses runs of the same character ("jooohnn" -> "john") and `sort_tokens`
+    sorts the tokens (swapped first / last names). Whitespace is always collapsed.
+    """
+    canonical_names = pd.Series(input_strings, dtype=object).fillna("").astype(str)
+    if "fold_unicode" in steps:
+        canonical_names = fold_unicode_names(canonical_names)
+    if "fold_punctuation" in steps:
+        canonical_names = canonical_names.str.replace(r"[^\w\s]|_", " ", regex=True)
+    if "collapse_repeats" in steps:
+        canonical_names = collapse_repeated_characters(canonical_names)
+    if "sort_tokens" in steps:
+        return get_token_sorted_keys(canonical_names)
+    return canonical_names.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
 def preprocess_dataframe(input_df: pd.DataFrame) -> pd.DataFrame:
     """Given names dataframe, apply preprocessing steps to assure basic matching."""
-    processed_df = input_df.copy()
     # apply lower + strip any possible whitespaces from the beginning/end of the names
     # we reduce the search space to a single dimension, for simplicity
-    processed_df["full_name_processed"] = (
-        processed_df["first_name"].astype(str).apply(str.lower).apply(str.strip)
+    # missing names are kept as empty strings, for the processed names to never be null
+    processed_df = input_df.drop_duplicates().assign(
+        full_name_processed=lambda df: df["first_name"].fillna("").astype(str).str.lower().str.strip()
         + " "
-        + processed_df["last_name"].astype(str).apply(str.lower).apply(str.strip)
+        + df["last_name"].fillna("").astype(str).str.lower().str.strip()
+    )
+    processed_df["full_name_sorted"] = get_token_sorted_keys(
+        processed_df["full_name_processed"]
     )
-    return processed_df.drop_duplicates()
+    return processed_df
+
+
+def preprocess_records(input_df: pd.DataFrame) -> pd.DataFrame:
+    """Given secondary records, apply the preprocessing steps keeping every record, duplicated ones included.
+
+    Every record gets a `record_id`, the index label of its original row, so its results can be joined back to that row.
+    """
+    return preprocess_dataframe(input_df.assign(record_id=input_df.index))
 
 
 def get_best_fuzzy_match_process(
@@ -48,7 +148,7 @@ def process_best_fuzzy_match_baseline(
         matches.append(match)
         count += 1
         if count % 1000 == 0:
-            print(f"processed {count} records !")
+            logging.debug(f"processed {count} records !")
     return pd.DataFrame(matches)
 
 
@@ -56,26 +156,389 @@ def process_best_fuzzy_match_batch(
     queries: list["str"], candidate_strings: list["str"]
 ) -> list["dict"]:
     """Given set of input queries and matching candidates, run fuzzy matching in batch mode."""
-    results = []
-    if len(queries) > 2500:
-        logging.error("Provided batch too large, skipping evaluation !")
-        return results
+    # the streaming engine bounds the score matrix memory, so the batch size is no longer capped
+    return process_best_fuzzy_match_streaming(
+        queries, candidate_strings=candidate_strings
+    ).to_dict("records")
+
+
+def get_tile_sizes(
+    n_queries: int,
+    n_candidates: int,
+    memory_budget: int,
+    dtype: type = np.float32,
+    min_query_tile: int = 256,
+) -> tuple[int, int]:
+    """Given the matching space and a memory budget in bytes, get the (query, candidate) tile sizes of a score matrix fitting in it.
+
+    Candidate tiles are kept as wide as possible, while keeping at least `min_query_tile` queries per tile
+    so that the parallel workers of cdist still have enough rows to split between them.
+    """
+    budget_cells = max(1, memory_budget // np.dtype(dtype).itemsize)
+    query_floor = max(1, min(n_queries, min_query_tile))
+    candidate_tile = max(1, min(n_candidates, budget_cells // query_floor))
+    query_tile = max(1, min(n_queries, budget_cells // candidate_tile))
+    return query_tile, candidate_tile
+
+
+def get_length_buckets(candidates) -> dict:
+    """Given candidates (strings or a `CandidateStore`), sort them once by length into buckets of the same length.
+
+    The buckets hold the length-sorted compact store, the original position of every sorted candidate and the
+    (length, start, end) of every bucket, so they can be built once per candidate set and scored by many calls.
+    """
+    candidate_store = get_candidate_store(candidates)
+    candidate_lengths = candidate_store.get_lengths()
+    candidate_order = np.argsort(candidate_lengths, kind="stable")
+    bucket_lengths, bucket_starts = np.unique(candidate_lengths[candidate_order], return_index=True)
+    return {
+        "store": candidate_store.take(candidate_order),
+        "order": candidate_order,
+        "lengths": bucket_lengths,
+        "starts": bucket_starts,
+        "ends": np.append(bucket_starts[1:], len(candidate_store)),
+    }
+
+
+def get_scoring_inputs(
+    queries: list["str"],
+    candidates,
+    query_keys: list["str"] = None,
+    candidate_keys=None,
+    candidate_buckets: dict = None,
+) -> tuple:
+    """Given queries and candidates with their optional token-sorted keys, get the (queries, candidate buckets, scorer) to score.
+
+    Candidates and candidate keys can be strings or a `CandidateStore`. Missing keys are computed here,
+    as `ratio` on the token-sorted keys gives the `token_sort_ratio` scores. Prebuilt `candidate_buckets`
+    (`get_length_buckets` of the candidate keys) are used as they are, without sorting the candidates again.
+    """
+    if query_keys is None:
+        query_keys = get_token_sorted_keys(pd.Series(queries, dtype=object)).to_numpy(dtype=object)
+    if candidate_buckets is None:
+        if candidate_keys is None:
+            if isinstance(candidates, CandidateStore):
+                candidates = candidates.get_strings()
+            candidate_keys = get_token_sorted_keys(pd.Series(candidates, dtype=object))
+        candidate_buckets = get_length_buckets(candidate_keys)
+    return np.asarray(query_keys, dtype=object), candidate_buckets, ratio
+
+
+def get_length_bounds(length: int, score_cutoff: float) -> tuple[int, int]:
+    """Given a string length and a score cutoff, get the (min, max) lengths of the strings that can reach the cutoff.
+
+    A normalized Indel ratio is 200 * LCS / (la + lb) <= 200 * min(la, lb) / (la + lb), so strings whose lengths
+    differ too much can't reach the cutoff, whatever their characters.
+    """
+    if score_cutoff is None or score_cutoff <= 0:
+        return 0, np.iinfo(np.int64).max
+    # the tolerance keeps the boundary lengths, so the bounds never exclude a match
+    min_length = int(np.ceil(score_cutoff * length / (200 - score_cutoff) - 1e-9))
+    max_length = int(np.floor((200 - score_cutoff) * length / score_cutoff + 1e-9))
+    return min_length, max_length
+
+
+def get_length_groups(sorted_lengths: np.ndarray, min_group_size: int) -> list["tuple"]:
+    """Given sorted string lengths, get the (start, end) ranges of groups of at least `min_group_size` strings, never splitting a length."""
+    _, length_counts = np.unique(sorted_lengths, return_counts=True)
+    length_ends = np.cumsum(length_counts)
+    groups = []
+    group_start = 0
+    for length_end in length_ends:
+        if length_end - group_start >= min_group_size or length_end == len(sorted_lengths):
+            groups.append((group_start, int(length_end)))
+            group_start = int(length_end)
+    return groups
 
-    dist_mat = cdist(
-        queries, choices=candidate_strings, scorer=token_sort_ratio, score_cutoff=70, workers=-1
+
+def iterate_score_tiles(
+    queries: list["str"],
+    candidate_buckets: dict,
+    scorer,
+    memory_budget: int,
+    score_cutoff: float,
+    dtype: type,
+    workers: int,
+    stats: dict = None,
+    min_query_group: int = 256,
+):
+    """Given queries and the length buckets of the candidates, yield (query_positions, candidate_positions, score_matrix) tiles fitting the memory budget.
+
+    Candidates are partitioned in buckets of the same length (`get_length_buckets`) and queries grouped by length, every query group being
+    scored only against the buckets whose length can reach the score cutoff (`get_length_bounds`), so no match is lost.
+    Queries of close lengths are grouped together up to `min_query_group` queries, as cdist is faster on many queries.
+    Tiles never span two buckets, so the candidates of a tile are in increasing index order.
+    Candidates are kept in a compact store (see `CandidateStore`) sorted by length, only the strings of the tile
+    being scored are decoded, so they are also scanned in memory order by cdist.
+    The scorer has to be a normalized Indel ratio (`ratio`, or `token_sort_ratio`).
+    If a `stats` dict is provided, the number of scored pairs is added to its `candidates_scored`.
+    """
+    query_array = np.asarray(queries, dtype=object)
+    sorted_store, candidate_order = candidate_buckets["store"], candidate_buckets["order"]
+    bucket_lengths, bucket_starts, bucket_ends = (
+        candidate_buckets["lengths"],
+        candidate_buckets["starts"],
+        candidate_buckets["ends"],
+    )
+    n_queries, n_candidates = len(query_array), len(sorted_store)
+    query_lengths = np.fromiter(map(len, query_array), dtype=np.int64, count=n_queries)
+    query_order = np.argsort(query_lengths, kind="stable")
+    sorted_query_lengths = query_lengths[query_order]
+
+    scored_pairs = 0
+    for group_start, group_end in get_length_groups(sorted_query_lengths, min_query_group):
+        group_positions = query_order[group_start:group_end]
+        min_length = get_length_bounds(sorted_query_lengths[group_start], score_cutoff)[0]
+        max_length = get_length_bounds(sorted_query_lengths[group_end - 1], score_cutoff)[1]
+        first_bucket = np.searchsorted(bucket_lengths, min_length, side="left")
+        last_bucket = np.searchsorted(bucket_lengths, max_length, side="right")
+        for bucket_start, bucket_end in zip(
+            bucket_starts[first_bucket:last_bucket], bucket_ends[first_bucket:last_bucket]
+        ):
+            query_tile, candidate_tile = get_tile_sizes(
+                len(group_positions), bucket_end - bucket_start, memory_budget, dtype
+            )
+            for query_start in range(0, len(group_positions), query_tile):
+                query_positions = group_positions[query_start : query_start + query_tile]
+                for tile_start in range(bucket_start, bucket_end, candidate_tile):
+                    tile_end = min(tile_start + candidate_tile, bucket_end)
+                    score_mat = cdist(
+                        query_array[query_positions],
+                        choices=sorted_store.get_strings(tile_start, tile_end),
+                        scorer=scorer,
+                        processor=None,
+                        score_cutoff=score_cutoff,
+                        dtype=dtype,
+                        workers=workers,
+                    )
+                    yield query_positions, candidate_order[tile_start:tile_end], score_mat
+            scored_pairs += len(group_positions) * int(bucket_end - bucket_start)
+
+    logging.info(
+        f"Scored {scored_pairs} of the {n_queries * n_candidates} (query, candidate) pairs, the others can't reach the cutoff !"
     )
-    for i in range(len(queries)):
-        bm_val = dist_mat[i].max()
-        bm_index = dist_mat[i].argmax()
-        bm = candidate_strings[bm_index]
-        results.append(
-            {
-                "string_to_match": queries[i],
-                "similarity_score": bm_val,
-                "matched_string": bm,
-            }
+    if stats is not None:
+        stats["candidates_scored"] = stats.get("candidates_scored", 0) + scored_pairs
+
+
+def process_best_fuzzy_match_streaming(
+    queries: list["str"],
+    candidate_strings: list["str"],
+    memory_budget: int = 256 * 1024**2,
+    score_cutoff: float = 70,
+    dtype: type = np.float32,
+    workers: int = -1,
+    query_keys: list["str"] = None,
+    candidate_keys: list["str"] = None,
+    stats: dict = None,
+    candidate_buckets: dict = None,
+) -> pd.DataFrame:
+    """Given set of input queries and matching candidates, run fuzzy matching in tiles fitting a memory budget (bytes).
+
+    Every (query tile x candidate tile) score matrix is folded into a running best score/best index per query,
+    so the full queries x candidates matrix is never allocated. `dtype` can be set to np.uint8 to score with
+    rounded integer similarities and fit 4 times more cells in the same budget.
+    When the token-sorted `query_keys` and `candidate_keys` are provided, they are scored with plain `ratio`.
+    Candidates and candidate keys can also be a `CandidateStore` (e.g. over a memory-mapped candidate index),
+    and `candidate_buckets` the length buckets of the candidate keys built once (`get_length_buckets`), for repeated calls.
+    Only the candidates whose length can reach the score cutoff are scored (see `iterate_score_tiles`).
+    Queries without any candidate reaching the score cutoff get a null `matched_string` and a `match_index` of -1.
+    """
+    if memory_budget < np.dtype(dtype).itemsize:
+        logging.error("Provided memory budget too small, skipping evaluation !")
+        return pd.DataFrame(
+            columns=["string_to_match", "similarity_score", "matched_string", "match_index"]
         )
-    return results
+    if len(candidate_strings) == 0:
+        logging.error("No candidates provided, skipping evaluation !")
+        return pd.DataFrame(
+            columns=["string_to_match", "similarity_score", "matched_string", "match_index"]
+        )
+
+    best_scores = np.zeros(len(queries), dtype=dtype)
+    best_indexes = np.full(len(queries), -1, dtype=np.int64)
+    for query_positions, candidate_positions, score_mat in iterate_score_tiles(
+        *get_scoring_inputs(queries, candidate_strings, query_keys, candidate_keys, candidate_buckets),
+        memory_budget,
+        score_cutoff,
+        dtype,
+        workers,
+        stats,
+    ):
+        row_best = score_mat.argmax(axis=1)
+        row_scores = score_mat[np.arange(score_mat.shape[0]), row_best]
+        row_best = candidate_positions[row_best]
+        # cdist zeroes scores under the cutoff, so a strictly higher score is always a valid match;
+        # equal scores keep the lowest candidate index, as a full-row argmax would
+        current_scores = best_scores[query_positions]
+        improved = (row_scores > current_scores) | (
+            (row_scores == current_scores)
+            & (row_scores > 0)
+            & (row_best < best_indexes[query_positions])
+        )
+        best_scores[query_positions[improved]] = row_scores[improved]
+        best_indexes[query_positions[improved]] = row_best[improved]
+
+    matched_strings = np.where(
+        best_indexes >= 0, take_candidate_strings(candidate_strings, np.maximum(best_indexes, 0)), None
+    )
+    return pd.DataFrame(
+        {
+            "string_to_match": np.asarray(queries, dtype=object),
+            "similarity_score": best_scores,
+            "matched_string": matched_strings,
+            "match_index": best_indexes,
+        }
+    )
+
+
+def select_tied_top_k(
+    scores: np.ndarray, indexes: np.ndarray, kth_scores: np.ndarray, top_part: np.ndarray
+) -> np.ndarray:
+    """Given (rows x n) scores and candidate indexes, their k-th best scores and k best columns, get the k best columns with ties broken.
+
+    Every score over the k-th best is kept, and the scores tied with it are completed by their lowest candidate indexes.
+    """
+    rows = np.arange(scores.shape[0])[:, None]
+    k = top_part.shape[1]
+    # scores over the k-th best come first, the remaining positions being filled by the ties
+    kept = top_part[rows, np.argsort(scores[rows, top_part] <= kth_scores, axis=1, kind="stable")]
+    over_counts = (scores[rows, top_part] > kth_scores).sum(axis=1)
+    tie_rows, tie_columns = np.nonzero(scores == kth_scores)
+    order = np.lexsort((indexes[tie_rows, tie_columns], tie_rows))
+    tie_rows, tie_columns = tie_rows[order], tie_columns[order]
+    positions = over_counts[tie_rows] + np.arange(len(tie_rows)) - np.searchsorted(tie_rows, tie_rows)
+    is_kept = positions < k
+    kept[tie_rows[is_kept], positions[is_kept]] = tie_columns[is_kept]
+    return kept
+
+
+def select_top_k(
+    scores: np.ndarray, indexes: np.ndarray, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Given (rows x n) scores and candidate indexes, keep the k best per row, ordered by descending score.
+
+    Uses a partial selection (argpartition) to keep the k best, only these k being then sorted.
+    Ties are broken by the lowest candidate index : every score over the k-th best is kept, and the scores tied
+    with it are selected by their lowest candidate indexes, whatever the order of the columns.
+    """
+    rows = np.arange(scores.shape[0])[:, None]
+    if scores.shape[1] > k:
+        # the k last positions of the partition hold the k best scores, without negating a copy of the scores
+        kept = np.argpartition(scores, scores.shape[1] - k, axis=1)[:, -k:]
+        kth_scores = scores[rows, kept].min(axis=1, keepdims=True)
+        kept = select_tied_top_k(scores, indexes, kth_scores, kept)
+        scores, indexes = scores[rows, kept], indexes[rows, kept]
+    order = np.lexsort((indexes, -scores.astype(np.float64)))
+    return scores[rows, order], indexes[rows, order]
+
+
+def select_positive_top_k(
+    scores: np.ndarray, indexes: np.ndarray, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Given (rows x n) scores and candidate indexes, keep the k best positive scores per row, ordered by descending score.
+
+    Only the positive scores are sorted (e.g. the scores reaching the cutoff in a cdist tile, the others being zeroed),
+    ties being broken by the lowest candidate index. Rows with less than k positive scores get zero scores and -1 indexes.
+    """
+    rows, columns = np.nonzero(scores > 0)
+    entry_scores, entry_indexes = scores[rows, columns], indexes[rows, columns]
+    order = np.lexsort((entry_indexes, -entry_scores.astype(np.float64), rows))
+    rows, entry_scores, entry_indexes = rows[order], entry_scores[order], entry_indexes[order]
+    # rank of every entry in its row, the entries of a row being contiguous
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    is_kept = ranks < k
+    top_scores = np.zeros((scores.shape[0], k), dtype=scores.dtype)
+    top_indexes = np.full((scores.shape[0], k), -1, dtype=np.int64)
+    top_scores[rows[is_kept], ranks[is_kept]] = entry_scores[is_kept]
+    top_indexes[rows[is_kept], ranks[is_kept]] = entry_indexes[is_kept]
+    return top_scores, top_indexes
+
+
+def process_top_k_fuzzy_match_streaming(
+    queries: list["str"],
+    candidate_strings: list["str"],
+    k: int = 3,
+    memory_budget: int = 256 * 1024**2,
+    score_cutoff: float = 70,
+    dtype: type = np.float32,
+    workers: int = -1,
+    query_keys: list["str"] = None,
+    candidate_keys: list["str"] = None,
+    stats: dict = None,
+    candidate_buckets: dict = None,
+) -> pd.DataFrame:
+    """Given set of input queries and matching candidates, get the k best matches of every query.
+
+    The result has one row per (query, match), ranked from 1 to k by descending similarity score.
+    Only matches reaching the score cutoff are returned; queries without any of them get a single
+    rank 1 row with a null `matched_string` and a `match_index` of -1.
+    When the token-sorted `query_keys` and `candidate_keys` are provided, they are scored with plain `ratio`.
+    Candidates and candidate keys can also be a `CandidateStore` (e.g. over a memory-mapped candidate index),
+    and `candidate_buckets` the length buckets of the candidate keys built once (`get_length_buckets`), for repeated calls.
+    """
+    columns = [
+        "string_to_match",
+        "match_rank",
+        "similarity_score",
+        "matched_string",
+        "match_index",
+    ]
+    if k < 1:
+        logging.error("Provided k should be at least 1, skipping evaluation !")
+        return pd.DataFrame(columns=columns)
+    if memory_budget < np.dtype(dtype).itemsize:
+        logging.error("Provided memory budget too small, skipping evaluation !")
+        return pd.DataFrame(columns=columns)
+    if len(candidate_strings) == 0:
+        logging.error("No candidates provided, skipping evaluation !")
+        return pd.DataFrame(columns=columns)
+
+    top_scores = np.zeros((len(queries), k), dtype=dtype)
+    top_indexes = np.full((len(queries), k), -1, dtype=np.int64)
+    for query_positions, candidate_positions, score_mat in iterate_score_tiles(
+        *get_scoring_inputs(queries, candidate_strings, query_keys, candidate_keys, candidate_buckets),
+        memory_budget,
+        score_cutoff,
+        dtype,
+        workers,
+        stats,
+    ):
+        # cdist zeroes the scores under the cutoff, so only the matches of the tile are ranked
+        tile_scores, tile_indexes = select_positive_top_k(
+            score_mat, np.broadcast_to(candidate_positions, score_mat.shape), k
+        )
+        # merge the tile top-k with the running top-k of the same queries
+        (
+            top_scores[query_positions],
+            top_indexes[query_positions],
+        ) = select_top_k(
+            np.hstack([top_scores[query_positions], tile_scores]),
+            np.hstack([top_indexes[query_positions], tile_indexes]),
+            k,
+        )
+
+    # cdist zeroes scores under the cutoff, so zero scores are not matches
+    top_indexes[top_scores == 0] = -1
+    is_match = top_indexes >= 0
+    keep = is_match.copy()
+    keep[:, 0] = True
+    query_positions, ranks = np.nonzero(keep)
+    kept_indexes = top_indexes[keep]
+    return pd.DataFrame(
+        {
+            "string_to_match": np.asarray(queries, dtype=object)[query_positions],
+            "match_rank": ranks + 1,
+            "similarity_score": top_scores[keep],
+            "matched_string": np.where(
+                kept_indexes >= 0,
+                take_candidate_strings(candidate_strings, np.maximum(kept_indexes, 0)),
+                None,
+            ),
+            "match_index": kept_indexes,
+        },
+        columns=columns,
+    )
 
 
 if __name__ == "__main__":
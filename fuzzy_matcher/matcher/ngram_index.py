@@ -0,0 +1,160 @@
+import logging
+from collections import defaultdict
+import numpy as np
+from rapidfuzz.process import extractOne
+from rapidfuzz.fuzz import token_sort_ratio
+from fuzzy_matcher.matcher.candidate_store import CandidateStore, take_candidate_strings
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+
+def sort_tokens(input_string: str) -> str:
+    """Given input string, return the token-sorted form compared by token_sort_ratio."""
+    return " ".join(sorted(str(input_string).split()))
+
+
+def get_ngrams(input_string: str, ngram_size: int = 3) -> list["str"]:
+    """Given input string, return its character n-grams, tagged with their occurrence number.
+
+    Tagging repeated n-grams (e.g. `aaa#0`, `aaa#1`) makes the set intersection between two
+    strings equal to their multiset intersection, which is what the n-gram count filter needs.
+    """
+    if len(input_string) == 0:
+        return []
+    if len(input_string) <= ngram_size:
+        return [f"{input_string}#0"]
+    seen = defaultdict(int)
+    ngrams = []
+    for pos in range(len(input_string) - ngram_size + 1):
+        gram = input_string[pos : pos + ngram_size]
+        ngrams.append(f"{gram}#{seen[gram]}")
+        seen[gram] += 1
+    return ngrams
+
+
+def build_ngram_index(candidate_strings: list["str"], ngram_size: int = 3) -> dict:
+    """Given candidate strings, build an inverted index from character n-grams to candidate ids.
+
+    N-grams are extracted from the token-sorted form of every candidate, so that first/last name swaps
+    share the same postings. The index is built once and reused for all the queries. Postings are stored
+    in a compressed sparse row layout: the sorted (utf-8 encoded) n-grams, the offsets of their posting lists
+    and the concatenated posting lists, so the index can be persisted and memory-mapped as plain arrays.
+    """
+    logging.info(f"Building {ngram_size}-gram index over {len(candidate_strings)} candidates !")
+    postings = defaultdict(list)
+    for candidate_id, candidate in enumerate(candidate_strings):
+        for gram in get_ngrams(sort_tokens(candidate), ngram_size):
+            postings[gram].append(candidate_id)
+    ngram_keys = sorted(postings.keys())
+    posting_offsets = np.zeros(len(ngram_keys) + 1, dtype=np.int64)
+    posting_offsets[1:] = np.cumsum([len(postings[gram]) for gram in ngram_keys])
+    posting_ids = np.fromiter(
+        (candidate_id for gram in ngram_keys for candidate_id in postings[gram]),
+        dtype=np.int32,
+        count=posting_offsets[-1],
+    )
+    return {
+        "ngram_size": ngram_size,
+        "size": len(candidate_strings),
+        "ngram_keys": np.array(
+            [gram.encode("utf-8") for gram in ngram_keys], dtype="S"
+        ),
+        "posting_offsets": posting_offsets,
+        "posting_ids": posting_ids,
+    }
+
+
+def get_posting_lists(ngram_index: dict, ngrams: list["str"]) -> list[np.ndarray]:
+    """Given an n-gram index and a list of n-grams, get the posting lists of the n-grams present in the index."""
+    ngram_keys = ngram_index["ngram_keys"]
+    encoded = [gram.encode("utf-8") for gram in ngrams]
+    # n-grams longer than the widest key can't be part of the index
+    encoded = [gram for gram in encoded if len(gram) <= ngram_keys.dtype.itemsize]
+    if len(encoded) == 0 or len(ngram_keys) == 0:
+        return []
+    lookup = np.array(encoded, dtype=ngram_keys.dtype)
+    positions = np.searchsorted(ngram_keys, lookup)
+    in_range = positions < len(ngram_keys)
+    positions, lookup = positions[in_range], lookup[in_range]
+    found = positions[ngram_keys[positions] == lookup]
+    offsets = ngram_index["posting_offsets"]
+    return [
+        ngram_index["posting_ids"][offsets[pos] : offsets[pos + 1]] for pos in found
+    ]
+
+
+def get_candidate_ids(
+    query: str,
+    ngram_index: dict,
+    min_shared_ratio: float = 0.5,
+) -> np.ndarray:
+    """Given a query and an n-gram index, return the ids of candidates sharing enough n-grams with it.
+
+    A candidate is kept when it shares at least `min_shared_ratio` of the query n-grams (and at least one).
+    Lower ratios keep more candidates (higher recall), higher ratios prune more aggressively.
+    """
+    query_grams = get_ngrams(sort_tokens(query), ngram_index["ngram_size"])
+    posting_lists = get_posting_lists(ngram_index, query_grams)
+    if len(posting_lists) == 0:
+        return np.empty(0, dtype=np.int32)
+    shared_counts = np.bincount(
+        np.concatenate(posting_lists), minlength=ngram_index["size"]
+    )
+    min_shared = max(1, int(np.ceil(min_shared_ratio * len(query_grams))))
+    return np.flatnonzero(shared_counts >= min_shared)
+
+
+def process_best_fuzzy_match_indexed(
+    queries: list["str"],
+    candidate_strings: list["str"],
+    ngram_index: dict = None,
+    score_cutoff: float = 70,
+    min_shared_ratio: float = 0.5,
+    stats: dict = None,
+    ngram_size: int = 3,
+) -> list["dict"]:
+    """Given set of input queries and matching candidates, run fuzzy matching only on n-gram pre-selected candidates.
+
+    Candidates can also be a `CandidateStore` (e.g. over a memory-mapped candidate index, with its persisted `ngram_index`),
+    only the pre-selected candidates of every query being decoded.
+    Queries without any candidate reaching the score cutoff are not part of the results.
+    If a `stats` dict is provided, the number of scored candidates is added to its `candidates_scored`.
+    """
+    if ngram_index is None:
+        ngram_index = build_ngram_index(candidate_strings, ngram_size)
+    if not isinstance(candidate_strings, CandidateStore):
+        candidate_strings = np.asarray(candidate_strings, dtype=object)
+    results = []
+    candidates_scored = 0
+    for query in queries:
+        candidate_ids = get_candidate_ids(query, ngram_index, min_shared_ratio)
+        candidates_scored += len(candidate_ids)
+        if len(candidate_ids) == 0:
+            continue
+        best_candidate = extractOne(
+            query=query,
+            choices=take_candidate_strings(candidate_strings, candidate_ids),
+            scorer=token_sort_ratio,
+            score_cutoff=score_cutoff,
+        )
+        if best_candidate is None:
+            continue
+        results.append(
+            {
+                "string_to_match": query,
+                "similarity_score": best_candidate[1],
+                "matched_string": best_candidate[0],
+            }
+        )
+    if stats is not None:
+        stats["candidates_scored"] = stats.get("candidates_scored", 0) + candidates_scored
+    return results
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,165 @@
+import os
+import weakref
+import logging
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import pandas as pd
+from rapidfuzz.process import cdist
+from rapidfuzz.fuzz import token_sort_ratio
+from fuzzy_matcher.matcher.candidate_store import (
+    get_candidate_store,
+    share_candidate_store,
+    attach_candidate_store,
+)
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+# candidates attached by every worker process of the pool, once, in the pool initializer
+WORKER_CANDIDATES = None
+WORKER_BLOCK = None
+# candidates decoded at a time by a worker, scored against a whole chunk of queries
+WORKER_CANDIDATE_BLOCK_SIZE = 65536
+
+
+def share_candidates(candidate_strings) -> tuple[SharedMemory, dict]:
+    """Given candidate strings (or a candidate store), copy them once to a shared memory block.
+
+    Returns the shared memory block, to be closed and unlinked by the owner, and the spec workers need to attach to it.
+    """
+    return share_candidate_store(get_candidate_store(candidate_strings))
+
+
+def release_shared_block(shared_block: SharedMemory) -> None:
+    """Given a shared memory block owned by the current process, close and unlink it."""
+    shared_block.close()
+    shared_block.unlink()
+
+
+class SharedCandidates:
+    """Candidates copied once to a shared memory block, attached by the workers of every pool matching against them.
+
+    The block is unlinked on `close`, or when the object is garbage collected, so a long-running pipeline or service
+    shares its candidates once instead of once per matcher call.
+    """
+
+    def __init__(self, candidate_strings):
+        self.shared_block, self.spec = share_candidates(candidate_strings)
+        self.finalizer = weakref.finalize(self, release_shared_block, self.shared_block)
+
+    def close(self) -> None:
+        """Release the shared memory block."""
+        self.finalizer()
+
+
+def attach_candidates(spec: dict) -> None:
+    """Given the spec of a shared candidates block, attach the current worker process to it, without copying the candidates."""
+    global WORKER_CANDIDATES, WORKER_BLOCK
+    WORKER_BLOCK, WORKER_CANDIDATES = attach_candidate_store(spec)
+
+
+def detach_candidates() -> None:
+    """Release the candidates attached by the current process."""
+    global WORKER_CANDIDATES, WORKER_BLOCK
+    # the store views have to be released before closing the block
+    WORKER_CANDIDATES = None
+    if WORKER_BLOCK is not None:
+        WORKER_BLOCK.close()
+        WORKER_BLOCK = None
+
+
+def match_query_chunk(task: tuple) -> list["tuple"]:
+    """Given a (queries, scorer, score_cutoff) task, match every query against the worker candidates.
+
+    Candidates are decoded and scored one block at a time, so a worker never holds all of them as Python strings.
+    As with extractOne, the first candidate with the best score is kept, and only if it reaches the score cutoff.
+    """
+    queries, scorer, score_cutoff = task
+    best_scores = np.full(len(queries), -1.0)
+    best_indexes = np.full(len(queries), -1, dtype=np.int64)
+    best_candidates = np.full(len(queries), None, dtype=object)
+    for block_start in range(0, len(WORKER_CANDIDATES), WORKER_CANDIDATE_BLOCK_SIZE):
+        block_end = min(block_start + WORKER_CANDIDATE_BLOCK_SIZE, len(WORKER_CANDIDATES))
+        block_candidates = WORKER_CANDIDATES.get_strings(block_start, block_end)
+        score_mat = cdist(
+            queries, block_candidates, scorer=scorer, score_cutoff=score_cutoff, dtype=np.float64, workers=1
+        )
+        row_best = score_mat.argmax(axis=1)
+        row_scores = score_mat[np.arange(len(queries)), row_best]
+        # cdist zeroes scores under the cutoff, which extractOne never returns
+        is_valid = (row_scores >= score_cutoff) if score_cutoff else np.full(len(queries), True)
+        improved = is_valid & (row_scores > best_scores)
+        best_scores[improved] = row_scores[improved]
+        best_indexes[improved] = row_best[improved] + block_start
+        best_candidates[improved] = block_candidates[row_best[improved]]
+    return [
+        (query, None, 0.0, -1) if best_index < 0 else (query, best_candidate, best_score, best_index)
+        for query, best_candidate, best_score, best_index in zip(
+            queries, best_candidates, best_scores.tolist(), best_indexes.tolist()
+        )
+    ]
+
+
+def iterate_best_fuzzy_match_parallel(
+    queries: list["str"],
+    candidate_strings: list["str"],
+    workers: int = None,
+    chunk_size: int = 1000,
+    scorer=token_sort_ratio,
+    score_cutoff: float = None,
+    shared_candidates: SharedCandidates = None,
+):
+    """Given set of input queries and matching candidates, run fuzzy matching over a process pool.
+
+    Queries are sharded in chunks of `chunk_size` and the matches of every chunk are yielded back in the queries order,
+    as (query, match, score, match index) tuples. Candidates (strings or a candidate store) are shared once with all the
+    workers through shared memory, as a compact candidate store, instead of being pickled to each of them.
+    If `shared_candidates` are provided, the workers attach to them and `candidate_strings` are not shared again.
+    The scorer should be a picklable (module level) function.
+    """
+    workers = workers or os.cpu_count()
+    owned_candidates = shared_candidates is None
+    if owned_candidates:
+        shared_candidates = SharedCandidates(candidate_strings)
+    spec = shared_candidates.spec
+    try:
+        tasks = (
+            (queries[chunk_start : chunk_start + chunk_size], scorer, score_cutoff)
+            for chunk_start in range(0, len(queries), chunk_size)
+        )
+        with Pool(processes=workers, initializer=attach_candidates, initargs=(spec,)) as pool:
+            processed = 0
+            for matches in pool.imap(match_query_chunk, tasks):
+                processed += len(matches)
+                logging.info(f"Processed {processed} records !")
+                yield matches
+    finally:
+        if owned_candidates:
+            shared_candidates.close()
+
+
+def process_best_fuzzy_match_parallel(
+    queries: list["str"],
+    candidate_strings: list["str"],
+    workers: int = None,
+    chunk_size: int = 1000,
+    scorer=token_sort_ratio,
+    score_cutoff: float = None,
+    shared_candidates: SharedCandidates = None,
+) -> pd.DataFrame:
+    """Given set of input queries and matching candidates, run fuzzy matching in parallel, with the baseline output."""
+    matches = []
+    for chunk_matches in iterate_best_fuzzy_match_parallel(
+        queries, candidate_strings, workers, chunk_size, scorer, score_cutoff, shared_candidates
+    ):
+        matches.extend(chunk_matches)
+    return pd.DataFrame(matches)
+
+
+if __name__ == "__main__":
+    pass
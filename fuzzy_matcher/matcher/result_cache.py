@@ -0,0 +1,212 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from fuzzy_matcher.matcher.match_datasets import process_best_fuzzy_match_streaming
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+CACHE_COLUMNS = ["string_to_match", "matched_string", "similarity_score"]
+# matcher options the scores depend on, the other options (memory budget, workers, chunk sizes, index paths and
+# prebuilt indexes) only change how the matches are computed
+SCORE_OPTIONS = ["score_cutoff", "scorer", "dtype", "ngram_size", "ngram_length", "min_shared_ratio", "top_n", "top_pairs"]
+
+
+def get_candidates_fingerprint(candidate_names: pd.Series) -> str:
+    """Given the candidate names, get a fingerprint of the candidates set (independent of their order)."""
+    name_hashes = np.sort(pd.util.hash_pandas_object(candidate_names, index=False).to_numpy())
+    return hashlib.sha256(name_hashes.tobytes()).hexdigest()
+
+
+def get_empty_result_cache(config: dict) -> dict:
+    """Given a matcher configuration, get an empty result cache for it."""
+    return {
+        "config": config,
+        "fingerprint": None,
+        "candidates": np.empty(0, dtype=object),
+        "results": pd.DataFrame(columns=CACHE_COLUMNS),
+        "pending": [],
+    }
+
+
+def get_cache_config(matcher: str, matcher_options: dict = None) -> dict:
+    """Given the matcher and its options, get the (json compatible) configuration the cached results depend on, its SCORE_OPTIONS only."""
+    score_options = {key: value for key, value in (matcher_options or {}).items() if key in SCORE_OPTIONS}
+    return json.loads(
+        json.dumps({"matcher": matcher, "matcher_options": score_options}, default=str, sort_keys=True)
+    )
+
+
+def load_result_cache(cache_path: str, config: dict) -> dict:
+    """Given a cache directory and the matcher configuration, load the persisted result cache.
+
+    A missing cache, or a cache built with another matcher configuration, gives an empty cache.
+    """
+    manifest_path = f"{cache_path}/manifest.json"
+    if not os.path.exists(manifest_path):
+        logging.info("No result cache found, starting from an empty one !")
+        return get_empty_result_cache(config)
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest["config"] != config:
+        logging.info("Matcher configuration changed, starting from an empty result cache !")
+        return get_empty_result_cache(config)
+    results = pd.read_parquet(f"{cache_path}/results.parquet")
+    logging.info(f"Loaded {results.shape[0]} cached results !")
+    return {
+        "config": config,
+        "fingerprint": manifest["fingerprint"],
+        "candidates": pd.read_parquet(f"{cache_path}/candidates.parquet")[
+            "full_name_processed"
+        ].to_numpy(dtype=object),
+        "results": results,
+        "pending": [],
+    }
+
+
+def consolidate_result_cache(result_cache: dict) -> None:
+    """Given a result cache, concatenate its results added since the last consolidation to its results, once."""
+    if len(result_cache["pending"]) == 0:
+        return
+    result_cache["results"] = pd.concat(
+        [result_cache["results"]] + [new_results for new_results, _ in result_cache["pending"]],
+        ignore_index=True,
+    )
+    result_cache["pending"] = []
+    result_cache.pop("index", None)
+
+
+def save_result_cache(result_cache: dict, cache_path: str) -> None:
+    """Given a result cache, persist it to the cache directory.
+
+    Every file is written to a temporary path and moved to its final path in a single step, the manifest last.
+    """
+    consolidate_result_cache(result_cache)
+    os.makedirs(cache_path, exist_ok=True)
+    result_cache["results"].to_parquet(f"{cache_path}/results.parquet.tmp", index=False)
+    pd.DataFrame({"full_name_processed": result_cache["candidates"]}).to_parquet(
+        f"{cache_path}/candidates.parquet.tmp", index=False
+    )
+    with open(f"{cache_path}/manifest.json.tmp", "w") as manifest_file:
+        json.dump(
+            {"config": result_cache["config"], "fingerprint": result_cache["fingerprint"]},
+            manifest_file,
+        )
+    for file_name in ["results.parquet", "candidates.parquet", "manifest.json"]:
+        os.replace(f"{cache_path}/{file_name}.tmp", f"{cache_path}/{file_name}")
+    logging.info(f"Saved {result_cache['results'].shape[0]} results to cache : {cache_path} !")
+
+
+def refresh_result_cache(
+    result_cache: dict,
+    candidates: pd.DataFrame,
+    score_cutoff: float = 70,
+    incremental: bool = True,
+) -> dict:
+    """Given a result cache and the current candidates, invalidate or update only the results the candidates changes can affect.
+
+    Results matched to a removed candidate are invalidated. The other results can only be improved by the added
+    candidates, so their queries are scored (token_sort_ratio) against the added candidates only, keeping the best of both.
+    The `score_cutoff` is the one of the matcher which filled the cache (None for no cutoff).
+    For matchers with other scores, `incremental` should be disabled, to invalidate all the results on any change.
+    """
+    fingerprint = get_candidates_fingerprint(candidates["full_name_processed"])
+    if fingerprint == result_cache["fingerprint"]:
+        return result_cache
+
+    consolidate_result_cache(result_cache)
+    results = result_cache["results"]
+    if not incremental:
+        logging.info("Candidates changed, all cached results invalidated !")
+        results = pd.DataFrame(columns=CACHE_COLUMNS)
+    if results.shape[0] > 0:
+        current_names = pd.Index(candidates["full_name_processed"])
+        removed = pd.Index(result_cache["candidates"]).difference(current_names)
+        added = current_names.difference(pd.Index(result_cache["candidates"]))
+        results = results[~results["matched_string"].isin(removed)].reset_index(drop=True)
+        logging.info(
+            f"Candidates changed (+{len(added)} / -{len(removed)}), {result_cache['results'].shape[0] - results.shape[0]} cached results invalidated !"
+        )
+        if len(added) > 0 and results.shape[0] > 0:
+            added_matches = process_best_fuzzy_match_streaming(
+                results["string_to_match"].to_numpy(),
+                added.to_numpy(dtype=object),
+                score_cutoff=score_cutoff,
+            )
+            improved = (
+                added_matches["similarity_score"].to_numpy()
+                > results["similarity_score"].to_numpy()
+            )
+            results.loc[improved, "matched_string"] = added_matches["matched_string"].to_numpy()[improved]
+            results.loc[improved, "similarity_score"] = added_matches["similarity_score"].to_numpy()[improved]
+            logging.info(f"{improved.sum()} cached results improved by the added candidates !")
+
+    return {
+        "config": result_cache["config"],
+        "fingerprint": fingerprint,
+        "candidates": candidates["full_name_processed"].to_numpy(dtype=object),
+        "results": results,
+        "pending": [],
+    }
+
+
+def lookup_result_cache(result_cache: dict, queries: np.ndarray) -> np.ndarray:
+    """Given a result cache and queries, get the positions of the queries cached results (-1 for the cache misses).
+
+    Positions run over the consolidated results, then over the results added since, in the order they were added.
+    """
+    if "index" not in result_cache:
+        result_cache["index"] = pd.Index(result_cache["results"]["string_to_match"])
+    positions = np.full(len(queries), -1, dtype=np.int64)
+    offset = 0
+    for results, results_index in [(result_cache["results"], result_cache["index"])] + result_cache["pending"]:
+        part_positions = results_index.get_indexer(queries)
+        is_found = (part_positions >= 0) & (positions < 0)
+        positions[is_found] = part_positions[is_found] + offset
+        offset += results.shape[0]
+    return positions
+
+
+def get_cached_results(result_cache: dict, positions: np.ndarray) -> pd.DataFrame:
+    """Given a result cache and positions of cached results (`lookup_result_cache`), get these results, in the positions order."""
+    parts = [result_cache["results"]] + [results for results, _ in result_cache["pending"]]
+    if len(parts) == 1:
+        return result_cache["results"].iloc[positions]
+    bounds = np.cumsum([0] + [results.shape[0] for results in parts])
+    part_ids = np.searchsorted(bounds, positions, side="right") - 1
+    order = np.argsort(part_ids, kind="stable")
+    selected = [
+        parts[part_id].iloc[positions[order][part_ids[order] == part_id] - bounds[part_id]]
+        for part_id in np.unique(part_ids)
+    ]
+    if len(selected) == 0:
+        return result_cache["results"].iloc[[]]
+    return pd.concat(selected).iloc[np.argsort(order, kind="stable")]
+
+
+def update_result_cache(
+    result_cache: dict, queries: np.ndarray, matched_df: pd.DataFrame
+) -> None:
+    """Given a result cache, the matched queries and their matches, add them to the cache.
+
+    Queries without a match are cached too, with a null match and a zero score, so they are not matched again.
+    New results are kept aside (with their lookup index) and only concatenated to the cached results once, when
+    the cache is saved, so adding the results of every chunk of a streaming run doesn't copy the whole cache.
+    """
+    new_results = (
+        pd.DataFrame({"string_to_match": queries})
+        .merge(matched_df[CACHE_COLUMNS], on="string_to_match", how="left")
+        .fillna({"similarity_score": 0.0})
+    )
+    result_cache["pending"].append((new_results, pd.Index(new_results["string_to_match"])))
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,306 @@
+import os
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from rapidfuzz.fuzz import token_sort_ratio
+from rapidfuzz.process import cpdist
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+from fuzzy_matcher.matcher.candidate_store import encode_strings, decode_strings
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+TFIDF_FORMAT_VERSION = 1
+
+
+def get_candidates_hash(candidate_strings: list["str"], ngram_size: int = 3) -> str:
+    """Given the candidates, get a hash of their (ordered) values, combined with the tf-idf build parameters."""
+    candidates_hash = hashlib.sha256(f"v{TFIDF_FORMAT_VERSION};ngram_size={ngram_size};".encode("utf-8"))
+    candidates_hash.update(
+        pd.util.hash_pandas_object(pd.Series(candidate_strings, dtype=object), index=False)
+        .to_numpy()
+        .tobytes()
+    )
+    return candidates_hash.hexdigest()
+
+
+def get_ngram_vectorizer(ngram_size: int, vocabulary: list["str"] = None) -> CountVectorizer:
+    """Given the n-gram size and an optional fitted vocabulary, get the character n-gram counts vectorizer."""
+    return CountVectorizer(
+        analyzer="char",
+        ngram_range=(ngram_size, ngram_size),
+        lowercase=False,  # strings are already normalized
+        vocabulary=None if vocabulary is None else {ngram: i for i, ngram in enumerate(vocabulary)},
+        dtype=np.float32,
+    )
+
+
+def fit_tfidf_index(candidate_strings: list["str"], ngram_size: int = 3) -> dict:
+    """Given the candidates, fit the character n-gram tf-idf model and get the L2-normalized candidates matrix.
+
+    Idf weights are smoothed as in scikit-learn : ln((1 + n) / (1 + df)) + 1. The (n-grams x candidates) transposed
+    matrix the queries are multiplied with is kept in the index, so it is built once and not on every scoring call.
+    """
+    candidates = np.asarray(candidate_strings, dtype=object)
+    vectorizer = get_ngram_vectorizer(ngram_size)
+    counts = vectorizer.fit_transform(candidates).tocsc()
+    document_frequency = np.diff(counts.indptr)
+    idf = (np.log((1 + len(candidates)) / (1 + document_frequency)) + 1).astype(np.float32)
+    vocabulary = vectorizer.get_feature_names_out().astype(object)
+    tfidf_index = {
+        "fingerprint": get_candidates_hash(candidates, ngram_size),
+        "ngram_size": ngram_size,
+        "candidates": candidates,
+        "vocabulary": vocabulary,
+        "idf": idf,
+        "matrix": normalize(counts.tocsr().multiply(idf).tocsr()).astype(np.float32),
+    }
+    tfidf_index["transposed_matrix"] = tfidf_index["matrix"].T.tocsr()
+    tfidf_index["vectorizer"] = get_ngram_vectorizer(ngram_size, vocabulary)
+    return tfidf_index
+
+
+def vectorize_queries(queries: list["str"], tfidf_index: dict) -> sparse.csr_matrix:
+    """Given queries and a fitted tf-idf index, get the L2-normalized tf-idf matrix of the queries (unknown n-grams are ignored)."""
+    counts = tfidf_index["vectorizer"].transform(np.asarray(queries, dtype=object))
+    return normalize(counts.multiply(tfidf_index["idf"]).tocsr()).astype(np.float32)
+
+
+def save_tfidf_index(tfidf_index: dict, index_path: str) -> None:
+    """Given a fitted tf-idf index, persist it to a single npz file, written atomically."""
+    names, name_offsets = encode_strings(tfidf_index["candidates"])
+    ngrams, ngram_offsets = encode_strings(tfidf_index["vocabulary"])
+    matrix = tfidf_index["matrix"]
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as index_file:
+        np.savez(
+            index_file,
+            fingerprint=np.array(tfidf_index["fingerprint"]),
+            ngram_size=np.array(tfidf_index["ngram_size"]),
+            names=names,
+            name_offsets=name_offsets,
+            ngrams=ngrams,
+            ngram_offsets=ngram_offsets,
+            idf=tfidf_index["idf"],
+            data=matrix.data,
+            indices=matrix.indices,
+            indptr=matrix.indptr,
+            shape=np.array(matrix.shape),
+        )
+    os.replace(tmp_path, index_path)
+    logging.info(f"Saved tf-idf index ({matrix.shape[0]} candidates, {matrix.shape[1]} n-grams) to : {index_path} !")
+
+
+def load_tfidf_index(index_path: str) -> dict:
+    """Given a tf-idf index path, load the fitted tf-idf index (the transposed matrix being built once, on load)."""
+    with np.load(index_path) as arrays:
+        vocabulary = np.asarray(decode_strings(arrays["ngrams"], arrays["ngram_offsets"]), dtype=object)
+        ngram_size = int(arrays["ngram_size"])
+        matrix = sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(arrays["shape"]))
+        return {
+            "fingerprint": str(arrays["fingerprint"]),
+            "ngram_size": ngram_size,
+            "candidates": np.asarray(decode_strings(arrays["names"], arrays["name_offsets"]), dtype=object),
+            "vocabulary": vocabulary,
+            "idf": arrays["idf"],
+            "matrix": matrix,
+            "transposed_matrix": matrix.T.tocsr(),
+            "vectorizer": get_ngram_vectorizer(ngram_size, vocabulary),
+        }
+
+
+def load_or_build_tfidf_index(
+    candidate_strings: list["str"], index_path: str, ngram_size: int = 3
+) -> dict:
+    """Given the candidates and the tf-idf index path, load the persisted index, fitting and persisting it again only if the candidates changed."""
+    fingerprint = get_candidates_hash(candidate_strings, ngram_size)
+    if os.path.exists(index_path):
+        tfidf_index = load_tfidf_index(index_path)
+        if tfidf_index["fingerprint"] == fingerprint:
+            return tfidf_index
+        logging.info("Candidates changed since the tf-idf index was fitted, fitting it again !")
+    tfidf_index = fit_tfidf_index(candidate_strings, ngram_size)
+    save_tfidf_index(tfidf_index, index_path)
+    return tfidf_index
+
+
+def select_sparse_top_k(scores: sparse.csr_matrix, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Given a sparse (queries x candidates) scores matrix, get the k best scores and candidate indexes of every row.
+
+    Ties are broken by the lowest candidate index; missing entries get a zero score and a -1 index.
+    """
+    n_rows = scores.shape[0]
+    top_scores = np.zeros((n_rows, k), dtype=np.float32)
+    top_indexes = np.full((n_rows, k), -1, dtype=np.int64)
+    for row in range(n_rows):
+        row_scores = scores.data[scores.indptr[row] : scores.indptr[row + 1]]
+        row_indexes = scores.indices[scores.indptr[row] : scores.indptr[row + 1]]
+        if len(row_scores) > k:
+            # keep every score tied with the k-th best, then break the ties deterministically
+            kth_score = -np.partition(-row_scores, k - 1)[k - 1]
+            is_top = row_scores >= kth_score
+            row_scores, row_indexes = row_scores[is_top], row_indexes[is_top]
+        order = np.lexsort((row_indexes, -row_scores))[:k]
+        top_scores[row, : len(order)] = row_scores[order]
+        top_indexes[row, : len(order)] = row_indexes[order]
+    return top_scores, top_indexes
+
+
+def get_tfidf_top_k(
+    queries: np.ndarray,
+    tfidf_index: dict,
+    k: int,
+    score_cutoff: float = 0,
+    chunk_size: int = 200,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Given queries and a fitted tf-idf index, get the k best cosine scores (0-100) and candidate indexes of every query.
+
+    Queries are scored `chunk_size` at a time, as a sparse product with the candidates matrix, so memory is bounded
+    by the chunk scores.
+    """
+    candidates_t = tfidf_index["transposed_matrix"]
+    top_scores = np.zeros((len(queries), k), dtype=np.float32)
+    top_indexes = np.full((len(queries), k), -1, dtype=np.int64)
+    for query_start in range(0, len(queries), chunk_size):
+        query_end = min(query_start + chunk_size, len(queries))
+        scores = (vectorize_queries(queries[query_start:query_end], tfidf_index) @ candidates_t).tocsr()
+        # float32 rounding can put identical strings slightly over 100
+        scores.data = np.minimum(scores.data * 100, 100)
+        scores.data[scores.data < score_cutoff] = 0
+        scores.eliminate_zeros()
+        top_scores[query_start:query_end], top_indexes[query_start:query_end] = select_sparse_top_k(scores, k)
+    return top_scores, top_indexes
+
+
+def process_top_k_tfidf_match(
+    queries: list["str"],
+    tfidf_index: dict,
+    k: int = 3,
+    score_cutoff: float = 0,
+    chunk_size: int = 200,
+) -> pd.DataFrame:
+    """Given set of input queries and a fitted tf-idf index, get the k best matches of every query by cosine similarity.
+
+    Queries are matched `chunk_size` at a time (see `get_tfidf_top_k`). Scores are scaled to 0-100, as the rapidfuzz scores, and the output has the same schema
+    as `process_top_k_fuzzy_match_streaming` : queries without a match over the cutoff get a single rank 1 row
+    with a null `matched_string` and a `match_index` of -1.
+    """
+    columns = [
+        "string_to_match",
+        "match_rank",
+        "similarity_score",
+        "matched_string",
+        "match_index",
+    ]
+    if k < 1:
+        logging.error("Provided k should be at least 1, skipping evaluation !")
+        return pd.DataFrame(columns=columns)
+    if len(tfidf_index["candidates"]) == 0:
+        logging.error("No candidates provided, skipping evaluation !")
+        return pd.DataFrame(columns=columns)
+
+    query_array = np.asarray(queries, dtype=object)
+    top_scores, top_indexes = get_tfidf_top_k(query_array, tfidf_index, k, score_cutoff, chunk_size)
+
+    keep = top_indexes >= 0
+    keep[:, 0] = True
+    query_positions, ranks = np.nonzero(keep)
+    kept_indexes = top_indexes[keep]
+    return pd.DataFrame(
+        {
+            "string_to_match": query_array[query_positions],
+            "match_rank": ranks + 1,
+            "similarity_score": top_scores[keep],
+            "matched_string": np.where(
+                kept_indexes >= 0,
+                tfidf_index["candidates"][np.maximum(kept_indexes, 0)],
+                None,
+            ),
+            "match_index": kept_indexes,
+        },
+        columns=columns,
+    )
+
+
+def process_best_tfidf_match(
+    queries: list["str"],
+    tfidf_index: dict,
+    score_cutoff: float = 0,
+    chunk_size: int = 200,
+) -> pd.DataFrame:
+    """Given set of input queries and a fitted tf-idf index, get the best match of every query, as `process_best_fuzzy_match_streaming`."""
+    matched_df = process_top_k_tfidf_match(queries, tfidf_index, 1, score_cutoff, chunk_size)
+    return matched_df.drop(columns="match_rank")
+
+
+def process_best_rerank_match(
+    queries: list["str"],
+    tfidf_index: dict,
+    top_n: int = 50,
+    score_cutoff: float = 70,
+    chunk_size: int = 200,
+    stats: dict = None,
+) -> pd.DataFrame:
+    """Given set of input queries and a fitted tf-idf index, retrieve the top-n candidates of every query by tf-idf and rerank them with `token_sort_ratio`.
+
+    Only `top_n` candidates per query are scored by `token_sort_ratio`, instead of all of them. The output has the
+    same schema as `process_best_fuzzy_match_streaming`, ties being broken by the lowest candidate index.
+    If a `stats` dict is provided, the number of reranked candidates is added to its `candidates_scored`.
+    """
+    columns = ["string_to_match", "similarity_score", "matched_string", "match_index"]
+    if top_n < 1:
+        logging.error("Provided top_n should be at least 1, skipping evaluation !")
+        return pd.DataFrame(columns=columns)
+    if len(tfidf_index["candidates"]) == 0:
+        logging.error("No candidates provided, skipping evaluation !")
+        return pd.DataFrame(columns=columns)
+
+    query_array = np.asarray(queries, dtype=object)
+    _, retrieved_indexes = get_tfidf_top_k(query_array, tfidf_index, top_n, chunk_size=chunk_size)
+    is_retrieved = retrieved_indexes >= 0
+    query_positions = np.nonzero(is_retrieved)[0]
+    rerank_scores = np.zeros(retrieved_indexes.shape, dtype=np.float32)
+    rerank_scores[is_retrieved] = cpdist(
+        query_array[query_positions],
+        tfidf_index["candidates"][retrieved_indexes[is_retrieved]],
+        scorer=token_sort_ratio,
+        score_cutoff=score_cutoff,
+        dtype=np.float32,
+        workers=-1,
+    )
+    if stats is not None:
+        stats["candidates_scored"] = stats.get("candidates_scored", 0) + len(query_positions)
+
+    # best reranked score of every query, on ties the lowest candidate index
+    order = np.lexsort(
+        (np.where(is_retrieved, retrieved_indexes, np.iinfo(np.int64).max), -rerank_scores), axis=1
+    )
+    best_positions = order[:, 0]
+    best_scores = np.take_along_axis(rerank_scores, order[:, :1], axis=1)[:, 0]
+    best_indexes = np.where(
+        best_scores > 0, retrieved_indexes[np.arange(len(query_array)), best_positions], -1
+    )
+    return pd.DataFrame(
+        {
+            "string_to_match": query_array,
+            "similarity_score": best_scores,
+            "matched_string": np.where(
+                best_indexes >= 0,
+                tfidf_index["candidates"][np.maximum(best_indexes, 0)],
+                None,
+            ),
+            "match_index": best_indexes,
+        },
+        columns=columns,
+    )
+
+
+if __name__ == "__main__":
+    pass
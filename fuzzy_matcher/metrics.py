@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import time
+import logging
+import resource
+from contextlib import contextmanager
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+METRICS_PREFIX = "fuzzy_matcher_stage"
+# exported per stage metrics : (name, prometheus help)
+STAGE_METRICS = [
+    ("wall_seconds", "Wall time of the stage, in seconds."),
+    ("rows_in", "Rows going into the stage."),
+    ("rows_out", "Rows coming out of the stage."),
+    ("candidates_scored", "Query / candidate pairs scored by the stage."),
+    ("rows_per_second", "Rows going into the stage, per second of wall time (queries per second for fuzzy scoring)."),
+    ("peak_rss_mb", "Peak resident memory of the process during the stage, in MB."),
+]
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak resident memory of the current process, so it can be measured per stage (linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss_mb() -> float:
+    """Get the peak resident memory (MB) of the current process, since the last reset if it can be reset."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # linux reports kilobytes, macOS bytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+class PipelineMetrics:
+    """Collects the wall time, rows in/out, candidates scored and peak memory of every stage of a pipeline run.
+
+    Stages run more than once (e.g. once per chunk) are aggregated : times, rows and candidates are summed
+    and the peak memory is the highest one.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        """Given a stage name, measure the enclosed block; the yielded record can be completed with `rows_out` and `candidates_scored`."""
+        record = {"rows_in": rows_in, "rows_out": None, "candidates_scored": None}
+        reset_peak_rss()
+        tic = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - tic
+            record["peak_rss_mb"] = get_peak_rss_mb()
+            self.add_stage(name, record)
+
+    def add_stage(self, name: str, record: dict) -> None:
+        """Given a stage name and the record of one of its runs, add it to the stage metrics."""
+        if name not in self.stages:
+            self.stages[name] = {"runs": 0}
+        stage = self.stages[name]
+        stage["runs"] += 1
+        for key in ["wall_seconds", "rows_in", "rows_out", "candidates_scored"]:
+            if record.get(key) is not None:
+                stage[key] = stage.get(key, 0) + record[key]
+        stage["peak_rss_mb"] = max(stage.get("peak_rss_mb", 0.0), record["peak_rss_mb"])
+
+    def get_metrics(self) -> dict:
+        """Get the metrics of the run, with one entry per stage in the order they first ran."""
+        stages = []
+        for name, stage in self.stages.items():
+            wall_seconds, rows_in = stage.get("wall_seconds", 0.0), stage.get("rows_in")
+            stages.append(
+                {
+                    "stage": name,
+                    "runs": stage["runs"],
+                    "wall_seconds": wall_seconds,
+                    "rows_in": rows_in,
+                    "rows_out": stage.get("rows_out"),
+                    "candidates_scored": stage.get("candidates_scored"),
+                    "rows_per_second": rows_in / wall_seconds
+                    if rows_in is not None and wall_seconds > 0
+                    else None,
+                    "peak_rss_mb": stage["peak_rss_mb"],
+                }
+            )
+        return {"pipeline": self.pipeline, "started": self.started, "stages": stages}
+
+
+def export_metrics_json(metrics: dict, export_path: str) -> None:
+    """Given the metrics of a run, save them to a json file."""
+    with open(export_path, "w") as export_file:
+        json.dump(metrics, export_file, indent=2)
+    logging.info(f"Exported metrics to : {export_path} !")
+
+
+def export_metrics_prometheus(metrics: dict, export_path: str) -> None:
+    """Given the metrics of a run, save them as a Prometheus textfile (for the node exporter textfile collector).
+
+    The file is written atomically, so the collector never reads a partial file.
+    """
+    lines = []
+    for metric, description in STAGE_METRICS:
+        lines.append(f"# HELP {METRICS_PREFIX}_{metric} {description}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_{metric} gauge")
+        for stage in metrics["stages"]:
+            if stage[metric] is not None:
+                labels = f'pipeline="{metrics["pipeline"]}",stage="{stage["stage"]}"'
+                lines.append(f"{METRICS_PREFIX}_{metric}{{{labels}}} {stage[metric]}")
+    tmp_path = f"{export_path}.tmp"
+    with open(tmp_path, "w") as export_file:
+        export_file.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, export_path)
+    logging.info(f"Exported Prometheus metrics to : {export_path} !")
+
+
+if __name__ == "__main__":
+    pass
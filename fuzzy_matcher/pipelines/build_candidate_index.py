@@ -0,0 +1,25 @@
+import time
+from fuzzy_matcher.matcher.candidate_index import load_or_build_candidate_index
+
+# Pipe Config
+PRIMARY_FILE_PATH = "input_data/primary_names_dataset.csv"
+INDEX_PATH = "input_data/primary_names_index.fzi"
+NGRAM_SIZE = 3
+
+if __name__ == "__main__":
+    tic = time.perf_counter()
+
+    print("Starting Candidate Index build process !")
+
+    # the index is rebuilt only if the primary dataset changed since the last build
+    candidate_index = load_or_build_candidate_index(
+        primary_file_path=PRIMARY_FILE_PATH,
+        index_path=INDEX_PATH,
+        ngram_size=NGRAM_SIZE,
+    )
+
+    toc = time.perf_counter()
+    elapsed = round(toc - tic, 2)
+    print(
+        f"Candidate index ready ({candidate_index['size']} candidates). Elapsed : {elapsed} s"
+    )
@@ -1,9 +1,8 @@
 from fuzzy_matcher.generator.generate_data import (
     read_data,
-    expand_names_dataframe,
-    noisify_dataframe,
-    export_data,
+    iterate_generated_datasets,
 )
+from fuzzy_matcher.dataset_io import DatasetAppender
 import time
 
 # Pipe Config
@@ -11,6 +10,9 @@ BASE_INPUT_FILE_PATH = "input_data/Customer_Names.csv"
 CROSSING_LIMIT = 500  # this will generate 1.000.000 records in the names Dataframe
 NOISIFICATION_SAMPLE = 0.4  # this will dictate the percentage of the primary DataFrame that will contain noise
 GENERATION_TARGET_PATH = "input_data/"
+GENERATION_FORMAT = "csv"  # csv or parquet
+GENERATION_CHUNK_SIZE = 1000000  # records generated and exported at a time
+GENERATION_SEED = 42  # same seed and chunk size generate the same datasets
 
 if __name__ == "__main__":
     # first, read the original file data
@@ -20,29 +22,29 @@ if __name__ == "__main__":
 
     input_names_df = read_data(BASE_INPUT_FILE_PATH)
 
-    # generate the 2 datasets
-    # primary one will be just a crossing between first names and last_names
-    primary_df = expand_names_dataframe(
-        input_df=input_names_df, list_limit=CROSSING_LIMIT
-    )
-
-    # secondary one will be generated from the first, containig
-    secondary_df = noisify_dataframe(
-        input_df=primary_df, noise_sample_size=NOISIFICATION_SAMPLE
+    primary_appender = DatasetAppender(
+        f"{GENERATION_TARGET_PATH}/primary_names_dataset.{GENERATION_FORMAT}"
     )
-
-    # export the 2 datasets
-    export_data(
-        export_data=primary_df,
-        export_path="input_data/",
-        file_name="primary_names_dataset",
+    secondary_appender = DatasetAppender(
+        f"{GENERATION_TARGET_PATH}/secondary_names_dataset.{GENERATION_FORMAT}"
     )
 
-    export_data(
-        export_data=secondary_df,
-        export_path="input_data/",
-        file_name="secondary_names_dataset",
-    )
+    # generate the 2 datasets, chunk by chunk
+    # primary one will be just a crossing between first names and last_names
+    # secondary one will be generated from the first, containig noise
+    try:
+        for primary_chunk, secondary_chunk in iterate_generated_datasets(
+            input_df=input_names_df,
+            list_limit=CROSSING_LIMIT,
+            noise_sample_size=NOISIFICATION_SAMPLE,
+            chunk_size=GENERATION_CHUNK_SIZE,
+            seed=GENERATION_SEED,
+        ):
+            primary_appender.append(primary_chunk)
+            secondary_appender.append(secondary_chunk)
+    finally:
+        primary_appender.close()
+        secondary_appender.close()
 
     toc = time.perf_counter()
     elapsed = round(toc - tic, 2)
@@ -0,0 +1,804 @@
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+from rapidfuzz.process import cpdist
+from rapidfuzz.fuzz import token_sort_ratio
+from fuzzy_matcher.matcher.match_datasets import (
+    CANONICAL_STEPS,
+    get_canonical_names,
+    get_length_buckets,
+    preprocess_dataframe,
+    preprocess_records,
+    process_best_fuzzy_match_baseline,
+    process_best_fuzzy_match_streaming,
+)
+from fuzzy_matcher.metrics import PipelineMetrics
+from fuzzy_matcher.dataset_io import (
+    read_names_dataset,
+    iterate_names_dataset,
+    DatasetAppender,
+)
+from fuzzy_matcher.matcher.result_cache import (
+    SCORE_OPTIONS,
+    get_cache_config,
+    load_result_cache,
+    save_result_cache,
+    refresh_result_cache,
+    lookup_result_cache,
+    get_cached_results,
+    update_result_cache,
+)
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+RESULT_COLUMNS = [
+    "record_id",
+    "search_name_normalized",
+    "match_name_normalized",
+    "similarity_score",
+    "mapping_source",
+]
+MATCH_COLUMNS = ["string_to_match", "matched_string", "similarity_score"]
+
+
+def match_baseline(queries: pd.DataFrame, candidates: pd.DataFrame, **options) -> pd.DataFrame:
+    """Given the queries and candidates frames, run the sequential extractOne matching."""
+    matched_df = process_best_fuzzy_match_baseline(
+        queries=queries["full_name_processed"].to_numpy(),
+        candidates=candidates["full_name_processed"].to_numpy(),
+    )
+    matched_df.columns = ["string_to_match", "matched_string", "similarity_score", "match_index"]
+    return matched_df[MATCH_COLUMNS]
+
+
+def match_batch(queries: pd.DataFrame, candidates: pd.DataFrame, **options) -> pd.DataFrame:
+    """Given the queries and candidates frames, run the memory-budgeted cdist matching on the token-sorted keys.
+
+    The candidates are encoded and sorted by length on every call, unless their `candidate_store` and `candidate_buckets`
+    are provided (`get_batch_matcher_options`).
+    """
+    candidate_store = options.pop("candidate_store", None)
+    matched_df = process_best_fuzzy_match_streaming(
+        queries=queries["full_name_processed"].to_numpy(),
+        candidate_strings=candidates["full_name_processed"].to_numpy() if candidate_store is None else candidate_store,
+        query_keys=queries["full_name_sorted"].to_numpy(),
+        candidate_keys=None if "candidate_buckets" in options else candidates["full_name_sorted"].to_numpy(),
+        **options,
+    )
+    return matched_df[matched_df["match_index"] >= 0][MATCH_COLUMNS]
+
+
+def match_indexed(queries: pd.DataFrame, candidates: pd.DataFrame, **options) -> pd.DataFrame:
+    """Given the queries and candidates frames, run the matching on the n-gram pre-selected candidates.
+
+    The candidates are converted on every call, unless their `candidate_store` is provided (`get_index_matcher_options`).
+    """
+    import fuzzy_matcher.matcher.ngram_index as ngram
+
+    candidate_store = options.pop("candidate_store", None)
+    return pd.DataFrame(
+        ngram.process_best_fuzzy_match_indexed(
+            queries=queries["full_name_processed"].to_numpy(),
+            candidate_strings=candidates["full_name_processed"].to_numpy() if candidate_store is None else candidate_store,
+            **options,
+        ),
+        columns=MATCH_COLUMNS,
+    )
+
+
+def match_parallel(queries: pd.DataFrame, candidates: pd.DataFrame, **options) -> pd.DataFrame:
+    """Given the queries and candidates frames, run the extractOne matching over a process pool.
+
+    The candidates are encoded and copied to shared memory on every call, unless their `shared_candidates` are
+    provided (`get_batch_matcher_options`).
+    """
+    import fuzzy_matcher.matcher.parallel_match as parallel
+
+    matched_df = parallel.process_best_fuzzy_match_parallel(
+        queries=queries["full_name_processed"].to_numpy(),
+        candidate_strings=None if "shared_candidates" in options else candidates["full_name_processed"].to_numpy(),
+        **options,
+    )
+    matched_df.columns = ["string_to_match", "matched_string", "similarity_score", "match_index"]
+    return matched_df[matched_df["match_index"] >= 0][MATCH_COLUMNS]
+
+
+def match_matrix(queries: pd.DataFrame, candidates: pd.DataFrame, **options) -> pd.DataFrame:
+    """Given the queries and candidates frames, run the tf-idf + knn matching of the tfidf_matcher package."""
+    import tfidf_matcher as tm
+
+    matched_df = tm.matcher(
+        original=queries["full_name_processed"].to_numpy(),
+        lookup=candidates["full_name_processed"].to_numpy(),
+        k_matches=1,  # we are interested on getting the best match only
+        ngram_length=options.get("ngram_length", 3),
+    )
+    matched_df = matched_df[["Original Name", "Lookup 1", "Lookup 1 Confidence"]]
+    matched_df.columns = MATCH_COLUMNS
+    return matched_df
+
+
+def get_tfidf_index(candidates: pd.DataFrame, options: dict) -> dict:
+    """Given the candidates frame and the matcher options, get the tf-idf index, popping its build options.
+
+    The tf-idf model is fitted on the candidates, or loaded from `index_path` if provided (and fitted there once),
+    unless an already fitted `tfidf_index` option is provided.
+    """
+    import fuzzy_matcher.matcher.tfidf_index as tfidf
+
+    index_path = options.pop("index_path", None)
+    ngram_size = options.pop("ngram_size", 3)
+    if "tfidf_index" in options:
+        return options.pop("tfidf_index")
+    candidate_strings = candidates["full_name_processed"].to_numpy()
+    if index_path is None:
+        return tfidf.fit_tfidf_index(candidate_strings, ngram_size)
+    return tfidf.load_or_build_tfidf_index(candidate_strings, index_path, ngram_size)
+
+
+def match_tfidf(queries: pd.DataFrame, candidates: pd.DataFrame, **options) -> pd.DataFrame:
+    """Given the queries and candidates frames, run the native char n-gram tf-idf matching."""
+    import fuzzy_matcher.matcher.tfidf_index as tfidf
+
+    options = dict(options)
+    tfidf_index = get_tfidf_index(candidates, options)
+    matched_df = tfidf.process_best_tfidf_match(
+        queries["full_name_processed"].to_numpy(), tfidf_index, **options
+    )
+    return matched_df[matched_df["match_index"] >= 0][MATCH_COLUMNS]
+
+
+def match_rerank(queries: pd.DataFrame, candidates: pd.DataFrame, **options) -> pd.DataFrame:
+    """Given the queries and candidates frames, retrieve the top-n candidates by tf-idf and rerank them with token_sort_ratio."""
+    import fuzzy_matcher.matcher.tfidf_index as tfidf
+
+    options = dict(options)
+    tfidf_index = get_tfidf_index(candidates, options)
+    matched_df = tfidf.process_best_rerank_match(
+        queries["full_name_processed"].to_numpy(), tfidf_index, **options
+    )
+    return matched_df[matched_df["match_index"] >= 0][MATCH_COLUMNS]
+
+
+def match_fields(queries: pd.DataFrame, candidates: pd.DataFrame, **options) -> pd.DataFrame:
+    """Given the queries and candidates frames, match the first / last names against the candidates field vocabularies.
+
+    The field index is built from the candidates `first_name` / `last_name` columns, unless a `field_index` option is provided.
+    """
+    import fuzzy_matcher.matcher.field_index as fields
+
+    options = dict(options)
+    field_index = options.pop("field_index", None)
+    if field_index is None:
+        if not {"first_name", "last_name"}.issubset(candidates.columns):
+            logging.error("Field matching needs the candidates first / last names, please get the candidates from the primary dataset !")
+            return pd.DataFrame(columns=MATCH_COLUMNS)
+        field_index = fields.build_field_index(
+            candidates["first_name"], candidates["last_name"], candidates["full_name_processed"]
+        )
+    matched_df = fields.process_best_field_match(
+        queries["full_name_processed"].to_numpy(),
+        queries["first_name"].to_numpy(),
+        queries["last_name"].to_numpy(),
+        field_index,
+        **options,
+    )
+    return matched_df[matched_df["match_index"] >= 0][MATCH_COLUMNS]
+
+
+# fuzzy matching stages, selected by name; every stage returns the MATCH_COLUMNS of the matched queries only
+# (stages import their matcher module when they run, so only the selected matcher and its dependencies are loaded)
+MATCHERS = {
+    "baseline": match_baseline,
+    "batch": match_batch,
+    "indexed": match_indexed,
+    "parallel": match_parallel,
+    "matrix": match_matrix,
+    "tfidf": match_tfidf,
+    "rerank": match_rerank,
+    "fields": match_fields,
+}
+# matchers scoring with a cosine similarity instead of a rapidfuzz ratio
+TFIDF_MATCHERS = ["matrix", "tfidf"]
+# matchers reporting the pairs they score to a `stats` option, and matchers scoring every pair
+STATS_MATCHERS = ["batch", "indexed", "rerank", "fields"]
+BRUTE_FORCE_MATCHERS = ["baseline", "parallel"]
+# default score cutoff of every matcher, None for the matchers keeping the best candidate whatever its score
+MATCHER_SCORE_CUTOFFS = {
+    "baseline": None,
+    "batch": 70,
+    "indexed": 70,
+    "parallel": None,
+    "matrix": None,
+    "tfidf": 0,
+    "rerank": 70,
+    "fields": 70,
+}
+# score cutoff of the canonical join, for the matchers without a token_sort_ratio score cutoff
+CANONICAL_SCORE_CUTOFF = 70
+# matchers whose matches only depend on the token-sorted form of the query (token_sort_ratio scoring)
+CANONICAL_MATCHERS = ["baseline", "batch", "indexed", "parallel"]
+
+
+def get_matcher_score_cutoff(matcher: str, matcher_options: dict = None) -> float:
+    """Given the matcher and its options, get the score cutoff its matches are selected with (None for no cutoff)."""
+    if matcher in ["baseline", "matrix"]:
+        # these matchers don't take a score cutoff option
+        return MATCHER_SCORE_CUTOFFS[matcher]
+    return (matcher_options or {}).get("score_cutoff", MATCHER_SCORE_CUTOFFS.get(matcher))
+
+
+def get_candidates(primary_df: pd.DataFrame) -> pd.DataFrame:
+    """Given the preprocessed primary dataframe, get the deduplicated candidates, their token-sorted keys and their first / last names."""
+    return primary_df.drop_duplicates("full_name_processed")[
+        ["full_name_processed", "full_name_sorted", "first_name", "last_name"]
+    ]
+
+
+def load_candidates(primary_file_path: str, index_path: str = None, ngram_size: int = None) -> pd.DataFrame:
+    """Given the primary dataset path, get the candidates frame, from the persisted candidate index if an index path is provided.
+
+    Candidates read from the index are arrow string columns over the memory-mapped index, the strings are not decoded.
+    The index keeps the n-gram size it was built with, unless another `ngram_size` is provided (the index is then rebuilt).
+    """
+    if index_path is None:
+        return get_candidates(preprocess_dataframe(read_names_dataset(primary_file_path)))
+    import fuzzy_matcher.matcher.candidate_index as index
+
+    return index.get_index_candidates(index.load_or_build_candidate_index(primary_file_path, index_path, ngram_size))
+
+
+def has_matcher_inputs(matcher: str, candidates: pd.DataFrame, matcher_options: dict = None) -> bool:
+    """Given the matcher, the candidates and the matcher options, check the matcher can run on them, logging the error otherwise.
+
+    A matcher missing its inputs would match no query, so its results must never be mistaken for (and cached as) no match.
+    """
+    if matcher not in MATCHERS:
+        logging.error(f"Unknown matcher `{matcher}`, please use one of : {list(MATCHERS)}")
+        return False
+    if (
+        matcher == "fields"
+        and "field_index" not in (matcher_options or {})
+        and not {"first_name", "last_name"}.issubset(candidates.columns)
+    ):
+        logging.error("Field matching needs the candidates first / last names, please get the candidates from the primary dataset !")
+        return False
+    return True
+
+
+def build_canonical_index(candidates: pd.DataFrame, canonical_steps: list["str"] = CANONICAL_STEPS) -> dict:
+    """Given the candidates and the canonicalization steps, index the candidates by canonical form.
+
+    Every candidate of a form is kept (distinct names can collapse to the same form), the candidates being grouped
+    by form : the candidates of the form `i` are `candidates[offsets[i]:offsets[i + 1]]`.
+    Candidates with an empty form (nothing left after canonicalization) are not indexed, as they share no noise with a name.
+    """
+    canonical_names = get_canonical_names(candidates["full_name_processed"], canonical_steps).to_numpy(dtype=object)
+    is_indexed = canonical_names != ""
+    form_codes, canonical_forms = pd.factorize(canonical_names[is_indexed])
+    candidate_order = np.argsort(form_codes, kind="stable")
+    return {
+        "steps": list(canonical_steps),
+        "forms": pd.Index(canonical_forms),
+        "candidates": candidates["full_name_processed"].to_numpy(dtype=object)[is_indexed][candidate_order],
+        "offsets": np.append(
+            np.searchsorted(form_codes[candidate_order], np.arange(len(canonical_forms))), len(form_codes)
+        ),
+    }
+
+
+def get_canonical_matches(
+    canonical_index: dict, names: np.ndarray, score_cutoff: float = CANONICAL_SCORE_CUTOFF
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Given a canonical index and names, get the (is_match, match names, scores) of the names joined on their canonical form.
+
+    Every candidate of the form of a name is scored with token_sort_ratio and the best one (first one on ties) is kept,
+    only if it reaches the score cutoff, so a name whose form is shared with far away candidates is not joined.
+    Names with an empty form are never joined.
+    """
+    canonical_names = get_canonical_names(names, canonical_index["steps"]).to_numpy(dtype=object)
+    form_positions = np.where(canonical_names != "", canonical_index["forms"].get_indexer(canonical_names), -1)
+    match_names = np.full(len(names), None, dtype=object)
+    scores = np.zeros(len(names))
+    joined = np.flatnonzero(form_positions >= 0)
+    if len(joined) == 0:
+        return np.zeros(len(names), dtype=bool), match_names, scores
+    group_starts = canonical_index["offsets"][form_positions[joined]]
+    group_sizes = canonical_index["offsets"][form_positions[joined] + 1] - group_starts
+    pair_names = np.repeat(np.arange(len(joined)), group_sizes)
+    pair_firsts = np.cumsum(group_sizes) - group_sizes
+    pair_candidates = np.repeat(group_starts - pair_firsts, group_sizes) + np.arange(len(pair_names))
+    pair_scores = cpdist(
+        np.asarray(names, dtype=object)[joined][pair_names],
+        canonical_index["candidates"][pair_candidates],
+        scorer=token_sort_ratio,
+        dtype=np.float64,
+    )
+    best_scores = np.maximum.reduceat(pair_scores, pair_firsts)
+    # first candidate reaching the best score of its name
+    best_pairs = np.flatnonzero(pair_scores == best_scores[pair_names])
+    best_pairs = best_pairs[np.unique(pair_names[best_pairs], return_index=True)[1]]
+    is_match = np.zeros(len(names), dtype=bool)
+    is_match[joined] = best_scores >= (score_cutoff or 0)
+    match_names[joined] = canonical_index["candidates"][pair_candidates[best_pairs]]
+    scores[joined] = best_scores
+    match_names[~is_match], scores[~is_match] = None, 0.0
+    return is_match, match_names, scores
+
+
+def get_canonical_index(candidates: pd.DataFrame, canonical_steps: list["str"] = None) -> dict:
+    """Given the candidates and the canonicalization steps (None to skip the canonical join), get the canonical index, None on error."""
+    if canonical_steps is None:
+        return None
+    unknown_steps = [step for step in canonical_steps if step not in CANONICAL_STEPS]
+    if len(unknown_steps) > 0:
+        logging.error(f"Unknown canonicalization steps {unknown_steps}, please use some of : {CANONICAL_STEPS}, skipping the canonical join !")
+        return None
+    return build_canonical_index(candidates, canonical_steps)
+
+
+def get_config_options(matcher_options: dict = None) -> dict:
+    """Given (possibly prepared) matcher options, get the options the matches depend on (SCORE_OPTIONS), without the execution ones.
+
+    Execution options (memory budget, workers, chunk sizes, prebuilt candidates side indexes and stats) can change
+    between two runs, e.g. a smaller memory budget after running out of memory, without invalidating their results.
+    """
+    return {key: value for key, value in (matcher_options or {}).items() if key in SCORE_OPTIONS}
+
+
+def get_batch_matcher_options(matcher: str, candidates: pd.DataFrame, matcher_options: dict = None) -> dict:
+    """Given the matcher and its options, build the candidates side index of the matcher once, for all the query batches.
+
+    The batch and parallel matchers get the candidates as a compact candidate store (length-sorted buckets for the
+    batch matcher, copied once to shared memory for the parallel one), instead of converting them on every call.
+    The stores are views of the candidates columns when these are arrow string columns, so only the length-sorted
+    keys (or the shared memory block) are new memory.
+    Options already holding their index are kept as they are, so prepared options can be prepared again for free.
+    """
+    import fuzzy_matcher.matcher.candidate_index as index
+
+    matcher_options = dict(matcher_options or {})
+    if matcher == "batch" and "candidate_buckets" not in matcher_options:
+        matcher_options["candidate_store"] = index.get_column_store(candidates["full_name_processed"])
+        matcher_options["candidate_buckets"] = get_length_buckets(index.get_column_store(candidates["full_name_sorted"]))
+    elif matcher == "parallel" and "shared_candidates" not in matcher_options:
+        import fuzzy_matcher.matcher.parallel_match as parallel
+
+        # released when the prepared options are no longer referenced
+        matcher_options["shared_candidates"] = parallel.SharedCandidates(
+            index.get_column_store(candidates["full_name_processed"])
+        )
+    elif matcher == "indexed" and "ngram_index" not in matcher_options:
+        import fuzzy_matcher.matcher.ngram_index as ngram
+
+        matcher_options["ngram_index"] = ngram.build_ngram_index(
+            candidates["full_name_processed"].to_numpy(), matcher_options.get("ngram_size", 3)
+        )
+    elif matcher in ["tfidf", "rerank"] and "tfidf_index" not in matcher_options:
+        matcher_options["tfidf_index"] = get_tfidf_index(candidates, dict(matcher_options))
+    elif matcher == "fields" and "field_index" not in matcher_options:
+        import fuzzy_matcher.matcher.field_index as fields
+
+        if {"first_name", "last_name"}.issubset(candidates.columns):
+            matcher_options["field_index"] = fields.build_field_index(
+                candidates["first_name"], candidates["last_name"], candidates["full_name_processed"]
+            )
+    return matcher_options
+
+
+def get_index_matcher_options(matcher: str, candidate_index: dict, matcher_options: dict = None) -> dict:
+    """Given the matcher and the candidate index the candidates were loaded from, prepare the matcher options over the index arrays.
+
+    The batch matcher gets the memory-mapped candidates as its candidate store (only its length-sorted keys being copied),
+    the parallel matcher shares the memory-mapped candidates bytes as they are, and the indexed matcher gets the memory-mapped
+    candidates and n-gram postings, if they have the n-gram size of the matcher. The other matchers are prepared as usual
+    (`get_batch_matcher_options`), on the candidates frame.
+    """
+    import fuzzy_matcher.matcher.candidate_index as index
+
+    matcher_options = dict(matcher_options or {})
+    if matcher == "batch" and "candidate_buckets" not in matcher_options:
+        matcher_options["candidate_store"] = index.get_index_store(candidate_index)
+        matcher_options["candidate_buckets"] = get_length_buckets(index.get_index_store(candidate_index, token_sorted=True))
+    elif matcher == "parallel" and "shared_candidates" not in matcher_options:
+        import fuzzy_matcher.matcher.parallel_match as parallel
+
+        matcher_options["shared_candidates"] = parallel.SharedCandidates(index.get_index_store(candidate_index))
+    elif (
+        matcher == "indexed"
+        and "ngram_index" not in matcher_options
+        and matcher_options.get("ngram_size", 3) == candidate_index["ngram_size"]
+    ):
+        matcher_options["candidate_store"] = index.get_index_store(candidate_index)
+        matcher_options["ngram_index"] = {
+            key: candidate_index[key]
+            for key in ["ngram_size", "size", "ngram_keys", "posting_offsets", "posting_ids"]
+        }
+    return matcher_options
+
+
+def load_matcher_candidates(
+    primary_file_path: str, index_path: str = None, matcher: str = "batch", matcher_options: dict = None
+) -> tuple[pd.DataFrame, dict]:
+    """Given the primary dataset path, get the candidates frame and the matcher options, prepared over the candidate index if an index path is provided.
+
+    The indexed matcher uses the n-gram size the index is built with, unless its `ngram_size` option is set
+    (the index is then rebuilt with it).
+    """
+    if index_path is None:
+        return load_candidates(primary_file_path), dict(matcher_options or {})
+    import fuzzy_matcher.matcher.candidate_index as index
+
+    ngram_size = (matcher_options or {}).get("ngram_size") if matcher == "indexed" else None
+    candidate_index = index.load_or_build_candidate_index(primary_file_path, index_path, ngram_size)
+    if matcher == "indexed":
+        matcher_options = {**(matcher_options or {}), "ngram_size": candidate_index["ngram_size"]}
+    return (
+        index.get_index_candidates(candidate_index),
+        get_index_matcher_options(matcher, candidate_index, matcher_options),
+    )
+
+
+def match_checkpointed_batches(
+    queries: pd.DataFrame,
+    candidates: pd.DataFrame,
+    matcher: str,
+    matcher_options: dict,
+    checkpoint_path: str,
+    batch_size: int = 10000,
+    stats: dict = None,
+) -> pd.DataFrame:
+    """Given the queries and candidates frames, run the fuzzy matcher batch by batch, checkpointing every finished batch.
+
+    The results of every batch of `batch_size` queries are persisted to `checkpoint_path` as soon as it is matched,
+    with a manifest of the finished query ranges and the fingerprints of the queries, candidates and matcher configuration.
+    A rerun on the same inputs only matches the batches not finished yet. The candidates side index of the matcher
+    (n-gram, tf-idf or field index) is built once for all the batches. If a `stats` dict is provided, the number of
+    queries read back from the checkpoint is added to its `checkpoint_resumed`.
+    """
+    import fuzzy_matcher.matcher.match_checkpoint as checkpointing
+
+    checkpoint = checkpointing.open_checkpoint(
+        checkpoint_path,
+        checkpointing.get_checkpoint_job(
+            queries["full_name_processed"],
+            candidates["full_name_processed"],
+            matcher,
+            get_config_options(matcher_options),
+            batch_size,
+        ),
+    )
+    pending_batches = checkpointing.get_pending_batches(checkpoint)
+    if stats is not None:
+        stats["checkpoint_resumed"] = queries.shape[0] - sum(end - start for start, end in pending_batches)
+    if len(pending_batches) > 0:
+        matcher_options = get_batch_matcher_options(matcher, candidates, matcher_options)
+    for start, end in pending_batches:
+        checkpointing.save_checkpoint_batch(
+            checkpoint, start, end, MATCHERS[matcher](queries.iloc[start:end], candidates, **matcher_options)
+        )
+        logging.info(f"Checkpointed the matches of queries {start} to {end} out of {queries.shape[0]} !")
+    return checkpointing.read_checkpoint_batches(checkpoint)
+
+
+def match_preprocessed_records(
+    secondary_df: pd.DataFrame,
+    candidates: pd.DataFrame,
+    matcher: str = "batch",
+    sampled_run_size: int = None,
+    matcher_options: dict = None,
+    stats: dict = None,
+    result_cache: dict = None,
+    metrics: PipelineMetrics = None,
+    canonical_index: dict = None,
+    checkpoint_path: str = None,
+    checkpoint_batch_size: int = 10000,
+) -> pd.DataFrame:
+    """Given preprocessed secondary records and candidates, match every record, first exactly and then fuzzily.
+
+    The exact stage is a hash lookup of the deduplicated secondary names in the candidates, and only the deduplicated
+    names without an exact match go through the fuzzy `matcher` (limited to the first `sampled_run_size` of them, if set).
+    Results are computed once per distinct name and fanned out to all the records, in the secondary records order,
+    each with the `record_id` of its original row (`preprocess_records`), or its index label for records without one.
+    For the token_sort_ratio matchers (`CANONICAL_MATCHERS`), distinct names sharing the same token-sorted form
+    (e.g. swapped first/last names, or extra inner whitespace) are matched once and their match fanned out to all of them,
+    unless another `scorer` is provided in the matcher options.
+    If a `stats` dict is provided, the stage timings (seconds), the distinct/fuzzy names counts and the candidates scored are added to it.
+    If a `result_cache` is provided, cached names are not matched again and the new fuzzy results are added to it.
+    If a `canonical_index` is provided (`build_canonical_index`), the names without an exact match are first joined
+    on their noise-collapsed canonical form, as `canonical_join` matches scored with token_sort_ratio. Joined names
+    under the matcher score cutoff (CANONICAL_SCORE_CUTOFF for the matchers without one) go on to the fuzzy matcher.
+    If a `checkpoint_path` is provided, the fuzzy matches are checkpointed there every `checkpoint_batch_size` queries
+    (`match_checkpointed_batches`), so a rerun of an interrupted run on the same inputs only matches the unfinished batches.
+    If `metrics` are provided, the exact join, fuzzy scoring and post-processing stages are measured in them.
+    """
+    stats = {} if stats is None else stats
+    metrics = PipelineMetrics("match") if metrics is None else metrics
+    if not has_matcher_inputs(matcher, candidates, matcher_options):
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    with metrics.stage("exact_join", rows_in=secondary_df.shape[0]) as stage:
+        record_codes, distinct_names = pd.factorize(secondary_df["full_name_processed"])
+        distinct_names = np.asarray(distinct_names, dtype=object)
+        # factorize orders the distinct names by first occurrence, as the first records of every name
+        distinct_df = secondary_df[~secondary_df["full_name_processed"].duplicated()]
+
+        is_direct = pd.Index(candidates["full_name_processed"]).get_indexer(distinct_names) >= 0
+        match_names = np.where(is_direct, distinct_names, "unmapped").astype(object)
+        scores = np.where(is_direct, 100.0, 0.0)
+        sources = np.where(is_direct, "direct_join", "unmapped").astype(object)
+        logging.info(f"Distinct names remaining to be mapped: {(~is_direct).sum()}")
+        stage["rows_out"] = len(distinct_names)
+    stats["exact_match_s"] = stage["wall_seconds"]
+    stats["distinct_names"] = len(distinct_names)
+
+    fuzzy_positions = np.flatnonzero(~is_direct)
+    if canonical_index is not None:
+        with metrics.stage("canonical_join", rows_in=len(fuzzy_positions)) as stage:
+            # the join has the score cutoff of the matcher, for its token_sort_ratio scores
+            canonical_cutoff = get_matcher_score_cutoff(matcher, matcher_options)
+            if canonical_cutoff is None or matcher in TFIDF_MATCHERS:
+                canonical_cutoff = CANONICAL_SCORE_CUTOFF
+            is_canonical, canonical_names, canonical_scores = get_canonical_matches(
+                canonical_index, distinct_names[fuzzy_positions], canonical_cutoff
+            )
+            canonical_positions = fuzzy_positions[is_canonical]
+            match_names[canonical_positions] = canonical_names[is_canonical]
+            scores[canonical_positions] = canonical_scores[is_canonical]
+            sources[canonical_positions] = "canonical_join"
+            stats["canonical_matches"] = len(canonical_positions)
+            logging.info(f"Distinct names mapped on their canonical form: {len(canonical_positions)}")
+            fuzzy_positions = fuzzy_positions[~is_canonical]
+            stage["rows_out"] = len(canonical_positions)
+    if result_cache is not None:
+        with metrics.stage("cache_lookup", rows_in=len(fuzzy_positions)) as stage:
+            cached_positions = lookup_result_cache(result_cache, distinct_names[fuzzy_positions])
+            is_cached = cached_positions >= 0
+            cached_df = get_cached_results(result_cache, cached_positions[is_cached])
+            has_match = cached_df["matched_string"].notna().to_numpy()
+            hit_positions = fuzzy_positions[is_cached][has_match]
+            match_names[hit_positions] = cached_df["matched_string"].to_numpy()[has_match]
+            scores[hit_positions] = cached_df["similarity_score"].to_numpy()[has_match]
+            sources[hit_positions] = f"fuzzy_matching_{matcher}"
+            stats["cache_hits"] = int(is_cached.sum())
+            logging.info(f"Distinct names found in the result cache: {stats['cache_hits']}")
+            fuzzy_positions = fuzzy_positions[~is_cached]
+            stage["rows_out"] = stats["cache_hits"]
+    if sampled_run_size is not None:
+        logging.info(f"Running matching only on a specific sample size : {sampled_run_size}")
+        fuzzy_positions = fuzzy_positions[:sampled_run_size]
+    query_positions = fuzzy_positions
+    # a custom scorer (e.g. for the parallel matcher) can tell apart the names sharing a token-sorted form
+    if matcher in CANONICAL_MATCHERS and (matcher_options or {}).get("scorer", token_sort_ratio) is token_sort_ratio:
+        with metrics.stage("query_dedup", rows_in=len(fuzzy_positions)) as stage:
+            # names with the same token-sorted form get the same match, so only the first name of every form is matched
+            canonical_codes, canonical_forms = pd.factorize(
+                distinct_df["full_name_sorted"].to_numpy()[fuzzy_positions]
+            )
+            _, first_positions = np.unique(canonical_codes, return_index=True)
+            query_positions = fuzzy_positions[first_positions]
+            stats["canonical_duplicates"] = len(fuzzy_positions) - len(query_positions)
+            logging.info(f"Distinct token-sorted forms to be matched: {len(query_positions)}")
+            stage["rows_out"] = len(query_positions)
+    stats["fuzzy_queries"] = len(query_positions)
+    with metrics.stage("fuzzy_scoring", rows_in=len(query_positions)) as stage:
+        stage["rows_out"] = 0
+        if len(query_positions) > 0:
+            matcher_options = dict(matcher_options or {})
+            matcher_stats = {}
+            if matcher in STATS_MATCHERS:
+                matcher_options["stats"] = matcher_stats
+            if checkpoint_path is None:
+                matched_df = MATCHERS[matcher](
+                    distinct_df.iloc[query_positions], candidates, **matcher_options
+                )
+            else:
+                matched_df = match_checkpointed_batches(
+                    distinct_df.iloc[query_positions],
+                    candidates,
+                    matcher,
+                    matcher_options,
+                    checkpoint_path,
+                    batch_size=checkpoint_batch_size,
+                    stats=matcher_stats,
+                )
+                stats["checkpoint_resumed"] = matcher_stats["checkpoint_resumed"]
+            if matcher in BRUTE_FORCE_MATCHERS:
+                matcher_stats["candidates_scored"] = (
+                    len(query_positions) - matcher_stats.get("checkpoint_resumed", 0)
+                ) * candidates.shape[0]
+            stage["candidates_scored"] = matcher_stats.get("candidates_scored")
+            if len(query_positions) < len(fuzzy_positions):
+                # fan the match of every token-sorted form out to all its names
+                form_rows = np.full(len(canonical_forms), -1, dtype=np.int64)
+                form_rows[
+                    canonical_codes[first_positions][
+                        pd.Index(distinct_names[query_positions]).get_indexer(matched_df["string_to_match"])
+                    ]
+                ] = np.arange(matched_df.shape[0])
+                name_rows = form_rows[canonical_codes]
+                matched_df = matched_df.iloc[name_rows[name_rows >= 0]].assign(
+                    string_to_match=distinct_names[fuzzy_positions[name_rows >= 0]]
+                )
+            matched_positions = pd.Index(distinct_names[fuzzy_positions]).get_indexer(
+                matched_df["string_to_match"]
+            )
+            matched_positions = fuzzy_positions[matched_positions]
+            match_names[matched_positions] = matched_df["matched_string"].to_numpy()
+            scores[matched_positions] = matched_df["similarity_score"].to_numpy()
+            sources[matched_positions] = f"fuzzy_matching_{matcher}"
+            stage["rows_out"] = matched_df.shape[0]
+            if result_cache is not None:
+                update_result_cache(result_cache, distinct_names[fuzzy_positions], matched_df)
+    stats["fuzzy_match_s"] = stage["wall_seconds"]
+    if stage["candidates_scored"] is not None:
+        stats["candidates_scored"] = stats.get("candidates_scored", 0) + stage["candidates_scored"]
+
+    with metrics.stage("post_processing", rows_in=len(distinct_names)) as stage:
+        record_ids = secondary_df["record_id"] if "record_id" in secondary_df.columns else secondary_df.index
+        results_df = pd.DataFrame(
+            {
+                "record_id": record_ids.to_numpy(),
+                "search_name_normalized": distinct_names[record_codes],
+                "match_name_normalized": match_names[record_codes],
+                "similarity_score": scores[record_codes],
+                "mapping_source": sources[record_codes],
+            },
+            columns=RESULT_COLUMNS,
+        )
+        stage["rows_out"] = results_df.shape[0]
+    stats["post_processing_s"] = stage["wall_seconds"]
+    return results_df
+
+
+def open_result_cache(
+    cache_path: str, candidates: pd.DataFrame, matcher: str, matcher_options: dict = None
+) -> dict:
+    """Given the cache directory, the candidates and the matcher configuration, load the result cache, up to date with the candidates."""
+    result_cache = load_result_cache(cache_path, get_cache_config(matcher, get_config_options(matcher_options)))
+    return refresh_result_cache(
+        result_cache,
+        candidates,
+        score_cutoff=get_matcher_score_cutoff(matcher, matcher_options),
+        # tf-idf scores can't be compared to the rapidfuzz scores of the added candidates
+        incremental=matcher not in TFIDF_MATCHERS,
+    )
+
+
+def run_matching_pipeline(
+    primary_df: pd.DataFrame,
+    secondary_df: pd.DataFrame,
+    matcher: str = "batch",
+    sampled_run_size: int = None,
+    matcher_options: dict = None,
+    cache_path: str = None,
+    metrics: PipelineMetrics = None,
+    canonical_steps: list["str"] = None,
+    checkpoint_path: str = None,
+    checkpoint_batch_size: int = 10000,
+) -> pd.DataFrame:
+    """Given the primary and secondary names dataframes, preprocess them and match every secondary record to the primary.
+
+    The output has one row per secondary record (duplicated records included), with the RESULT_COLUMNS schema,
+    its `record_id` being the index label of the secondary record.
+    If a `cache_path` is provided, fuzzy results are persisted there and reused by the next runs.
+    If `canonical_steps` are provided (some of CANONICAL_STEPS), names are also joined on their canonical form before fuzzy matching.
+    If a `checkpoint_path` is provided, the fuzzy matches are checkpointed there every `checkpoint_batch_size` queries,
+    and a restarted run on the same inputs resumes after the last finished batch.
+    If `metrics` are provided, the preprocessing and matching stages are measured in them.
+    """
+    metrics = PipelineMetrics("match") if metrics is None else metrics
+    with metrics.stage("preprocess", rows_in=primary_df.shape[0] + secondary_df.shape[0]) as stage:
+        candidates = get_candidates(preprocess_dataframe(primary_df))
+        preprocessed_df = preprocess_records(secondary_df)
+        stage["rows_out"] = candidates.shape[0] + preprocessed_df.shape[0]
+    canonical_index = get_canonical_index(candidates, canonical_steps)
+    result_cache = None
+    if cache_path is not None:
+        result_cache = open_result_cache(cache_path, candidates, matcher, matcher_options)
+    results_df = match_preprocessed_records(
+        preprocessed_df,
+        candidates,
+        matcher=matcher,
+        sampled_run_size=sampled_run_size,
+        matcher_options=get_batch_matcher_options(matcher, candidates, matcher_options),
+        result_cache=result_cache,
+        metrics=metrics,
+        canonical_index=canonical_index,
+        checkpoint_path=checkpoint_path,
+        checkpoint_batch_size=checkpoint_batch_size,
+    )
+    if result_cache is not None:
+        save_result_cache(result_cache, cache_path)
+    return results_df
+
+
+def run_streaming_matching_pipeline(
+    candidates: pd.DataFrame,
+    secondary_file_path: str,
+    export_path: str,
+    chunk_size: int = 1000000,
+    matcher: str = "batch",
+    matcher_options: dict = None,
+    cache_path: str = None,
+    metrics: PipelineMetrics = None,
+    canonical_steps: list["str"] = None,
+) -> dict:
+    """Given resident candidates and the secondary dataset path (csv or parquet), match the secondary records chunk by chunk.
+
+    The secondary dataset is read in chunks of `chunk_size` records, every chunk is matched against the candidates
+    and its results are appended to the export file, so memory is bounded by the chunk and candidates sizes.
+    Names are deduplicated within a chunk only, every record keeping its row number in the dataset as `record_id`,
+    and the candidates side index of the matcher is built once for all the chunks.
+    The export file is always rewritten (with no record if there is no chunk). Returns the count of records per mapping source.
+    If a `cache_path` is provided, fuzzy results are persisted there and reused by the next chunks and runs.
+    If `canonical_steps` are provided (some of CANONICAL_STEPS), names are also joined on their canonical form before fuzzy matching.
+    If `metrics` are provided, the read, preprocessing, matching and export stages of all the chunks are measured in them.
+    """
+    metrics = PipelineMetrics("streaming") if metrics is None else metrics
+    if not has_matcher_inputs(matcher, candidates, matcher_options):
+        return {}
+    if not os.path.exists(secondary_file_path):
+        logging.error("Provided secondary path does not exist, stopping matching !")
+        return {}
+
+    canonical_index = get_canonical_index(candidates, canonical_steps)
+    result_cache = None
+    if cache_path is not None:
+        result_cache = open_result_cache(cache_path, candidates, matcher, matcher_options)
+    # the candidates side index of the matcher is built once for all the chunks
+    chunk_matcher_options = get_batch_matcher_options(matcher, candidates, matcher_options)
+    if os.path.exists(export_path):
+        # the export of an earlier run is never left in place, even without any chunk to append
+        os.remove(export_path)
+    source_counts = {}
+    processed = 0
+    appender = DatasetAppender(export_path)
+    try:
+        secondary_chunks = iterate_names_dataset(secondary_file_path, chunk_size)
+        while True:
+            with metrics.stage("read") as stage:
+                secondary_chunk = next(secondary_chunks, None)
+                stage["rows_out"] = 0 if secondary_chunk is None else secondary_chunk.shape[0]
+            if secondary_chunk is None:
+                break
+            with metrics.stage("preprocess", rows_in=secondary_chunk.shape[0]) as stage:
+                # the record ids are the row numbers in the dataset, whatever the chunk index
+                secondary_chunk.index = pd.RangeIndex(processed, processed + secondary_chunk.shape[0])
+                preprocessed_chunk = preprocess_records(secondary_chunk)
+                stage["rows_out"] = preprocessed_chunk.shape[0]
+            chunk_results = match_preprocessed_records(
+                preprocessed_chunk,
+                candidates,
+                matcher=matcher,
+                matcher_options=chunk_matcher_options,
+                result_cache=result_cache,
+                metrics=metrics,
+                canonical_index=canonical_index,
+            )
+            with metrics.stage("export", rows_in=chunk_results.shape[0]) as stage:
+                appender.append(chunk_results)
+                stage["rows_out"] = chunk_results.shape[0]
+            for source, count in chunk_results["mapping_source"].value_counts().items():
+                source_counts[source] = source_counts.get(source, 0) + int(count)
+            processed += secondary_chunk.shape[0]
+            logging.info(f"Matched {processed} records, appended results to {export_path} !")
+        if appender.appended == 0:
+            logging.info("No secondary records to match, exporting empty results !")
+            appender.append(pd.DataFrame(columns=RESULT_COLUMNS))
+    finally:
+        appender.close()
+    if result_cache is not None:
+        save_result_cache(result_cache, cache_path)
+    return source_counts
+
+
+if __name__ == "__main__":
+    pass
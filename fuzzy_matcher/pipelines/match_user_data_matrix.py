@@ -1,110 +1,49 @@
-from time import perf_counter
-import pandas as pd
-import tfidf_matcher as tm
-from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe
+from fuzzy_matcher.dataset_io import read_names_dataset, write_names_dataset
+from fuzzy_matcher.metrics import (
+    PipelineMetrics,
+    export_metrics_json,
+    export_metrics_prometheus,
+)
+from fuzzy_matcher.pipelines.match_engine import run_matching_pipeline
 
 # pipeline config
+MATCHER = "tfidf"  # native tf-idf matcher, "matrix" for the tfidf_matcher (knn) package
+MATCHER_OPTIONS = {"index_path": "input_data/primary_names_tfidf.npz"}  # fitted once, reused while the primary data is unchanged
 SAMPLED_RUN = True
 SAMPLED_RUN_SIZE = 10000
+PRIMARY_FILE_PATH = "input_data/primary_names_dataset.csv"  # .csv or .parquet
+SECONDARY_FILE_PATH = "input_data/secondary_names_dataset.csv"
 EXPORT_PATH = "output_data/name_matching_matrix.csv"
+METRICS_PATH = "output_data/metrics_matrix"  # .json and .prom (Prometheus textfile) are written
 
 if __name__ == "__main__":
-    tic = perf_counter()
-    primary_df = pd.read_csv("input_data/primary_names_dataset.csv")
-    secondary_df = pd.read_csv("input_data/secondary_names_dataset.csv")
-
-    preprocessed_primary_df = preprocess_dataframe(primary_df)
-    preprocessed_secondary_df = preprocess_dataframe(secondary_df)
-
-    # to reduce the mapping space, we will try a direct mapping first
-    direct_mapping_df = pd.merge(
-        preprocessed_secondary_df,
-        preprocessed_primary_df,
-        how="left",
-        on="full_name_processed",
-    )
-
-    # what remains unmapped, will go through fuzzy matching
-    unmapped_df = direct_mapping_df[
-        direct_mapping_df["first_name_y"].isna()
-    ].reset_index()
-    print(f"Records remaining to be mapped: {unmapped_df.shape[0]}")
-    queries = list(unmapped_df["full_name_processed"].unique())
-    candidates = preprocessed_primary_df["full_name_processed"].unique()
-
-    if SAMPLED_RUN:
-        print(f"Running matching only on a specific sample size : {SAMPLED_RUN_SIZE}")
-        queries = unmapped_df["full_name_processed"].unique()[:SAMPLED_RUN_SIZE]
-    else:
-        queries = unmapped_df["full_name_processed"].unique()
-
-    fuzzy_matched_df = tm.matcher(
-        original=queries,
-        lookup=candidates,
-        k_matches=1,  # for this experiment, we are interesting on getting the best match only
-        ngram_length=3,
+    metrics = PipelineMetrics(MATCHER)
+
+    # import generated test data
+    with metrics.stage("read") as stage:
+        primary_df = read_names_dataset(PRIMARY_FILE_PATH)
+        secondary_df = read_names_dataset(SECONDARY_FILE_PATH)
+        stage["rows_out"] = primary_df.shape[0] + secondary_df.shape[0]
+
+    final_df = run_matching_pipeline(
+        primary_df,
+        secondary_df,
+        matcher=MATCHER,
+        sampled_run_size=SAMPLED_RUN_SIZE if SAMPLED_RUN else None,
+        metrics=metrics,
+        matcher_options=MATCHER_OPTIONS,
     )
 
-    toc = perf_counter()
-    elapsed = round(toc - tic, 2)
-    print(f"Elapsed matching time: {elapsed} s")
-
-    print("Post-processing matching results !")
-
-    dm_final = (
-        direct_mapping_df[direct_mapping_df["first_name_y"].isna() == False][
-            ["full_name_processed"]
-        ]
-        .copy()
-        .reset_index(drop=True)
-    )
-    dm_final["match_name_normalized"] = dm_final["full_name_processed"]
-    dm_final["similarity_score"] = 100.0
-    dm_final["mapping_source"] = "direct_join"
-    dm_final.columns = [
-        "search_name_normalized",
-        "match_name_normalized",
-        "similarity_score",
-        "mapping_source",
-    ]
-
-    fm_final = (
-        fuzzy_matched_df[["Original Name", "Lookup 1", "Lookup 1 Confidence"]]
-        .copy()
-        .reset_index(drop=True)
-    )
-    fm_final["mapping_source"] = "fuzzy_matching_matrix"
-    fm_final.columns = [
-        "search_name_normalized",
-        "match_name_normalized",
-        "similarity_score",
-        "mapping_source",
-    ]
-
-    unmapped_final = (
-        unmapped_df[
-            ~unmapped_df["full_name_processed"].isin(
-                list(fm_final["search_name_normalized"].unique())
-            )
-        ][["full_name_processed"]]
-        .copy()
-        .reset_index(drop=True)
-    )
-    unmapped_final["match_name_normalized"] = "unmapped"
-    unmapped_final["similarity_score"] = 0.0
-    unmapped_final["mapping_source"] = "unmapped"
-    unmapped_final.columns = [
-        "search_name_normalized",
-        "match_name_normalized",
-        "similarity_score",
-        "mapping_source",
-    ]
-
-    final_df = pd.concat([dm_final, fm_final, unmapped_final], ignore_index=True)
-
     print("Grouping of mappings: ")
 
     print(final_df.groupby(["mapping_source"]).count())
 
     print(f"Exporting final Dataset to {EXPORT_PATH}")
-    final_df.to_csv(EXPORT_PATH, index=False)
+    with metrics.stage("export", rows_in=final_df.shape[0]) as stage:
+        write_names_dataset(final_df, EXPORT_PATH)
+        stage["rows_out"] = final_df.shape[0]
+
+    for stage in metrics.get_metrics()["stages"]:
+        print(f"{stage['stage']:>16} : {stage['wall_seconds']:.2f} s, {stage['peak_rss_mb']:.1f} MB")
+    export_metrics_json(metrics.get_metrics(), f"{METRICS_PATH}.json")
+    export_metrics_prometheus(metrics.get_metrics(), f"{METRICS_PATH}.prom")
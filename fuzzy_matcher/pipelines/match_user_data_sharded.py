@@ -0,0 +1,56 @@
+import os
+import time
+from fuzzy_matcher.pipelines.match_engine import load_candidates, load_matcher_candidates
+from fuzzy_matcher.pipelines.shard_engine import run_shard_matching, merge_shard_results
+
+# pipeline config, the job mode and shard are read from the environment (e.g. set by a batch scheduler array job)
+JOB_MODE = os.environ.get("JOB_MODE", "match")  # `match` one shard, or `merge` all the shards
+SHARD_ID = int(os.environ.get("SHARD_ID", 0))
+N_SHARDS = int(os.environ.get("N_SHARDS", 4))
+MATCHER = "batch"
+CHUNK_SIZE = 500000  # secondary records read at a time
+PRIMARY_FILE_PATH = "input_data/primary_names_dataset.csv"
+SECONDARY_FILE_PATH = "input_data/secondary_names_dataset.csv"
+INDEX_PATH = "input_data/primary_names_index.fzi"
+SHARD_PATH = "output_data/name_matching_shards"  # on the filesystem shared by all the shards
+EXPORT_PATH = "output_data/name_matching_sharded.csv"
+
+if __name__ == "__main__":
+    tic = time.perf_counter()
+
+    if JOB_MODE == "match":
+        candidates, matcher_options = load_matcher_candidates(PRIMARY_FILE_PATH, INDEX_PATH, MATCHER)
+        matched_names = run_shard_matching(
+            candidates,
+            secondary_file_path=SECONDARY_FILE_PATH,
+            shard_path=SHARD_PATH,
+            shard_id=SHARD_ID,
+            n_shards=N_SHARDS,
+            matcher=MATCHER,
+            matcher_options=matcher_options,
+            chunk_size=CHUNK_SIZE,
+        )
+        if matched_names < 0:
+            exit(1)
+        print(f"Matched {matched_names} distinct names of shard {SHARD_ID} / {N_SHARDS}")
+    else:
+        # the merge checks that every shard was matched against the same candidates
+        candidates = load_candidates(PRIMARY_FILE_PATH, INDEX_PATH)
+        source_counts = merge_shard_results(
+            secondary_file_path=SECONDARY_FILE_PATH,
+            shard_path=SHARD_PATH,
+            export_path=EXPORT_PATH,
+            n_shards=N_SHARDS,
+            matcher=MATCHER,
+            chunk_size=CHUNK_SIZE,
+            candidates=candidates,
+        )
+        if len(source_counts) == 0:
+            exit(1)
+        print("Grouping of mappings: ")
+        print(source_counts)
+        print(f"Exported final Dataset to {EXPORT_PATH}")
+
+    toc = time.perf_counter()
+    elapsed = round(toc - tic, 2)
+    print(f"Elapsed time: {elapsed} s")
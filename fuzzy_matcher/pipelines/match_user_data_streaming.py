@@ -0,0 +1,53 @@
+from fuzzy_matcher.metrics import (
+    PipelineMetrics,
+    export_metrics_json,
+    export_metrics_prometheus,
+)
+from fuzzy_matcher.pipelines.match_engine import (
+    load_matcher_candidates,
+    run_streaming_matching_pipeline,
+)
+
+# pipeline config
+MATCHER = "batch"
+CHUNK_SIZE = 500000  # secondary records read, matched and exported at a time
+PRIMARY_FILE_PATH = "input_data/primary_names_dataset.csv"
+SECONDARY_FILE_PATH = "input_data/secondary_names_dataset.csv"
+INDEX_PATH = "input_data/primary_names_index.fzi"
+EXPORT_PATH = "output_data/name_matching_streaming.csv"
+CACHE_PATH = "output_data/name_matching_streaming_cache"  # None to match every query again
+# noise collapsing joined on before fuzzy matching, None to join on the normalized names only
+CANONICAL_STEPS = ["fold_unicode", "fold_punctuation", "collapse_repeats", "sort_tokens"]
+METRICS_PATH = "output_data/metrics_streaming"  # .json and .prom (Prometheus textfile) are written
+
+if __name__ == "__main__":
+    metrics = PipelineMetrics("streaming")
+
+    # candidates stay resident for all the chunks
+    with metrics.stage("load_candidates") as stage:
+        # the matcher options are prepared over the memory-mapped candidate index
+        candidates, matcher_options = load_matcher_candidates(PRIMARY_FILE_PATH, INDEX_PATH, MATCHER)
+        stage["rows_out"] = candidates.shape[0]
+
+    source_counts = run_streaming_matching_pipeline(
+        candidates,
+        secondary_file_path=SECONDARY_FILE_PATH,
+        export_path=EXPORT_PATH,
+        chunk_size=CHUNK_SIZE,
+        matcher=MATCHER,
+        matcher_options=matcher_options,
+        cache_path=CACHE_PATH,
+        metrics=metrics,
+        canonical_steps=CANONICAL_STEPS,
+    )
+
+    print("Grouping of mappings: ")
+
+    print(source_counts)
+
+    print(f"Exported final Dataset to {EXPORT_PATH}")
+
+    for stage in metrics.get_metrics()["stages"]:
+        print(f"{stage['stage']:>16} : {stage['wall_seconds']:.2f} s, {stage['peak_rss_mb']:.1f} MB")
+    export_metrics_json(metrics.get_metrics(), f"{METRICS_PATH}.json")
+    export_metrics_prometheus(metrics.get_metrics(), f"{METRICS_PATH}.prom")
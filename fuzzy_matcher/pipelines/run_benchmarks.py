@@ -0,0 +1,56 @@
+import os
+import json
+import time
+from fuzzy_matcher.generator.generate_data import read_data
+from fuzzy_matcher.benchmark.benchmark_matchers import (
+    run_benchmarks,
+    export_benchmarks,
+    compare_benchmarks,
+)
+
+# Benchmark Config
+BASE_INPUT_FILE_PATH = "input_data/Customer_Names.csv"
+LIST_LIMITS = [10, 50, 100]  # crossing limits, generating 20.000, 100.000 and 200.000 primary records
+STRATEGIES = ["baseline", "batch", "indexed", "parallel", "matrix", "tfidf", "rerank", "fields"]
+QUERY_LIMIT = 1000  # fuzzy queries matched per case
+SEED = 42
+DATASETS_PATH = "output_data"
+EXPORT_PATH = "output_data/benchmarks.json"
+REFERENCE_PATH = "output_data/benchmarks_reference.json"  # previous run to flag regressions against
+REGRESSION_TOLERANCE = 0.1
+
+if __name__ == "__main__":
+    tic = time.perf_counter()
+
+    print("Starting Benchmark process !")
+
+    benchmarks = run_benchmarks(
+        read_data(BASE_INPUT_FILE_PATH),
+        list_limits=LIST_LIMITS,
+        strategies=STRATEGIES,
+        query_limit=QUERY_LIMIT,
+        seed=SEED,
+        target_path=DATASETS_PATH,
+    )
+    export_benchmarks(benchmarks, EXPORT_PATH)
+
+    for result in benchmarks["results"]:
+        if result["status"] == "ok":
+            print(
+                f"{result['strategy']:>10} | {result['candidates']:>8} candidates | "
+                f"{result['queries_per_sec'] or 0:>10.1f} queries/s | {result['peak_rss_mb']:>8.1f} MB"
+            )
+
+    if os.path.exists(REFERENCE_PATH):
+        with open(REFERENCE_PATH) as reference_file:
+            regressions = compare_benchmarks(
+                json.load(reference_file), benchmarks, REGRESSION_TOLERANCE
+            )
+        for regression in regressions:
+            print(f"Regression : {regression}")
+        if len(regressions) > 0:
+            exit(1)
+
+    toc = time.perf_counter()
+    elapsed = round(toc - tic, 2)
+    print(f"Benchmark process finished. Elapsed : {elapsed} s")
@@ -0,0 +1,35 @@
+import asyncio
+from fuzzy_matcher.pipelines.match_engine import load_matcher_candidates
+from fuzzy_matcher.service.match_service import run_match_service
+
+# service config
+MATCHER = "batch"
+PRIMARY_FILE_PATH = "input_data/primary_names_dataset.csv"
+INDEX_PATH = "input_data/primary_names_index.fzi"
+HOST = "127.0.0.1"  # local endpoint only
+PORT = 8080
+MAX_BATCH_SIZE = 256  # names matched together at most
+MAX_WAIT_MS = 5  # time a batch waits for more names after its first one
+STATS_INTERVAL_S = 60
+
+if __name__ == "__main__":
+    # candidates stay resident for the whole service lifetime
+    candidates, matcher_options = load_matcher_candidates(PRIMARY_FILE_PATH, INDEX_PATH, MATCHER)
+
+    print(f"Serving {candidates.shape[0]} candidates on http://{HOST}:{PORT} !")
+
+    try:
+        asyncio.run(
+            run_match_service(
+                candidates,
+                host=HOST,
+                port=PORT,
+                matcher=MATCHER,
+                matcher_options=matcher_options,
+                max_batch_size=MAX_BATCH_SIZE,
+                max_wait_ms=MAX_WAIT_MS,
+                stats_interval_s=STATS_INTERVAL_S,
+            )
+        )
+    except KeyboardInterrupt:
+        print("Match service stopped !")
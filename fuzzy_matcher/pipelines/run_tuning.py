@@ -0,0 +1,43 @@
+import time
+from fuzzy_matcher.generator.generate_data import read_data
+from fuzzy_matcher.benchmark.benchmark_matchers import generate_benchmark_datasets
+from fuzzy_matcher.benchmark.tune_matchers import (
+    DEFAULT_CONFIGURATIONS,
+    get_evaluation_queries,
+    run_tuning,
+    get_cheapest_configuration,
+)
+
+# Tuning Config
+BASE_INPUT_FILE_PATH = "input_data/Customer_Names.csv"
+LIST_LIMIT = 50  # crossing limit of the generated datasets (100.000 primary records)
+NOISIFICATION_SAMPLE = 0.4
+SAMPLE_SIZE = 1000  # fuzzy queries evaluated per configuration
+SEED = 42
+RECALL_TARGET = 0.9
+DATASETS_PATH = "output_data"
+EXPORT_PATH = "output_data/tuning_report.csv"
+
+if __name__ == "__main__":
+    tic = time.perf_counter()
+
+    print("Starting Tuning process !")
+
+    # generated secondary records keep the id of the primary record they come from, as ground-truth
+    primary_path, secondary_path = generate_benchmark_datasets(
+        read_data(BASE_INPUT_FILE_PATH), LIST_LIMIT, NOISIFICATION_SAMPLE, SEED, DATASETS_PATH
+    )
+    candidates, queries = get_evaluation_queries(
+        primary_path, secondary_path, sample_size=SAMPLE_SIZE, seed=SEED
+    )
+
+    report = run_tuning(candidates, queries, DEFAULT_CONFIGURATIONS)
+    print(report.to_string())
+    report.to_csv(EXPORT_PATH, index=False)
+
+    print(f"Cheapest configuration with a recall of at least {RECALL_TARGET} :")
+    print(get_cheapest_configuration(report, RECALL_TARGET))
+
+    toc = time.perf_counter()
+    elapsed = round(toc - tic, 2)
+    print(f"Tuning process finished. Elapsed : {elapsed} s")
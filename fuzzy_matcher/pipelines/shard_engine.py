@@ -0,0 +1,214 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+from fuzzy_matcher.dataset_io import iterate_names_dataset, DatasetAppender
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe, preprocess_records
+from fuzzy_matcher.matcher.candidate_index import get_file_fingerprint
+from fuzzy_matcher.matcher.result_cache import get_cache_config, get_candidates_fingerprint
+from fuzzy_matcher.pipelines.match_engine import (
+    RESULT_COLUMNS,
+    has_matcher_inputs,
+    match_preprocessed_records,
+)
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+
+def get_shard_ids(names: pd.Series, n_shards: int) -> np.ndarray:
+    """Given the processed names, get the shard of every name : a stable hash of the name, modulo the shards count.
+
+    The hash doesn't depend on the process or machine, so every shard job selects the same names.
+    """
+    return (pd.util.hash_pandas_object(names, index=False).to_numpy() % np.uint64(n_shards)).astype(np.int64)
+
+
+def get_shard_file_paths(shard_path: str, shard_id: int, n_shards: int) -> tuple[str, str]:
+    """Given the shards directory and a shard, get the paths of its partial results and of its manifest."""
+    shard_name = f"{shard_path}/shard_{shard_id:05d}_of_{n_shards:05d}"
+    return f"{shard_name}.parquet", f"{shard_name}.json"
+
+
+def get_shard_job(
+    secondary_file_path: str,
+    n_shards: int,
+    matcher: str,
+    matcher_options: dict = None,
+    candidates: pd.DataFrame = None,
+) -> dict:
+    """Given the secondary dataset, the matching configuration and the candidates, get the description every shard of the job must share.
+
+    Without candidates (e.g. when merging), the job doesn't pin the candidates, which the shards still have to share.
+    """
+    shard_job = {
+        "secondary_fingerprint": get_file_fingerprint(secondary_file_path),
+        "n_shards": n_shards,
+        **get_cache_config(matcher, matcher_options),
+    }
+    if candidates is not None:
+        shard_job["candidates_fingerprint"] = get_candidates_fingerprint(candidates["full_name_processed"])
+    return shard_job
+
+
+def read_shard_names(secondary_file_path: str, shard_id: int, n_shards: int, chunk_size: int = 1000000) -> pd.DataFrame:
+    """Given the secondary dataset path, get the deduplicated preprocessed names of a shard, reading the dataset in chunks."""
+    shard_chunks = []
+    for secondary_chunk in iterate_names_dataset(secondary_file_path, chunk_size):
+        processed_chunk = preprocess_dataframe(secondary_chunk).drop_duplicates("full_name_processed")
+        shard_chunks.append(
+            processed_chunk[get_shard_ids(processed_chunk["full_name_processed"], n_shards) == shard_id]
+        )
+    if len(shard_chunks) == 0:
+        return pd.DataFrame(columns=["full_name_processed", "full_name_sorted"])
+    return pd.concat(shard_chunks, ignore_index=True).drop_duplicates("full_name_processed")
+
+
+def run_shard_matching(
+    candidates: pd.DataFrame,
+    secondary_file_path: str,
+    shard_path: str,
+    shard_id: int,
+    n_shards: int,
+    matcher: str = "batch",
+    matcher_options: dict = None,
+    chunk_size: int = 1000000,
+) -> int:
+    """Given resident candidates and the secondary dataset path, match the distinct names of one shard and write its partial results.
+
+    Partial results have one row per distinct name of the shard, with the RESULT_COLUMNS schema. The shard manifest
+    is written last, so a shard without a manifest is not finished. Returns the number of matched names (-1 on error).
+    """
+    if not has_matcher_inputs(matcher, candidates, matcher_options):
+        return -1
+    if not 0 <= shard_id < n_shards:
+        logging.error(f"Shard {shard_id} is not part of the {n_shards} shards, stopping matching !")
+        return -1
+    if not os.path.exists(secondary_file_path):
+        logging.error("Provided secondary path does not exist, stopping matching !")
+        return -1
+
+    shard_job = get_shard_job(secondary_file_path, n_shards, matcher, matcher_options, candidates)
+    shard_names = read_shard_names(secondary_file_path, shard_id, n_shards, chunk_size)
+    logging.info(f"Matching {shard_names.shape[0]} distinct names of shard {shard_id} / {n_shards} !")
+    shard_results = match_preprocessed_records(
+        shard_names, candidates, matcher=matcher, matcher_options=matcher_options
+    )
+
+    os.makedirs(shard_path, exist_ok=True)
+    results_path, manifest_path = get_shard_file_paths(shard_path, shard_id, n_shards)
+    shard_results.to_parquet(results_path, index=False)
+    with open(f"{manifest_path}.tmp", "w") as manifest_file:
+        json.dump({**shard_job, "shard_id": shard_id, "names": shard_results.shape[0]}, manifest_file)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    logging.info(f"Saved shard {shard_id} / {n_shards} results to : {results_path} !")
+    return shard_results.shape[0]
+
+
+def read_shard_results(shard_path: str, shard_job: dict) -> pd.DataFrame:
+    """Given the shards directory and the job description, read the partial results of every shard.
+
+    Returns an empty frame if a shard is missing, unfinished or was run for another job, or if the shards
+    were matched against different candidates.
+    """
+    n_shards = shard_job["n_shards"]
+    missing_shards, shard_results, candidates_fingerprints = [], [], set()
+    for shard_id in range(n_shards):
+        results_path, manifest_path = get_shard_file_paths(shard_path, shard_id, n_shards)
+        if not os.path.exists(manifest_path):
+            missing_shards.append(shard_id)
+            continue
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        if {key: manifest.get(key) for key in shard_job} != shard_job:
+            logging.error(f"Shard {shard_id} was run for another secondary dataset or configuration !")
+            missing_shards.append(shard_id)
+            continue
+        candidates_fingerprints.add(manifest.get("candidates_fingerprint"))
+        shard_results.append(pd.read_parquet(results_path))
+    if len(missing_shards) > 0:
+        logging.error(f"Missing {len(missing_shards)} of {n_shards} shards : {missing_shards}, stopping merge !")
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    if len(candidates_fingerprints) > 1 or None in candidates_fingerprints:
+        logging.error("Shards were matched against different (or unknown) candidates, stopping merge !")
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(shard_results, ignore_index=True)
+
+
+def get_tmp_export_path(export_path: str) -> str:
+    """Given an export path, get the temporary path it is written to before being moved in place (same format extension)."""
+    export_root, export_extension = os.path.splitext(export_path)
+    return f"{export_root}.tmp{export_extension}"
+
+
+def merge_shard_results(
+    secondary_file_path: str,
+    shard_path: str,
+    export_path: str,
+    n_shards: int,
+    matcher: str = "batch",
+    matcher_options: dict = None,
+    chunk_size: int = 1000000,
+    candidates: pd.DataFrame = None,
+) -> dict:
+    """Given the secondary dataset path and the partial results of all the shards, write the final standardized results.
+
+    The secondary dataset is read in chunks (every record keeping its row number as `record_id`, as in the streaming
+    pipeline) and the result of every record is looked up in the shards results. If `candidates` are provided, the shards must have been
+    matched against them. The results are written to a temporary file, moved to the export path only once complete.
+    Returns the count of records per mapping source, or an empty dict (and no export) if a shard is missing or a
+    name was not matched by any shard.
+    """
+    if not os.path.exists(secondary_file_path):
+        logging.error("Provided secondary path does not exist, stopping merge !")
+        return {}
+    shard_results = read_shard_results(
+        shard_path, get_shard_job(secondary_file_path, n_shards, matcher, matcher_options, candidates)
+    )
+    if shard_results.shape[0] == 0:
+        return {}
+    results_index = pd.Index(shard_results["search_name_normalized"])
+
+    source_counts = {}
+    tmp_export_path = get_tmp_export_path(export_path)
+    appender = DatasetAppender(tmp_export_path)
+    merged = False
+    processed = 0
+    try:
+        for secondary_chunk in iterate_names_dataset(secondary_file_path, chunk_size):
+            secondary_chunk.index = pd.RangeIndex(processed, processed + secondary_chunk.shape[0])
+            processed += secondary_chunk.shape[0]
+            processed_chunk = preprocess_records(secondary_chunk)
+            positions = results_index.get_indexer(processed_chunk["full_name_processed"])
+            if (positions < 0).any():
+                logging.error(f"{(positions < 0).sum()} names were not matched by any shard, stopping merge !")
+                return {}
+            # shards results are per distinct name, the record ids are the ones of the merged records
+            chunk_results = (
+                shard_results.iloc[positions]
+                .assign(record_id=processed_chunk["record_id"].to_numpy())
+                .reset_index(drop=True)[RESULT_COLUMNS]
+            )
+            appender.append(chunk_results)
+            for source, count in chunk_results["mapping_source"].value_counts().items():
+                source_counts[source] = source_counts.get(source, 0) + int(count)
+        if appender.appended == 0:
+            appender.append(pd.DataFrame(columns=RESULT_COLUMNS))
+        merged = True
+    finally:
+        appender.close()
+        if merged:
+            os.replace(tmp_export_path, export_path)
+        elif os.path.exists(tmp_export_path):
+            os.remove(tmp_export_path)
+    logging.info(f"Merged {n_shards} shards results to : {export_path} !")
+    return source_counts
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,249 @@
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+import numpy as np
+import pandas as pd
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe
+from fuzzy_matcher.pipelines.match_engine import (
+    get_batch_matcher_options,
+    match_preprocessed_records,
+)
+
+# set logging basic config
+logging.basicConfig(
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%m/%d/%Y %I:%M:%S",
+    level=logging.INFO,
+)
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+def get_latency_percentiles(latencies: list["float"]) -> dict:
+    """Given request latencies (seconds), get their p50 / p99 (milliseconds)."""
+    if len(latencies) == 0:
+        return {"p50_ms": None, "p99_ms": None}
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    return {"p50_ms": float(p50), "p99_ms": float(p99)}
+
+
+class MicroBatcher:
+    """Groups the names requested concurrently into batches, each matched with a single call of the matching engine.
+
+    A batch is closed when it reaches `max_batch_size` names or `max_wait_ms` after its first name, whichever
+    comes first, so that throughput comes from batching while the added latency stays bounded.
+    The candidates side index of the matcher (`get_batch_matcher_options`) is built once and stays resident,
+    so a batch only pays for scoring its own names.
+    """
+
+    def __init__(
+        self,
+        candidates: pd.DataFrame,
+        matcher: str = "batch",
+        matcher_options: dict = None,
+        max_batch_size: int = 256,
+        max_wait_ms: float = 5,
+        latency_window: int = 10000,
+    ):
+        self.candidates = candidates
+        self.matcher = matcher
+        self.matcher_options = get_batch_matcher_options(matcher, candidates, matcher_options)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.batches = 0
+        self.queue = None
+        self.worker = None
+
+    def start(self) -> None:
+        """Start the batching worker, on the running event loop."""
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the batching worker."""
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    async def match(self, first_name: str, last_name: str) -> dict:
+        """Given a name, wait for its match, computed with the other names of its batch."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((first_name, last_name, future, time.perf_counter()))
+        return await future
+
+    async def get_batch(self) -> list["tuple"]:
+        """Wait for a first request, then collect the next ones until the batch is full or its wait time is over."""
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def match_batch(self, names: list["tuple"]) -> dict:
+        """Given the (first name, last name) of a batch, match them and get the result of every distinct name."""
+        secondary_df = preprocess_dataframe(
+            pd.DataFrame(names, columns=["first_name", "last_name"])
+        )
+        results_df = match_preprocessed_records(
+            secondary_df,
+            self.candidates,
+            matcher=self.matcher,
+            matcher_options=self.matcher_options,
+        )
+        # preprocessed records and their results are in the same order, the record ids being positions in the batch
+        return dict(
+            zip(
+                zip(secondary_df["first_name"], secondary_df["last_name"]),
+                results_df.drop(columns="record_id").to_dict("records"),
+            )
+        )
+
+    async def run(self) -> None:
+        """Match the batches one after the other, off the event loop so that new requests keep being accepted."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.get_batch()
+            names = [(first_name, last_name) for first_name, last_name, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.match_batch, names)
+            except Exception as error:
+                logging.error(f"Matching a batch of {len(batch)} names failed : {error}")
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            finished = time.perf_counter()
+            for first_name, last_name, future, received in batch:
+                self.latencies.append(finished - received)
+                if not future.done():
+                    future.set_result(results[(first_name, last_name)])
+            self.requests += len(batch)
+            self.batches += 1
+
+    def get_stats(self) -> dict:
+        """Get the served requests and batches counts, and the latency percentiles of the latest requests."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches > 0 else None,
+            **get_latency_percentiles(list(self.latencies)),
+        }
+
+
+async def read_http_request(reader: asyncio.StreamReader) -> tuple:
+    """Given a connection reader, read one http request : (method, path, body), None if the connection was closed."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        header_line = await reader.readline()
+        if header_line in [b"\r\n", b"\n", b""]:
+            break
+        key, _, value = header_line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return method, path, body
+
+
+async def write_http_response(writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+    """Given a connection writer, write a json http response."""
+    body = json.dumps(payload, default=str).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+
+
+async def handle_connection(
+    batcher: MicroBatcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """Given a client connection, serve its (keep-alive) requests.
+
+    `POST /match` with a json `{"first_name": ..., "last_name": ...}` body gets the match of the name,
+    `GET /stats` gets the service stats (latency percentiles included).
+    """
+    try:
+        while True:
+            request = await read_http_request(reader)
+            if request is None:
+                break
+            method, path, body = request
+            if method == "POST" and path == "/match":
+                try:
+                    name = json.loads(body)
+                    first_name, last_name = str(name["first_name"]), str(name["last_name"])
+                except (ValueError, KeyError, TypeError):
+                    await write_http_response(
+                        writer, 400, {"error": "expected a json body with first_name and last_name"}
+                    )
+                    continue
+                try:
+                    result = await batcher.match(first_name, last_name)
+                except Exception as error:
+                    await write_http_response(writer, 500, {"error": str(error)})
+                    continue
+                await write_http_response(writer, 200, result)
+            elif method == "GET" and path == "/stats":
+                await write_http_response(writer, 200, batcher.get_stats())
+            else:
+                await write_http_response(writer, 404, {"error": f"unknown endpoint {method} {path}"})
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_match_service(
+    batcher: MicroBatcher, host: str = "127.0.0.1", port: int = 8080
+) -> asyncio.AbstractServer:
+    """Given a micro-batcher, start it and serve it over http on the given local address."""
+    batcher.start()
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(batcher, reader, writer), host, port
+    )
+    logging.info(f"Match service listening on : {host}:{server.sockets[0].getsockname()[1]} !")
+    return server
+
+
+async def run_match_service(
+    candidates: pd.DataFrame,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    matcher: str = "batch",
+    matcher_options: dict = None,
+    max_batch_size: int = 256,
+    max_wait_ms: float = 5,
+    stats_interval_s: float = 60,
+) -> None:
+    """Given resident candidates, serve their matching until cancelled, logging the latency percentiles periodically."""
+    batcher = MicroBatcher(candidates, matcher, matcher_options, max_batch_size, max_wait_ms)
+    server = await start_match_service(batcher, host, port)
+    try:
+        async with server:
+            while True:
+                await asyncio.sleep(stats_interval_s)
+                logging.info(f"Match service stats : {batcher.get_stats()}")
+    finally:
+        await batcher.stop()
+
+
+if __name__ == "__main__":
+    pass
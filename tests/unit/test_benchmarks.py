@@ -0,0 +1,32 @@
+import pandas as pd
+from fuzzy_matcher.benchmark.benchmark_matchers import (
+    generate_benchmark_datasets,
+    run_benchmark_case,
+    compare_benchmarks,
+)
+
+
+def test_run_benchmark_case(tmp_path):
+    names_df = pd.DataFrame({
+        "first_name": ["Michael", "Curtis", "John", "Mary"],
+        "last_name": ["Jackson", "Smith", "Lenon", "Lee"]
+    })
+    primary_path, secondary_path = generate_benchmark_datasets(names_df, 4, 0.5, 1, str(tmp_path))
+    result = run_benchmark_case(primary_path, secondary_path, "batch")
+    assert(result["status"] == "ok")
+    assert(result["primary_records"] == 16)
+    assert(result["candidates_scored"] == result["fuzzy_queries"] * 16)
+    assert(set(result["stages"]) == {"read_s", "preprocess_s", "exact_match_s", "fuzzy_match_s", "post_processing_s"})
+
+def test_compare_benchmarks():
+    reference = {"results": [
+        {"list_limit": 10, "strategy": "batch", "status": "ok", "queries_per_sec": 100.0},
+        {"list_limit": 10, "strategy": "indexed", "status": "ok", "queries_per_sec": 100.0},
+    ]}
+    current = {"results": [
+        {"list_limit": 10, "strategy": "batch", "status": "ok", "queries_per_sec": 95.0},
+        {"list_limit": 10, "strategy": "indexed", "status": "ok", "queries_per_sec": 50.0},
+        {"list_limit": 10, "strategy": "matrix", "status": "skipped"},
+    ]}
+    regressions = compare_benchmarks(reference, current, tolerance=0.1)
+    assert([regression["strategy"] for regression in regressions] == ["indexed"])
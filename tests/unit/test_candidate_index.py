@@ -0,0 +1,54 @@
+import pandas as pd
+from fuzzy_matcher.matcher.candidate_index import (
+    encode_strings,
+    decode_strings,
+    open_candidate_index,
+    load_or_build_candidate_index,
+    get_candidate_strings,
+    get_candidate_fields,
+    get_column_store,
+)
+from fuzzy_matcher.matcher.ngram_index import get_candidate_ids
+
+
+def write_primary_dataset(file_path, first_names):
+    pd.DataFrame({
+        "first_name": first_names,
+        "last_name": ["Smith"] * len(first_names)
+    }).to_csv(file_path, index=False)
+
+def test_encode_decode_strings():
+    test_strings = ["john smith", "", "zoë smith"]
+    buffer, offsets = encode_strings(test_strings)
+    assert(decode_strings(buffer, offsets) == test_strings)
+
+def test_get_column_store():
+    test_strings = ["john smith", "", "zoë smith", "mary smith"]
+    for column in [pd.Series(test_strings, dtype=object), pd.Series(test_strings, dtype=pd.StringDtype("pyarrow"))[1:]]:
+        candidate_store = get_column_store(column)
+        assert(list(candidate_store.get_strings()) == column.tolist())
+        assert(list(candidate_store.get_lengths()) == column.str.len().tolist())
+
+def test_open_candidate_index_invalid_path():
+    assert(open_candidate_index("test_path_non_existent/index.fzi") == {})
+
+def test_candidate_index_roundtrip(tmp_path):
+    primary_path = tmp_path / "primary.csv"
+    index_path = tmp_path / "primary.fzi"
+    write_primary_dataset(primary_path, ["John", " John ", "Mary"])
+    candidate_index = load_or_build_candidate_index(str(primary_path), str(index_path))
+    assert(get_candidate_strings(candidate_index) == ["john smith", "mary smith"])
+    assert(get_candidate_strings(candidate_index, token_sorted=True) == ["john smith", "mary smith"])
+    assert(get_candidate_fields(candidate_index) == (["John", "Mary"], ["Smith", "Smith"]))
+    assert(list(get_candidate_ids("smith mary", candidate_index, min_shared_ratio=0.9)) == [1])
+
+def test_candidate_index_rebuilt_on_change(tmp_path):
+    primary_path = tmp_path / "primary.csv"
+    index_path = tmp_path / "primary.fzi"
+    write_primary_dataset(primary_path, ["John"])
+    first_index = load_or_build_candidate_index(str(primary_path), str(index_path))
+    reopened_index = load_or_build_candidate_index(str(primary_path), str(index_path))
+    assert(first_index["fingerprint"] == reopened_index["fingerprint"])
+    write_primary_dataset(primary_path, ["John", "Mary"])
+    rebuilt_index = load_or_build_candidate_index(str(primary_path), str(index_path))
+    assert(rebuilt_index["size"] == 2)
@@ -0,0 +1,52 @@
+import numpy as np
+from fuzzy_matcher.matcher.match_datasets import (
+    process_best_fuzzy_match_streaming,
+    process_top_k_fuzzy_match_streaming,
+)
+from fuzzy_matcher.matcher.candidate_store import (
+    build_candidate_store,
+    share_candidate_store,
+    attach_candidate_store,
+    take_candidate_strings,
+)
+
+
+def test_candidate_store_strings():
+    candidates = ["mike jackson", "zoë smith", "", "drake"]
+    candidate_store = build_candidate_store(candidates)
+    assert(len(candidate_store) == 4)
+    assert(candidate_store.get_strings().tolist() == candidates)
+    assert(candidate_store.get_strings(1, 3).tolist() == ["zoë smith", ""])
+
+def test_candidate_store_lengths():
+    candidates = ["mike jackson", "zoë smith", "", "北京", "drake"]
+    assert(build_candidate_store(candidates).get_lengths().tolist() == [len(candidate) for candidate in candidates])
+
+def test_candidate_store_take():
+    candidates = ["mike jackson", "zoë smith", "", "drake"]
+    candidate_store = build_candidate_store(candidates)
+    taken_store = candidate_store.take(np.array([3, 1, 2, 1]))
+    assert(taken_store.get_strings().tolist() == ["drake", "zoë smith", "", "zoë smith"])
+    assert(take_candidate_strings(candidate_store, [0, 3]).tolist() == ["mike jackson", "drake"])
+    assert(take_candidate_strings(candidates, [0, 3]).tolist() == ["mike jackson", "drake"])
+
+def test_share_and_attach_candidate_store():
+    candidates = ["mike jackson", "zoë smith", ""]
+    shared_block, spec = share_candidate_store(build_candidate_store(candidates))
+    try:
+        attached_block, candidate_store = attach_candidate_store(spec)
+        assert(candidate_store.get_strings().tolist() == candidates)
+        del candidate_store
+        attached_block.close()
+    finally:
+        shared_block.close()
+        shared_block.unlink()
+
+def test_fuzzy_match_streaming_candidate_store():
+    test_strings = ["Michael Jackson", "Curtis Jackson", "Drake", "Sting", "John Lennon", "Xyzw"]
+    candidates = ["Mike Jackson", "James Hetfield","Sting", "John Lenon", "Drake", "Curtis (50Cent) Jackson"]
+    store_df = process_best_fuzzy_match_streaming(test_strings, build_candidate_store(candidates))
+    strings_df = process_best_fuzzy_match_streaming(test_strings, candidates)
+    assert(store_df.equals(strings_df))
+    top_k_df = process_top_k_fuzzy_match_streaming(test_strings, build_candidate_store(candidates), k=2)
+    assert(top_k_df.equals(process_top_k_fuzzy_match_streaming(test_strings, candidates, k=2)))
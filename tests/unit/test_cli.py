@@ -0,0 +1,53 @@
+import sys
+import json
+import subprocess
+import pandas as pd
+from fuzzy_matcher.cli import load_run_config, main
+
+
+def write_names_datasets(tmp_path):
+    pd.DataFrame({"first_name": ["Michael", "Curtis", "John"], "last_name": ["Jackson", "Jackson", "Lenon"]}).to_csv(tmp_path / "primary.csv", index=False)
+    pd.DataFrame({"first_name": ["Michael", "Johnn"], "last_name": ["Jackson", "Lenon"]}).to_csv(tmp_path / "secondary.csv", index=False)
+
+def test_load_run_config(tmp_path):
+    config_path = tmp_path / "run.json"
+    config_path.write_text(json.dumps({"match": {"matcher": "fields", "chunk_size": 10}}))
+    run_config = load_run_config("match", str(config_path), ["chunk_size=20", "export_path=out.csv", "canonical_steps=[\"sort_tokens\"]"])
+    assert(run_config["matcher"] == "fields")
+    assert(run_config["chunk_size"] == 20)
+    assert(run_config["export_path"] == "out.csv")
+    assert(run_config["canonical_steps"] == ["sort_tokens"])
+    assert(run_config["mode"] == "batch")
+    assert(load_run_config("match", None, ["unknown=1"]) == {})
+    assert(load_run_config("match", str(tmp_path / "missing.json")) == {})
+
+def test_cli_index_and_match(tmp_path):
+    write_names_datasets(tmp_path)
+    primary_path, index_path = str(tmp_path / "primary.csv"), str(tmp_path / "primary.fzi")
+    assert(main(["index", "--set", f"primary_path={primary_path}", "--set", f"index_path={index_path}"]) == 0)
+    for mode in ["batch", "streaming"]:
+        export_path = tmp_path / f"results_{mode}.csv"
+        exit_code = main([
+            "match",
+            "--set", f"mode={mode}",
+            "--set", f"primary_path={primary_path}",
+            "--set", f"secondary_path={tmp_path / 'secondary.csv'}",
+            "--set", f"index_path={index_path}",
+            "--set", f"export_path={export_path}",
+            "--set", "matcher_options={\"score_cutoff\": 80, \"dtype\": \"uint8\"}",
+        ])
+        assert(exit_code == 0)
+        assert(pd.read_csv(export_path)["mapping_source"].tolist() == ["direct_join", "fuzzy_matching_batch"])
+    assert(main(["match", "--set", "matcher=unknown"]) == 1)
+
+def test_cli_lazy_imports():
+    imported = subprocess.run(
+        [sys.executable, "-c", "import sys, fuzzy_matcher.cli; print(sorted(set(['pandas', 'rapidfuzz', 'sklearn']) & set(sys.modules)))"],
+        capture_output=True, text=True, check=True,
+    )
+    assert(imported.stdout.strip() == "[]")
+    imported = subprocess.run(
+        [sys.executable, "-c", "import sys, fuzzy_matcher.pipelines.match_engine; print(sorted(set(['sklearn', 'scipy', 'fuzzy_matcher.matcher.parallel_match']) & set(sys.modules)))"],
+        capture_output=True, text=True, check=True,
+    )
+    assert(imported.stdout.strip() == "[]")
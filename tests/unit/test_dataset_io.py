@@ -0,0 +1,48 @@
+import pandas as pd
+from fuzzy_matcher.dataset_io import (
+    get_file_format,
+    read_names_dataset,
+    iterate_names_dataset,
+    write_names_dataset,
+    DatasetAppender,
+)
+
+
+def get_test_dataset():
+    return pd.DataFrame({
+        "first_name": ["John", "Nan", "Mary"],
+        "last_name": ["Smith", "NA", "Lee"],
+        "other": [1, 2, 3]
+    })
+
+def test_get_file_format():
+    assert(get_file_format("data/primary.parquet") == "parquet")
+    assert(get_file_format("data/primary.csv") == "csv")
+    assert(get_file_format("data/primary.csv", "parquet") == "parquet")
+
+def test_names_dataset_roundtrip(tmp_path):
+    test_df = get_test_dataset()
+    for file_name in ["names.csv", "names.parquet"]:
+        write_names_dataset(test_df, str(tmp_path / file_name))
+        read_df = read_names_dataset(str(tmp_path / file_name))
+        # only the name columns are read, and names are never parsed as missing
+        assert(list(read_df.columns) == ["first_name", "last_name"])
+        assert(read_df["last_name"].tolist() == ["Smith", "NA", "Lee"])
+
+def test_iterate_names_dataset(tmp_path):
+    test_df = get_test_dataset()
+    for file_name in ["names.csv", "names.parquet"]:
+        write_names_dataset(test_df, str(tmp_path / file_name))
+        chunks = list(iterate_names_dataset(str(tmp_path / file_name), chunk_size=2))
+        assert([chunk.shape[0] for chunk in chunks] == [2, 1])
+        assert(chunks[1]["first_name"].tolist() == ["Mary"])
+
+def test_dataset_appender(tmp_path):
+    test_df = get_test_dataset()
+    for file_name in ["names.csv", "names.parquet"]:
+        appender = DatasetAppender(str(tmp_path / file_name))
+        appender.append(test_df[:2])
+        appender.append(test_df[2:])
+        appender.close()
+        read_df = read_names_dataset(str(tmp_path / file_name), columns=["first_name", "other"])
+        assert(read_df["first_name"].tolist() == ["John", "Nan", "Mary"])
@@ -0,0 +1,39 @@
+import pandas as pd
+from fuzzy_matcher.matcher.field_index import (
+    build_field_index,
+    process_best_field_match,
+)
+from fuzzy_matcher.pipelines.match_engine import run_matching_pipeline
+
+
+def get_test_field_index():
+    first_names = ["Michael", "Curtis", "John", "John", "Mary"]
+    last_names = ["Jackson", "Jackson", "Lenon", "Smith", "Smith"]
+    candidates = [f"{first} {last}".lower() for first, last in zip(first_names, last_names)]
+    return build_field_index(first_names, last_names, candidates)
+
+def test_build_field_index():
+    field_index = get_test_field_index()
+    assert(field_index["first_vocabulary"].tolist() == ["michael", "curtis", "john", "mary"])
+    assert(field_index["last_vocabulary"].tolist() == ["jackson", "lenon", "smith"])
+    assert(field_index["pair_index"].get_indexer([2 * 3 + 2, 3 * 3 + 1]).tolist() == [3, -1])
+
+def test_field_match_orientations():
+    matched_df = process_best_field_match(
+        ["johnn lenon", "lenon johnn", "marry jackson", "xyzw qrst"],
+        ["Johnn", "Lenon", "Marry", "Xyzw"],
+        ["Lenon", "Johnn", "Jackson", "Qrst"],
+        get_test_field_index(),
+        top_n=2,
+    )
+    assert(matched_df["matched_string"].tolist()[:2] == ["john lenon", "john lenon"])
+    # mary jackson doesn't exist, the closest existing pair is kept
+    assert(matched_df["matched_string"].iloc[2] in ["mary smith", "michael jackson"])
+    assert(matched_df["match_index"].iloc[3] == -1)
+
+def test_matching_pipeline_fields():
+    primary_df = pd.DataFrame({"first_name": ["Michael", "Curtis", "John"], "last_name": ["Jackson", "Jackson", "Lenon"]})
+    secondary_df = pd.DataFrame({"first_name": ["Michael", "Lenonn"], "last_name": ["Jackson", "John"]})
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="fields")
+    assert(final_df["mapping_source"].tolist() == ["direct_join", "fuzzy_matching_fields"])
+    assert(final_df["match_name_normalized"].iloc[1] == "john lenon")
@@ -1,5 +1,15 @@
+import numpy as np
 import pandas as pd
-from fuzzy_matcher.generator.generate_data import read_data, expand_names_dataframe, add_random_character
+from fuzzy_matcher.generator.generate_data import (
+    read_data,
+    expand_names_dataframe,
+    add_random_character,
+    iterate_expanded_names,
+    multiply_suffixes_vectorized,
+    multiply_random_letters_vectorized,
+    add_random_character_vectorized,
+    noisify_dataframe,
+)
 
 
 def test_read_data_invalid_path():
@@ -28,4 +38,44 @@ def test_expand_names_dataframe():
 
     expanded_df = expand_names_dataframe(test_df, 10)
 
-    assert(expanded_df.shape[0] == 4)
\ No newline at end of file
+    assert(expanded_df.shape[0] == 4)
+
+def test_expand_names_dataframe_order():
+    test_df = pd.DataFrame({
+        "first_name": ["name1", "name2"],
+        "last_name": ["nameX", "nameY"]
+    })
+    expanded_df = expand_names_dataframe(test_df, 10)
+    assert(expanded_df["first_name"].tolist() == ["name1", "name1", "name2", "name2"])
+    assert(expanded_df["last_name"].tolist() == ["nameX", "nameY", "nameX", "nameY"])
+
+def test_iterate_expanded_names():
+    test_df = pd.DataFrame({
+        "first_name": ["name1", "name2", "name3"],
+        "last_name": ["nameX", "nameY", "nameZ"]
+    })
+    chunks = list(iterate_expanded_names(test_df, 2, chunk_size=4))
+    assert([chunk.shape[0] for chunk in chunks] == [4, 2])
+    assert(pd.concat(chunks).equals(expand_names_dataframe(test_df, 2)))
+
+def test_vectorized_noise_functions():
+    rng = np.random.default_rng(0)
+    test_strings = pd.Series(["anna", "bob", ""])
+    suffixed = multiply_suffixes_vectorized(test_strings, rng)
+    assert(all(value.startswith(original) for value, original in zip(suffixed, test_strings)))
+    assert(suffixed.iloc[2] == "")
+    multiplied = multiply_random_letters_vectorized(test_strings, rng)
+    assert(multiplied.str.replace("a+", "a", regex=True).str.replace("o+", "o", regex=True).tolist() == ["anna", "bob", ""])
+    added = add_random_character_vectorized(test_strings, rng)
+    assert((added.str.len() == test_strings.str.len() + 1).all())
+
+def test_noisify_dataframe_seeded():
+    test_df = expand_names_dataframe(pd.DataFrame({
+        "first_name": [f"first{i}" for i in range(20)],
+        "last_name": [f"last{i}" for i in range(20)]
+    }), 5)
+    noisified_df = noisify_dataframe(test_df, 0.5, seed=1)
+    assert(noisified_df.equals(noisify_dataframe(test_df, 0.5, seed=1)))
+    assert(noisified_df["primary_id"].tolist() == list(range(100)))
+    changed = (noisified_df[["first_name", "last_name"]] != test_df).any(axis=1).sum()
+    assert(0 < changed <= 50)
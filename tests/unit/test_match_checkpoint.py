@@ -0,0 +1,78 @@
+import json
+import pandas as pd
+from fuzzy_matcher.matcher.match_checkpoint import (
+    get_checkpoint_job,
+    open_checkpoint,
+    get_pending_batches,
+    save_checkpoint_batch,
+    read_checkpoint_batches,
+)
+from fuzzy_matcher.pipelines.match_engine import (
+    get_candidates,
+    match_preprocessed_records,
+)
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe
+
+
+def get_job(queries, batch_size=2):
+    return get_checkpoint_job(pd.Series(queries), pd.Series(["john smith", "mary lee"]), "batch", batch_size=batch_size)
+
+def get_matches(queries):
+    return pd.DataFrame({"string_to_match": queries, "matched_string": ["john smith"] * len(queries), "similarity_score": [90.0] * len(queries)})
+
+def test_checkpoint_job_fingerprints():
+    assert(get_job(["a b", "c d"]) == get_job(["a b", "c d"]))
+    # batches are query ranges, so the queries order matters
+    assert(get_job(["a b", "c d"])["queries"] != get_job(["c d", "a b"])["queries"])
+    assert(get_job(["a b"])["config"] != get_checkpoint_job(pd.Series(["a b"]), pd.Series(["john smith"]), "indexed")["config"])
+
+def test_checkpoint_job_execution_options():
+    queries, candidate_names = pd.Series(["a b"]), pd.Series(["john smith"])
+    # a restart with a smaller memory budget or other workers resumes the same job
+    execution_options = {"memory_budget": 1024, "workers": 1, "chunk_size": 10}
+    assert(get_checkpoint_job(queries, candidate_names, "batch", execution_options) == get_checkpoint_job(queries, candidate_names, "batch"))
+    assert(get_checkpoint_job(queries, candidate_names, "batch", {"score_cutoff": 80}) != get_checkpoint_job(queries, candidate_names, "batch"))
+
+def test_checkpoint_resume(tmp_path):
+    queries = ["jon smith", "john smyth", "jhon smith", "xyzw"]
+    checkpoint = open_checkpoint(str(tmp_path), get_job(queries))
+    assert(get_pending_batches(checkpoint) == [(0, 2), (2, 4)])
+    save_checkpoint_batch(checkpoint, 0, 2, get_matches(queries[:2]))
+    # a restart with the same job only has the unfinished batch left
+    resumed = open_checkpoint(str(tmp_path), get_job(queries))
+    assert(get_pending_batches(resumed) == [(2, 4)])
+    save_checkpoint_batch(resumed, 2, 4, get_matches(queries[2:3]))
+    assert(read_checkpoint_batches(resumed)["string_to_match"].tolist() == queries[:3])
+    assert(not any(path.name.endswith(".tmp") for path in tmp_path.iterdir()))
+    # other queries discard the checkpointed batches
+    other = open_checkpoint(str(tmp_path), get_job(queries[:3]))
+    assert(get_pending_batches(other) == [(0, 2), (2, 3)])
+    assert(sorted(path.name for path in tmp_path.iterdir()) == ["manifest.json"])
+
+def test_match_preprocessed_records_checkpoint(tmp_path):
+    candidates = get_candidates(preprocess_dataframe(pd.DataFrame({"first_name": ["Michael", "John", "Mary"], "last_name": ["Jackson", "Lenon", "Lee"]})))
+    secondary_df = preprocess_dataframe(pd.DataFrame({"first_name": ["Micheal", "Johnn", "Marry", "Xyzw"], "last_name": ["Jackson", "Lenon", "Lee", "Qrst"]}))
+    reference_df = match_preprocessed_records(secondary_df, candidates)
+    stats = {}
+    first_run_df = match_preprocessed_records(secondary_df, candidates, stats=stats, checkpoint_path=str(tmp_path), checkpoint_batch_size=3)
+    assert(first_run_df.equals(reference_df))
+    assert(stats["checkpoint_resumed"] == 0)
+    # simulate a run interrupted after its first batch
+    with open(tmp_path / "manifest.json") as manifest_file:
+        manifest = json.load(manifest_file)
+    manifest["batches"] = manifest["batches"][:1]
+    with open(tmp_path / "manifest.json", "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    stats = {}
+    resumed_df = match_preprocessed_records(secondary_df, candidates, stats=stats, checkpoint_path=str(tmp_path), checkpoint_batch_size=3)
+    assert(resumed_df.equals(reference_df))
+    assert(stats["checkpoint_resumed"] == 3)
+
+def test_checkpointed_matchers(tmp_path):
+    candidates = get_candidates(preprocess_dataframe(pd.DataFrame({"first_name": ["Michael", "John", "Mary"], "last_name": ["Jackson", "Lenon", "Lee"]})))
+    secondary_df = preprocess_dataframe(pd.DataFrame({"first_name": ["Micheal", "Johnn", "Marry", "Xyzw"], "last_name": ["Jackson", "Lenon", "Lee", "Qrst"]}))
+    # the candidates side indexes are built once for all the batches
+    for matcher in ["indexed", "tfidf", "rerank", "fields"]:
+        reference_df = match_preprocessed_records(secondary_df, candidates, matcher=matcher)
+        checkpointed_df = match_preprocessed_records(secondary_df, candidates, matcher=matcher, checkpoint_path=str(tmp_path / matcher), checkpoint_batch_size=1)
+        assert(checkpointed_df.equals(reference_df))
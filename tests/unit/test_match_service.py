@@ -0,0 +1,85 @@
+import json
+import asyncio
+import pandas as pd
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe
+from fuzzy_matcher.pipelines.match_engine import get_candidates
+from fuzzy_matcher.service.match_service import (
+    get_latency_percentiles,
+    MicroBatcher,
+    start_match_service,
+)
+
+
+def get_test_candidates():
+    primary_df = pd.DataFrame({"first_name": ["Michael", "John"], "last_name": ["Jackson", "Lenon"]})
+    return get_candidates(preprocess_dataframe(primary_df))
+
+def test_latency_percentiles():
+    assert(get_latency_percentiles([]) == {"p50_ms": None, "p99_ms": None})
+    percentiles = get_latency_percentiles([0.001] * 99 + [0.1])
+    assert(abs(percentiles["p50_ms"] - 1.0) < 1e-9)
+    assert(percentiles["p99_ms"] > 1.0)
+
+def test_micro_batcher_groups_concurrent_requests():
+    async def run():
+        batcher = MicroBatcher(get_test_candidates(), max_batch_size=10, max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(
+                batcher.match("Micheal", "Jackson"),
+                batcher.match("John", "Lenon"),
+                batcher.match("Micheal", "Jackson"),
+                batcher.match("Xyzw", "Qrst"),
+            ), batcher.get_stats()
+        finally:
+            await batcher.stop()
+
+    results, stats = asyncio.run(run())
+    assert(stats["requests"] == 4 and stats["batches"] == 1)
+    assert([result["mapping_source"] for result in results] == ["fuzzy_matching_batch", "direct_join", "fuzzy_matching_batch", "unmapped"])
+    assert(results[0]["match_name_normalized"] == "michael jackson")
+    assert(results[0] == results[2])
+
+def test_micro_batcher_resident_index():
+    batcher = MicroBatcher(get_test_candidates(), matcher="fields")
+    field_index = batcher.matcher_options["field_index"]
+    for _ in range(2):
+        results = batcher.match_batch([("Micheal", "Jackson"), ("Lenon", "Jon")])
+        assert(results[("Micheal", "Jackson")]["match_name_normalized"] == "michael jackson")
+        assert(results[("Lenon", "Jon")]["match_name_normalized"] == "john lenon")
+    assert(batcher.matcher_options["field_index"] is field_index)
+    assert("candidate_buckets" in MicroBatcher(get_test_candidates()).matcher_options)
+
+def test_match_service_http():
+    async def request(port, payload):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        method, path, body = payload
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            key, _, value = line.decode().partition(":")
+            headers[key.lower()] = value.strip()
+        response = json.loads(await reader.readexactly(int(headers["content-length"])))
+        writer.close()
+        return status, response
+
+    async def run():
+        batcher = MicroBatcher(get_test_candidates(), max_wait_ms=5)
+        server = await start_match_service(batcher, port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            match = await request(port, ("POST", "/match", b'{"first_name": "Johnn", "last_name": "Lenon"}'))
+            bad_request = await request(port, ("POST", "/match", b'{"first_name": "Johnn"}'))
+            stats = await request(port, ("GET", "/stats", b""))
+        finally:
+            server.close()
+            await server.wait_closed()
+            await batcher.stop()
+        return match, bad_request, stats
+
+    match, bad_request, stats = asyncio.run(run())
+    assert(match[0] == 200 and match[1]["match_name_normalized"] == "john lenon")
+    assert(bad_request[0] == 400)
+    assert(stats[0] == 200 and stats[1]["requests"] == 1 and stats[1]["p50_ms"] is not None)
@@ -1,5 +1,23 @@
+import numpy as np
 import pandas as pd
-from fuzzy_matcher.matcher.match_datasets import get_best_fuzzy_match_process, process_best_fuzzy_match_baseline, process_best_fuzzy_match_batch
+from fuzzy_matcher.matcher.match_datasets import (
+    get_best_fuzzy_match_process,
+    process_best_fuzzy_match_baseline,
+    process_best_fuzzy_match_batch,
+    process_best_fuzzy_match_streaming,
+    process_top_k_fuzzy_match_streaming,
+    get_tile_sizes,
+    select_top_k,
+    preprocess_dataframe,
+    get_token_sorted_keys,
+    get_length_bounds,
+    get_length_groups,
+    get_length_buckets,
+    get_canonical_names,
+    collapse_repeated_characters,
+)
+from rapidfuzz.process import cdist
+from rapidfuzz.fuzz import token_sort_ratio, ratio
 
 
 def test_fuzzy_match_single_input():
@@ -18,4 +36,141 @@ def test_fuzzy_match_batch():
     test_strings = ["Michael Jackson", "Curtis Jackson", "Drake"]
     candidates = ["Mike Jackson", "James Hetfield","Sting", "John Lenon", "Drake", "Curtis (50Cent) Jackson"]
     mapped_data = process_best_fuzzy_match_batch(queries=test_strings, candidate_strings=candidates)
-    assert(len(mapped_data) > 0)
\ No newline at end of file
+    assert(len(mapped_data) > 0)
+def test_tile_sizes_fit_budget():
+    query_tile, candidate_tile = get_tile_sizes(10000, 1000000, 4 * 1024**2, np.float32)
+    assert(query_tile * candidate_tile * 4 <= 4 * 1024**2)
+    assert(query_tile >= 1 and candidate_tile >= 1)
+
+def test_fuzzy_match_streaming_matches_batch():
+    test_strings = ["Michael Jackson", "Curtis Jackson", "Drake"]
+    candidates = ["Mike Jackson", "James Hetfield","Sting", "John Lenon", "Drake", "Curtis (50Cent) Jackson"]
+    # a budget of 8 cells forces several query and candidate tiles
+    streamed_df = process_best_fuzzy_match_streaming(test_strings, candidates, memory_budget=32)
+    full_df = process_best_fuzzy_match_streaming(test_strings, candidates)
+    assert(streamed_df.equals(full_df))
+    assert(list(streamed_df["matched_string"]) == ["Mike Jackson", "Curtis (50Cent) Jackson", "Drake"])
+
+def test_fuzzy_match_streaming_uint8():
+    test_strings = ["Michael Jackson", "Drake"]
+    candidates = ["Mike Jackson", "Drake"]
+    streamed_df = process_best_fuzzy_match_streaming(test_strings, candidates, dtype=np.uint8)
+    assert(streamed_df["similarity_score"].dtype == np.uint8)
+    assert(streamed_df["similarity_score"].iloc[1] == 100)
+
+def test_fuzzy_match_streaming_no_match():
+    streamed_df = process_best_fuzzy_match_streaming(["Drake", "Xyzw Qrst"], ["Drake", "Sting"])
+    assert(streamed_df["match_index"].tolist() == [0, -1])
+    assert(streamed_df["matched_string"].isna().tolist() == [False, True])
+
+def test_select_top_k():
+    scores = np.array([[10, 90, 50, 90], [0, 0, 80, 0]], dtype=np.float32)
+    indexes = np.broadcast_to(np.arange(4), scores.shape)
+    top_scores, top_indexes = select_top_k(scores, indexes, 2)
+    assert(top_indexes.tolist() == [[1, 3], [2, 0]])
+    assert(top_scores.tolist() == [[90, 90], [80, 0]])
+    # ties with the k-th best score keep the lowest candidate indexes, whatever the columns order
+    scores = np.array([[80, 90, 80, 80, 70], [50, 50, 50, 50, 50]], dtype=np.float32)
+    indexes = np.array([[9, 5, 3, 7, 1], [8, 6, 4, 2, 0]])
+    top_scores, top_indexes = select_top_k(scores, indexes, 2)
+    assert(top_indexes.tolist() == [[5, 3], [0, 2]])
+    assert(top_scores.tolist() == [[90, 80], [50, 50]])
+
+def test_fuzzy_match_top_k_ties():
+    # many candidates tied at every score, scored in tiles of every size
+    rng = np.random.default_rng(0)
+    candidates = ["".join(rng.choice(list("ab"), 6)) for _ in range(60)]
+    queries = ["".join(rng.choice(list("ab"), 6)) for _ in range(20)]
+    reference_scores = cdist(queries, candidates, scorer=ratio, score_cutoff=50)
+    reference_order = np.lexsort((np.broadcast_to(np.arange(60), reference_scores.shape), -reference_scores))[:, :3]
+    reference_indexes = [
+        [index for index in row if scores[index] > 0] or [-1] for row, scores in zip(reference_order, reference_scores)
+    ]
+    for memory_budget in [16, 256, 256 * 1024**2]:
+        top_k_df = process_top_k_fuzzy_match_streaming(queries, candidates, k=3, memory_budget=memory_budget, score_cutoff=50)
+        assert(top_k_df["match_index"].tolist() == [index for row in reference_indexes for index in row])
+
+def test_fuzzy_match_top_k():
+    test_strings = ["Michael Jackson", "Xyzw Qrst"]
+    candidates = ["Mike Jackson", "Michael Jacksonn", "Drake", "Michael Jackson", "Sting"]
+    for memory_budget in [8, 256 * 1024**2]:
+        top_k_df = process_top_k_fuzzy_match_streaming(test_strings, candidates, k=3, memory_budget=memory_budget)
+        assert(top_k_df["matched_string"].iloc[:3].tolist() == ["Michael Jackson", "Michael Jacksonn", "Mike Jackson"])
+        assert(top_k_df["matched_string"].isna().iloc[3])
+        assert(top_k_df["match_rank"].tolist() == [1, 2, 3, 1])
+        assert(top_k_df["match_index"].iloc[-1] == -1)
+
+def test_preprocess_dataframe():
+    test_df = pd.DataFrame({
+        "first_name": [" John", "john ", "Mary"],
+        "last_name": ["SMITH", "SMITH", "Ann  Lee"]
+    })
+    processed_df = preprocess_dataframe(test_df)
+    assert(processed_df["full_name_processed"].tolist() == ["john smith", "john smith", "mary ann  lee"])
+    assert(processed_df["full_name_sorted"].tolist() == ["john smith", "john smith", "ann lee mary"])
+
+def test_fuzzy_match_streaming_sorted_keys():
+    test_strings = pd.Series(["Jackson Michael", "Curtis Jackson", "Drake"])
+    candidates = pd.Series(["Mike Jackson", "James Hetfield","Sting", "John Lenon", "Drake", "Curtis (50Cent) Jackson"])
+    keyed_df = process_best_fuzzy_match_streaming(
+        test_strings.to_numpy(),
+        candidates.to_numpy(),
+        query_keys=get_token_sorted_keys(test_strings).to_numpy(),
+        candidate_keys=get_token_sorted_keys(candidates).to_numpy(),
+    )
+    full_df = process_best_fuzzy_match_streaming(test_strings.to_numpy(), candidates.to_numpy())
+    assert(keyed_df.equals(full_df))
+
+def test_fuzzy_match_streaming_prebuilt_buckets():
+    test_strings = pd.Series(["Jackson Michael", "Curtis Jackson", "Drake"])
+    candidates = pd.Series(["Mike Jackson", "James Hetfield","Sting", "John Lenon", "Drake", "Curtis (50Cent) Jackson"])
+    candidate_buckets = get_length_buckets(get_token_sorted_keys(candidates).to_numpy())
+    assert(candidate_buckets["lengths"].tolist() == [5, 10, 12, 14, 23])
+    assert(candidate_buckets["store"].get_strings(0, 2).tolist() == ["Sting", "Drake"])
+    full_df = process_best_fuzzy_match_streaming(test_strings.to_numpy(), candidates.to_numpy())
+    # the same buckets serve every call
+    for _ in range(2):
+        bucketed_df = process_best_fuzzy_match_streaming(test_strings.to_numpy(), candidates.to_numpy(), candidate_buckets=candidate_buckets)
+        assert(bucketed_df.equals(full_df))
+    top_k_df = process_top_k_fuzzy_match_streaming(test_strings.to_numpy(), candidates.to_numpy(), k=2)
+    assert(process_top_k_fuzzy_match_streaming(test_strings.to_numpy(), candidates.to_numpy(), k=2, candidate_buckets=candidate_buckets).equals(top_k_df))
+
+def test_length_bounds():
+    assert(get_length_bounds(10, 70) == (6, 18))
+    assert(get_length_bounds(10, 100) == (10, 10))
+    assert(get_length_bounds(0, 70) == (0, 0))
+    # the boundary lengths are kept : 200 * 3 / (7 + 3) == 60
+    assert(get_length_bounds(7, 60)[0] == 3)
+    assert(get_length_bounds(10, 0)[0] == 0)
+
+def test_length_groups():
+    assert(get_length_groups(np.array([3, 3, 4, 5, 5, 5, 9]), 3) == [(0, 3), (3, 6), (6, 7)])
+    assert(get_length_groups(np.array([3, 3, 4]), 10) == [(0, 3)])
+
+def test_fuzzy_match_streaming_length_pruning_exact():
+    rng = np.random.default_rng(0)
+    letters = np.array(list("abcde "))
+    candidates = ["".join(rng.choice(letters, size=rng.integers(1, 25))) for _ in range(300)]
+    queries = ["".join(rng.choice(letters, size=rng.integers(1, 25))) for _ in range(60)]
+    stats = {}
+    streaming_df = process_best_fuzzy_match_streaming(queries, candidates, score_cutoff=80, memory_budget=4096, stats=stats)
+    full_scores = cdist(queries, candidates, scorer=token_sort_ratio, score_cutoff=80, dtype=np.float32)
+    assert(np.allclose(streaming_df["similarity_score"], full_scores.max(axis=1)))
+    has_match = full_scores.max(axis=1) > 0
+    assert((streaming_df["match_index"].to_numpy()[has_match] == full_scores.argmax(axis=1)[has_match]).all())
+    assert(stats["candidates_scored"] < len(queries) * len(candidates))
+
+def test_collapse_repeated_characters():
+    test_strings = pd.Series(["jooohnn", "", "a", "aab", "ab", "zoëë"])
+    assert(collapse_repeated_characters(test_strings).tolist() == ["john", "", "a", "ab", "ab", "zoë"])
+    # repeats never span two strings
+    assert(collapse_repeated_characters(pd.Series(["ab", "bc"])).tolist() == ["ab", "bc"])
+
+def test_get_canonical_names():
+    test_strings = pd.Series(["jooohnn  lenon", "zoë o'brien-smith", "lenonn john", None])
+    assert(get_canonical_names(test_strings).tolist() == ["john lenon", "brien o smith zoe", "john lenon", ""])
+    assert(get_canonical_names(test_strings, ["collapse_repeats"]).tolist() == ["john lenon", "zoë o'brien-smith", "lenon john", ""])
+    assert(get_canonical_names(test_strings, []).tolist() == ["jooohnn lenon", "zoë o'brien-smith", "lenonn john", ""])
+    # only the accents are stripped, the other non ascii letters are kept
+    test_strings = pd.Series(["иван петров", "李 小龙", "øyvind", "josé"])
+    assert(get_canonical_names(test_strings, ["fold_unicode"]).tolist() == ["иван петров", "李 小龙", "øyvind", "jose"])
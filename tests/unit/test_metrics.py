@@ -0,0 +1,41 @@
+import json
+import pandas as pd
+from fuzzy_matcher.metrics import (
+    PipelineMetrics,
+    export_metrics_json,
+    export_metrics_prometheus,
+)
+from fuzzy_matcher.pipelines.match_engine import run_matching_pipeline
+
+
+def test_stage_metrics_aggregated():
+    metrics = PipelineMetrics("test")
+    for rows in [10, 30]:
+        with metrics.stage("read", rows_in=rows) as stage:
+            stage["rows_out"] = rows - 1
+    with metrics.stage("export") as stage:
+        pass
+    stages = metrics.get_metrics()["stages"]
+    assert([stage["stage"] for stage in stages] == ["read", "export"])
+    assert(stages[0]["runs"] == 2 and stages[0]["rows_in"] == 40 and stages[0]["rows_out"] == 38)
+    assert(stages[0]["wall_seconds"] >= 0 and stages[0]["peak_rss_mb"] > 0)
+    assert(stages[1]["rows_in"] is None and stages[1]["rows_per_second"] is None)
+
+def test_matching_pipeline_metrics(tmp_path):
+    primary_df = pd.DataFrame({"first_name": ["Michael", "John"], "last_name": ["Jackson", "Lenon"]})
+    secondary_df = pd.DataFrame({"first_name": ["Micheal", "John", "John"], "last_name": ["Jackson", "Lenon", "Lenon"]})
+    metrics = PipelineMetrics("batch")
+    run_matching_pipeline(primary_df, secondary_df, metrics=metrics)
+    stages = {stage["stage"]: stage for stage in metrics.get_metrics()["stages"]}
+    assert(list(stages) == ["preprocess", "exact_join", "query_dedup", "fuzzy_scoring", "post_processing"])
+    assert(stages["exact_join"]["rows_in"] == 3 and stages["exact_join"]["rows_out"] == 2)
+    assert(stages["fuzzy_scoring"]["rows_in"] == 1 and stages["fuzzy_scoring"]["rows_out"] == 1)
+    assert(stages["fuzzy_scoring"]["candidates_scored"] == 2)
+
+    export_metrics_json(metrics.get_metrics(), str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as metrics_file:
+        assert(json.load(metrics_file)["pipeline"] == "batch")
+    export_metrics_prometheus(metrics.get_metrics(), str(tmp_path / "metrics.prom"))
+    prometheus_lines = (tmp_path / "metrics.prom").read_text().splitlines()
+    assert("# TYPE fuzzy_matcher_stage_wall_seconds gauge" in prometheus_lines)
+    assert('fuzzy_matcher_stage_candidates_scored{pipeline="batch",stage="fuzzy_scoring"} 2' in prometheus_lines)
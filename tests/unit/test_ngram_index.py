@@ -0,0 +1,28 @@
+from fuzzy_matcher.matcher.ngram_index import (
+    get_ngrams,
+    build_ngram_index,
+    get_candidate_ids,
+    process_best_fuzzy_match_indexed,
+)
+
+
+def test_get_ngrams_repeated():
+    grams = get_ngrams("aaaa", 3)
+    assert(grams == ["aaa#0", "aaa#1"])
+
+def test_get_ngrams_short_string():
+    grams = get_ngrams("ab", 3)
+    assert(grams == ["ab#0"])
+
+def test_candidate_ids_swapped_names():
+    candidates = ["john smith", "james hetfield", "sting"]
+    index = build_ngram_index(candidates)
+    candidate_ids = get_candidate_ids("smith john", index)
+    assert(list(candidate_ids) == [0])
+
+def test_fuzzy_match_indexed():
+    test_strings = ["michael jackson", "curtis jackson", "xyz"]
+    candidates = ["mike jackson", "james hetfield", "sting", "john lenon", "drake", "curtis (50cent) jackson"]
+    mapped_data = process_best_fuzzy_match_indexed(test_strings, candidates)
+    assert(mapped_data[0]["matched_string"] == "mike jackson")
+    assert(len(mapped_data) == 2)
@@ -0,0 +1,63 @@
+import pytest
+import pandas as pd
+from multiprocessing.shared_memory import SharedMemory
+from fuzzy_matcher.matcher.match_datasets import process_best_fuzzy_match_baseline
+from fuzzy_matcher.matcher.parallel_match import (
+    share_candidates,
+    attach_candidates,
+    detach_candidates,
+    process_best_fuzzy_match_parallel,
+    SharedCandidates,
+)
+import fuzzy_matcher.matcher.parallel_match as parallel_match
+
+
+def test_share_and_attach_candidates():
+    candidates = ["mike jackson", "zoë smith", ""]
+    shared_block, spec = share_candidates(candidates)
+    try:
+        attach_candidates(spec)
+        assert(parallel_match.WORKER_CANDIDATES.get_strings().tolist() == candidates)
+        detach_candidates()
+    finally:
+        shared_block.close()
+        shared_block.unlink()
+
+def test_fuzzy_match_parallel_matches_baseline():
+    test_strings = ["Michael Jackson", "Curtis Jackson", "Drake", "Sting", "John Lennon"]
+    candidates = ["Mike Jackson", "James Hetfield","Sting", "John Lenon", "Drake", "Curtis (50Cent) Jackson"]
+    parallel_df = process_best_fuzzy_match_parallel(test_strings, candidates, workers=2, chunk_size=2)
+    baseline_df = process_best_fuzzy_match_baseline(test_strings, candidates)
+    assert(parallel_df.equals(baseline_df))
+
+def test_fuzzy_match_parallel_candidate_blocks(monkeypatch):
+    monkeypatch.setattr(parallel_match, "WORKER_CANDIDATE_BLOCK_SIZE", 2)
+    test_strings = ["Michael Jackson", "Curtis Jackson", "Drake", "Sting", "John Lennon", "Xyzw"]
+    candidates = ["Mike Jackson", "James Hetfield","Sting", "John Lenon", "Drake", "Curtis (50Cent) Jackson", "Drake"]
+    shared_block, spec = share_candidates(candidates)
+    try:
+        attach_candidates(spec)
+        matches = parallel_match.match_query_chunk((test_strings, parallel_match.token_sort_ratio, None))
+        detach_candidates()
+    finally:
+        shared_block.close()
+        shared_block.unlink()
+    baseline_df = process_best_fuzzy_match_baseline(test_strings, candidates)
+    assert(pd.DataFrame(matches).equals(baseline_df))
+
+def test_fuzzy_match_parallel_no_match():
+    parallel_df = process_best_fuzzy_match_parallel(["Xyzw"], ["Drake"], workers=1, score_cutoff=70)
+    assert(parallel_df.iloc[0].tolist() == ["Xyzw", None, 0.0, -1])
+
+def test_fuzzy_match_parallel_shared_once():
+    test_strings = ["Michael Jackson", "Curtis Jackson", "Drake"]
+    candidates = ["Mike Jackson", "James Hetfield","Sting", "John Lenon", "Drake", "Curtis (50Cent) Jackson"]
+    shared_candidates = SharedCandidates(candidates)
+    baseline_df = process_best_fuzzy_match_baseline(test_strings, candidates)
+    # the shared block outlives the calls, the candidates are not shared again
+    for _ in range(2):
+        parallel_df = process_best_fuzzy_match_parallel(test_strings, None, workers=1, shared_candidates=shared_candidates)
+        assert(parallel_df.equals(baseline_df))
+    shared_candidates.close()
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=shared_candidates.spec["name"])
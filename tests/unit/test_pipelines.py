@@ -0,0 +1,234 @@
+import numpy as np
+import pandas as pd
+from fuzzy_matcher.pipelines.match_engine import (
+    run_matching_pipeline,
+    run_streaming_matching_pipeline,
+    load_candidates,
+    load_matcher_candidates,
+    get_candidates,
+    match_preprocessed_records,
+    get_batch_matcher_options,
+    get_config_options,
+    build_canonical_index,
+    RESULT_COLUMNS,
+)
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe, CANONICAL_STEPS
+
+
+def get_test_datasets():
+    primary_df = pd.DataFrame({
+        "first_name": ["Michael", "Curtis", "John", "John"],
+        "last_name": ["Jackson", "Jackson", "Lenon", "Lenon"]
+    })
+    secondary_df = pd.DataFrame({
+        "first_name": ["Michael", "Jackson", "JOHN", "Johnn", "Johnn", "Xyzw"],
+        "last_name": ["Jackson", "Curtis", "Lenon", "Lenon", "Lenon", "Qrst"]
+    })
+    return primary_df, secondary_df
+
+def test_matching_pipeline_sources():
+    primary_df, secondary_df = get_test_datasets()
+    for matcher in ["baseline", "batch", "indexed", "parallel"]:
+        final_df = run_matching_pipeline(primary_df, secondary_df, matcher=matcher)
+        assert(list(final_df.columns) == RESULT_COLUMNS)
+        # duplicated primary names don't duplicate the matched records, duplicated secondary records are all kept
+        assert(final_df.shape[0] == 6)
+        assert(final_df["mapping_source"].tolist()[:4] == ["direct_join", f"fuzzy_matching_{matcher}", "direct_join", f"fuzzy_matching_{matcher}"])
+        assert(final_df["match_name_normalized"].iloc[1] == "curtis jackson")
+        assert(final_df["match_name_normalized"].iloc[3] == "john lenon")
+
+def test_matching_pipeline_unmapped():
+    primary_df, secondary_df = get_test_datasets()
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="batch")
+    assert(final_df.iloc[5].tolist() == [5, "xyzw qrst", "unmapped", 0.0, "unmapped"])
+
+def test_matching_pipeline_sampled_run():
+    primary_df, secondary_df = get_test_datasets()
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="batch", sampled_run_size=1)
+    assert(final_df["mapping_source"].tolist() == ["direct_join", "fuzzy_matching_batch", "direct_join", "unmapped", "unmapped", "unmapped"])
+
+def test_matching_pipeline_duplicated_records():
+    primary_df, _ = get_test_datasets()
+    secondary_df = pd.DataFrame({
+        "first_name": ["Johnn", "Michael", "Johnn", "Lenon", "Johnn"],
+        "last_name": ["Lenon", "Jackson", "Lenon", "Johnn", "Lenon"]
+    }, index=[10, 11, 12, 13, 14])
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="batch")
+    # every record, duplicated ones included, gets the match of its name and the reference of its row
+    assert(final_df["record_id"].tolist() == [10, 11, 12, 13, 14])
+    assert(final_df["search_name_normalized"].tolist() == ["johnn lenon", "michael jackson", "johnn lenon", "lenon johnn", "johnn lenon"])
+    assert(final_df["match_name_normalized"].tolist() == ["john lenon", "michael jackson", "john lenon", "john lenon", "john lenon"])
+
+def test_matching_pipeline_canonical_dedup():
+    primary_df, _ = get_test_datasets()
+    secondary_df = pd.DataFrame({
+        "first_name": ["Lenon", "Johnn", "Lenon  Johnn", "Xyzw", "Qrst"],
+        "last_name": ["Johnn", "Lenon", "", "Qrst", "Xyzw"]
+    })
+    candidates = get_candidates(preprocess_dataframe(primary_df))
+    for matcher in ["baseline", "batch", "indexed", "parallel"]:
+        stats = {}
+        final_df = match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher=matcher, stats=stats)
+        # the 3 lenon johnn forms and the 2 xyzw qrst forms are matched once each
+        assert(stats["fuzzy_queries"] == 2)
+        assert(stats["canonical_duplicates"] == 3)
+        assert(final_df["search_name_normalized"].tolist() == ["lenon johnn", "johnn lenon", "lenon  johnn ", "xyzw qrst", "qrst xyzw"])
+        assert(final_df["match_name_normalized"].tolist()[:3] == ["john lenon"] * 3)
+        assert(final_df.iloc[3, 2:].tolist() == final_df.iloc[4, 2:].tolist())
+
+def test_matching_pipeline_custom_scorer_no_dedup():
+    from rapidfuzz.fuzz import ratio
+    primary_df, _ = get_test_datasets()
+    secondary_df = pd.DataFrame({"first_name": ["Lenon", "Johnn"], "last_name": ["Johnn", "Lenon"]})
+    candidates = get_candidates(preprocess_dataframe(primary_df))
+    stats = {}
+    final_df = match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher="parallel", matcher_options={"workers": 1, "scorer": ratio}, stats=stats)
+    # ratio scores the swapped names differently, so both names are matched
+    assert(stats["fuzzy_queries"] == 2 and "canonical_duplicates" not in stats)
+    assert(final_df["similarity_score"].iloc[0] != final_df["similarity_score"].iloc[1])
+
+def test_matching_pipeline_canonical_join():
+    primary_df, _ = get_test_datasets()
+    secondary_df = pd.DataFrame({"first_name": ["Jooohnn", "Michael", "Curtis"], "last_name": ["Lenon", "Jackson", "Jacksen"]})
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="batch", canonical_steps=["collapse_repeats", "sort_tokens"])
+    assert(final_df["mapping_source"].tolist() == ["canonical_join", "direct_join", "fuzzy_matching_batch"])
+    assert(final_df["match_name_normalized"].iloc[0] == "john lenon")
+    assert(final_df["similarity_score"].iloc[0] < 100)
+    # unknown steps skip the canonical join
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="batch", canonical_steps=["unknown"])
+    assert(final_df["mapping_source"].tolist() == ["fuzzy_matching_batch", "direct_join", "fuzzy_matching_batch"])
+
+def test_matching_pipeline_canonical_join_collision():
+    # "ana le" and "anna lee" share the canonical form "an le"
+    primary_df = pd.DataFrame({"first_name": ["Ana", "Anna"], "last_name": ["Le", "Lee"]})
+    secondary_df = pd.DataFrame({"first_name": ["Anna", "Aaaaaaaaaana"], "last_name": ["Leee", "Leeeeeeeeeeeeee"]})
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="batch", canonical_steps=["collapse_repeats", "sort_tokens"])
+    assert(final_df["mapping_source"].iloc[0] == "canonical_join")
+    assert(final_df["match_name_normalized"].iloc[0] == "anna lee")
+    assert(final_df["similarity_score"].iloc[0] > 90)
+    # under the score cutoff, the name goes on to the fuzzy matcher
+    assert(final_df["mapping_source"].iloc[1] == "unmapped")
+    assert(final_df["match_name_normalized"].iloc[1] == "unmapped")
+
+def test_matching_pipeline_canonical_join_non_latin():
+    primary_df = pd.DataFrame({"first_name": ["Иван", "Øyvind", "李", "Бруно"], "last_name": ["Петров", "Berg", "小龙", "Марс"]})
+    secondary_df = pd.DataFrame({"first_name": ["Иваан", "Oyvind", "小龙", "-"], "last_name": ["Петров", "Berg", "李", "-"]})
+    canonical_index = build_canonical_index(get_candidates(preprocess_dataframe(primary_df)))
+    # every candidate keeps its own non latin form, none of them is indexed under an empty form
+    assert(len(canonical_index["forms"]) == 4 and "" not in canonical_index["forms"])
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="batch", canonical_steps=CANONICAL_STEPS)
+    assert(final_df["mapping_source"].tolist()[:3] == ["canonical_join", "fuzzy_matching_batch", "canonical_join"])
+    assert(final_df["match_name_normalized"].tolist()[:3] == ["иван петров", "øyvind berg", "李 小龙"])
+    # a name with an empty form is not joined
+    assert(final_df["mapping_source"].iloc[3] != "canonical_join")
+
+def test_batch_matcher_options_prepared_once():
+    primary_df, secondary_df = get_test_datasets()
+    candidates = get_candidates(preprocess_dataframe(primary_df))
+    matcher_options = get_batch_matcher_options("batch", candidates, {"score_cutoff": 80})
+    assert(len(matcher_options["candidate_buckets"]["order"]) == candidates.shape[0])
+    # prepared options are kept as they are, and don't change the matcher configuration
+    assert(get_batch_matcher_options("batch", candidates, matcher_options)["candidate_buckets"] is matcher_options["candidate_buckets"])
+    assert(get_config_options(matcher_options) == {"score_cutoff": 80})
+    reference_df = match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher_options={"score_cutoff": 80})
+    for _ in range(2):
+        prepared_df = match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher_options=matcher_options)
+        assert(prepared_df.equals(reference_df))
+    # the parallel matcher shares the candidates once
+    matcher_options = get_batch_matcher_options("parallel", candidates, {"workers": 1})
+    assert(get_config_options(matcher_options) == {})
+    reference_df = match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher="parallel", matcher_options={"workers": 1})
+    for _ in range(2):
+        prepared_df = match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher="parallel", matcher_options=matcher_options)
+        assert(prepared_df.equals(reference_df))
+
+def test_matching_pipeline_unknown_matcher():
+    primary_df, secondary_df = get_test_datasets()
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="unknown")
+    assert(final_df.shape[0] == 0)
+
+def test_streaming_matching_pipeline(tmp_path):
+    primary_df, secondary_df = get_test_datasets()
+    primary_path = tmp_path / "primary.csv"
+    secondary_path = tmp_path / "secondary.csv"
+    export_path = tmp_path / "output.csv"
+    primary_df.to_csv(primary_path, index=False)
+    secondary_df.to_csv(secondary_path, index=False)
+    for index_path in [None, str(tmp_path / "primary.fzi")]:
+        candidates = load_candidates(str(primary_path), index_path)
+        source_counts = run_streaming_matching_pipeline(
+            candidates, str(secondary_path), str(export_path), chunk_size=2
+        )
+        streamed_df = pd.read_csv(export_path, keep_default_na=False)
+        final_df = run_matching_pipeline(primary_df, secondary_df)
+        for column in ["record_id", "search_name_normalized", "match_name_normalized", "mapping_source"]:
+            assert(streamed_df[column].tolist() == final_df[column].tolist())
+        assert(np.allclose(streamed_df["similarity_score"], final_df["similarity_score"]))
+        assert(source_counts == {"direct_join": 2, "fuzzy_matching_batch": 3, "unmapped": 1})
+
+def test_load_matcher_candidates_from_index(tmp_path):
+    primary_df, secondary_df = get_test_datasets()
+    primary_path, index_path = tmp_path / "primary.csv", str(tmp_path / "primary.fzi")
+    primary_df.to_csv(primary_path, index=False)
+    reference_candidates = load_candidates(str(primary_path))
+    for matcher in ["batch", "indexed"]:
+        candidates, matcher_options = load_matcher_candidates(str(primary_path), index_path, matcher)
+        assert(candidates["full_name_processed"].tolist() == reference_candidates["full_name_processed"].tolist())
+        # the candidates are read in place from the memory-mapped index
+        assert(not matcher_options["candidate_store"].buffer.flags.writeable)
+        assert(get_config_options(matcher_options) == ({"ngram_size": 3} if matcher == "indexed" else {}))
+        indexed_df = match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher=matcher, matcher_options=matcher_options)
+        reference_df = match_preprocessed_records(preprocess_dataframe(secondary_df), reference_candidates, matcher=matcher)
+        assert(indexed_df.equals(reference_df))
+    assert(not matcher_options["ngram_index"]["posting_ids"].flags.writeable)
+    # the parallel matcher shares the index candidates bytes as they are
+    candidates, matcher_options = load_matcher_candidates(str(primary_path), index_path, "parallel", {"workers": 1})
+    assert("shared_candidates" in matcher_options)
+    indexed_df = match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher="parallel", matcher_options=matcher_options)
+    assert(indexed_df.equals(match_preprocessed_records(preprocess_dataframe(secondary_df), reference_candidates, matcher="parallel", matcher_options={"workers": 1})))
+    # an index built with another n-gram size is kept as it is, and its postings used by the indexed matcher
+    load_matcher_candidates(str(primary_path), index_path, "indexed", {"ngram_size": 2})
+    for matcher in ["batch", "indexed"]:
+        candidates, matcher_options = load_matcher_candidates(str(primary_path), index_path, matcher)
+    assert(matcher_options["ngram_size"] == 2 and matcher_options["ngram_index"]["ngram_size"] == 2)
+
+def test_streaming_matching_pipeline_no_chunk(tmp_path):
+    primary_df, _ = get_test_datasets()
+    secondary_path = tmp_path / "secondary.parquet"
+    export_path = tmp_path / "output.csv"
+    pd.DataFrame({"first_name": pd.Series([], dtype=str), "last_name": pd.Series([], dtype=str)}).to_parquet(secondary_path)
+    export_path.write_text("stale export\n")
+    candidates = get_candidates(preprocess_dataframe(primary_df))
+    for matcher in ["batch", "fields"]:
+        assert(run_streaming_matching_pipeline(candidates, str(secondary_path), str(export_path), matcher=matcher) == {})
+        streamed_df = pd.read_csv(export_path)
+        assert(list(streamed_df.columns) == RESULT_COLUMNS and streamed_df.shape[0] == 0)
+
+def test_streaming_matching_pipeline_fields_from_index(tmp_path):
+    primary_df, secondary_df = get_test_datasets()
+    primary_path, secondary_path = tmp_path / "primary.csv", tmp_path / "secondary.csv"
+    export_path, cache_path = str(tmp_path / "output.csv"), str(tmp_path / "cache")
+    primary_df.to_csv(primary_path, index=False)
+    secondary_df.to_csv(secondary_path, index=False)
+    # candidates without first / last names can't be field matched, and nothing is cached for them
+    candidates = load_candidates(str(primary_path))[["full_name_processed", "full_name_sorted"]]
+    assert(run_streaming_matching_pipeline(candidates, str(secondary_path), export_path, matcher="fields", cache_path=cache_path) == {})
+    assert(match_preprocessed_records(preprocess_dataframe(secondary_df), candidates, matcher="fields").shape[0] == 0)
+    # the candidate index keeps the first / last names of the candidates
+    candidates = load_candidates(str(primary_path), str(tmp_path / "primary.fzi"))
+    for _ in range(2):
+        source_counts = run_streaming_matching_pipeline(candidates, str(secondary_path), export_path, matcher="fields", cache_path=cache_path)
+        assert(source_counts.get("fuzzy_matching_fields", 0) > 0)
+
+def test_streaming_matching_pipeline_index_built_once(tmp_path, monkeypatch):
+    import fuzzy_matcher.matcher.field_index as field_index
+    primary_df, secondary_df = get_test_datasets()
+    secondary_path = tmp_path / "secondary.csv"
+    secondary_df.to_csv(secondary_path, index=False)
+    builds = []
+    build_field_index = field_index.build_field_index
+    monkeypatch.setattr(field_index, "build_field_index", lambda *args: builds.append(args) or build_field_index(*args))
+    candidates = get_candidates(preprocess_dataframe(primary_df))
+    source_counts = run_streaming_matching_pipeline(candidates, str(secondary_path), str(tmp_path / "output.csv"), chunk_size=2, matcher="fields")
+    assert(sum(source_counts.values()) == secondary_df.shape[0])
+    assert(len(builds) == 1)
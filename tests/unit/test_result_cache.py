@@ -0,0 +1,93 @@
+import pandas as pd
+from fuzzy_matcher.matcher.result_cache import (
+    get_cache_config,
+    get_candidates_fingerprint,
+    get_empty_result_cache,
+    load_result_cache,
+    save_result_cache,
+    refresh_result_cache,
+    lookup_result_cache,
+    get_cached_results,
+    update_result_cache,
+)
+from fuzzy_matcher.pipelines.match_engine import run_matching_pipeline
+
+
+def get_candidates(names):
+    return pd.DataFrame({"full_name_processed": names})
+
+def get_cached(names, queries, matches, scores):
+    result_cache = get_empty_result_cache(get_cache_config("batch"))
+    result_cache = refresh_result_cache(result_cache, get_candidates(names))
+    update_result_cache(result_cache, queries, pd.DataFrame({
+        "string_to_match": [query for query, match in zip(queries, matches) if match is not None],
+        "matched_string": [match for match in matches if match is not None],
+        "similarity_score": [score for score, match in zip(scores, matches) if match is not None],
+    }))
+    return result_cache
+
+def test_candidates_fingerprint_order_independent():
+    assert(get_candidates_fingerprint(pd.Series(["a b", "c d"])) == get_candidates_fingerprint(pd.Series(["c d", "a b"])))
+    assert(get_candidates_fingerprint(pd.Series(["a b"])) != get_candidates_fingerprint(pd.Series(["a b", "c d"])))
+
+def test_result_cache_roundtrip(tmp_path):
+    result_cache = get_cached(["john smith", "mary lee"], ["jon smith", "xyzw"], ["john smith", None], [94.7, 0.0])
+    save_result_cache(result_cache, str(tmp_path))
+    loaded_cache = load_result_cache(str(tmp_path), get_cache_config("batch"))
+    assert(loaded_cache["fingerprint"] == result_cache["fingerprint"])
+    assert(list(lookup_result_cache(loaded_cache, ["xyzw", "new", "jon smith"])) == [1, -1, 0])
+    # another matcher configuration doesn't reuse the results
+    other_cache = load_result_cache(str(tmp_path), get_cache_config("batch", {"score_cutoff": 80}))
+    assert(other_cache["results"].shape[0] == 0)
+    # other execution options (workers, memory budget) reuse the results
+    execution_cache = load_result_cache(str(tmp_path), get_cache_config("batch", {"workers": 2, "memory_budget": 1024}))
+    assert(execution_cache["results"].shape[0] == 2)
+
+def test_refresh_result_cache_delta():
+    result_cache = get_cached(
+        ["john smith", "mary lee", "ann rose"],
+        ["jon smith", "marry lee", "anne rose", "xyzw"],
+        ["john smith", "mary lee", "ann rose", None],
+        [94.7, 94.1, 94.1, 0.0],
+    )
+    # "mary lee" removed, "anne rose" added
+    refreshed_cache = refresh_result_cache(result_cache, get_candidates(["john smith", "ann rose", "anne rose"]))
+    results = refreshed_cache["results"].set_index("string_to_match")
+    assert("marry lee" not in results.index)
+    assert(results.loc["jon smith", "matched_string"] == "john smith")
+    assert(results.loc["anne rose", "matched_string"] == "anne rose")
+    assert(results.loc["anne rose", "similarity_score"] == 100.0)
+    assert(pd.isna(results.loc["xyzw", "matched_string"]))
+
+def test_matching_pipeline_with_cache(tmp_path):
+    primary_df = pd.DataFrame({"first_name": ["Michael", "John"], "last_name": ["Jackson", "Lenon"]})
+    secondary_df = pd.DataFrame({"first_name": ["Micheal", "Johnn", "Xyzw"], "last_name": ["Jackson", "Lenon", "Qrst"]})
+    first_run_df = run_matching_pipeline(primary_df, secondary_df, cache_path=str(tmp_path))
+    second_run_df = run_matching_pipeline(primary_df, secondary_df, cache_path=str(tmp_path))
+    assert(first_run_df.equals(second_run_df))
+    cached = load_result_cache(str(tmp_path), get_cache_config("batch"))
+    assert(cached["results"].shape[0] == 3)
+
+def test_result_cache_pending_results(tmp_path):
+    result_cache = get_cached(["john smith", "mary lee"], ["jon smith"], ["john smith"], [94.7])
+    update_result_cache(result_cache, ["marry lee", "xyzw"], pd.DataFrame({"string_to_match": ["marry lee"], "matched_string": ["mary lee"], "similarity_score": [94.1]}))
+    # new results are looked up before being concatenated to the cached ones
+    assert(len(result_cache["pending"]) == 2)
+    positions = lookup_result_cache(result_cache, ["xyzw", "new", "marry lee", "jon smith"])
+    assert(list(positions) == [2, -1, 1, 0])
+    cached_df = get_cached_results(result_cache, positions[positions >= 0])
+    assert(cached_df["string_to_match"].tolist() == ["xyzw", "marry lee", "jon smith"])
+    save_result_cache(result_cache, str(tmp_path))
+    assert(len(result_cache["pending"]) == 0 and result_cache["results"].shape[0] == 3)
+    assert(sorted(path.name for path in tmp_path.iterdir()) == ["candidates.parquet", "manifest.json", "results.parquet"])
+    assert(load_result_cache(str(tmp_path), get_cache_config("batch"))["results"].shape[0] == 3)
+
+def test_matching_pipeline_cache_without_cutoff(tmp_path):
+    # the parallel matcher keeps its best candidate whatever the score, so does the refresh of its cache
+    secondary_df = pd.DataFrame({"first_name": ["Michelle"], "last_name": ["Jacksonville"]})
+    primary_df = pd.DataFrame({"first_name": ["Xavier"], "last_name": ["Qu"]})
+    run_matching_pipeline(primary_df, secondary_df, matcher="parallel", cache_path=str(tmp_path))
+    grown_df = pd.DataFrame({"first_name": ["Xavier", "Michelle"], "last_name": ["Qu", "Q"]})
+    cached_df = run_matching_pipeline(grown_df, secondary_df, matcher="parallel", cache_path=str(tmp_path))
+    fresh_df = run_matching_pipeline(grown_df, secondary_df, matcher="parallel")
+    assert(cached_df["match_name_normalized"].tolist() == fresh_df["match_name_normalized"].tolist() == ["michelle q"])
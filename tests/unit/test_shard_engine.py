@@ -0,0 +1,91 @@
+import os
+import numpy as np
+import pandas as pd
+from fuzzy_matcher.pipelines.match_engine import load_candidates, run_matching_pipeline
+from fuzzy_matcher.pipelines.shard_engine import (
+    get_shard_ids,
+    get_shard_file_paths,
+    run_shard_matching,
+    merge_shard_results,
+)
+
+
+def write_test_datasets(tmp_path):
+    primary_df = pd.DataFrame({
+        "first_name": ["Michael", "Curtis", "John"],
+        "last_name": ["Jackson", "Jackson", "Lenon"]
+    })
+    secondary_df = pd.DataFrame({
+        "first_name": ["Michael", "Jackson", "JOHN", "Johnn", "Xyzw", "Micheal"],
+        "last_name": ["Jackson", "Curtis", "Lenon", "Lenon", "Qrst", "Jackson"]
+    })
+    primary_df.to_csv(tmp_path / "primary.csv", index=False)
+    secondary_df.to_csv(tmp_path / "secondary.csv", index=False)
+    return primary_df, secondary_df
+
+def test_shard_ids_deterministic():
+    names = pd.Series(["john lenon", "michael jackson", "xyzw qrst"] * 10)
+    shard_ids = get_shard_ids(names, 4)
+    assert(((shard_ids >= 0) & (shard_ids < 4)).all())
+    # the shard of a name doesn't depend on its position
+    assert((shard_ids[::-1] == get_shard_ids(names[::-1], 4)).all())
+    assert(len(set(shard_ids[names == "john lenon"])) == 1)
+
+def test_sharded_matching_merge(tmp_path):
+    primary_df, secondary_df = write_test_datasets(tmp_path)
+    candidates = load_candidates(str(tmp_path / "primary.csv"))
+    shard_path, export_path = str(tmp_path / "shards"), str(tmp_path / "output.csv")
+    matched_names = [
+        run_shard_matching(candidates, str(tmp_path / "secondary.csv"), shard_path, shard_id, 3)
+        for shard_id in range(3)
+    ]
+    assert(sum(matched_names) == secondary_df.shape[0])
+    source_counts = merge_shard_results(str(tmp_path / "secondary.csv"), shard_path, export_path, 3, chunk_size=4)
+    merged_df = pd.read_csv(export_path, keep_default_na=False)
+    final_df = run_matching_pipeline(primary_df, secondary_df)
+    for column in ["record_id", "search_name_normalized", "match_name_normalized", "mapping_source"]:
+        assert(merged_df[column].tolist() == final_df[column].tolist())
+    assert(np.allclose(merged_df["similarity_score"], final_df["similarity_score"]))
+    assert(source_counts == {"direct_join": 2, "fuzzy_matching_batch": 3, "unmapped": 1})
+
+def test_sharded_merge_missing_shard(tmp_path):
+    write_test_datasets(tmp_path)
+    candidates = load_candidates(str(tmp_path / "primary.csv"))
+    shard_path, export_path = str(tmp_path / "shards"), str(tmp_path / "output.csv")
+    for shard_id in range(2):
+        run_shard_matching(candidates, str(tmp_path / "secondary.csv"), shard_path, shard_id, 2)
+    os.remove(get_shard_file_paths(shard_path, 1, 2)[1])
+    assert(merge_shard_results(str(tmp_path / "secondary.csv"), shard_path, export_path, 2) == {})
+    # shards of another configuration are not merged
+    run_shard_matching(candidates, str(tmp_path / "secondary.csv"), shard_path, 1, 2, matcher="indexed")
+    assert(merge_shard_results(str(tmp_path / "secondary.csv"), shard_path, export_path, 2) == {})
+    assert(run_shard_matching(candidates, str(tmp_path / "secondary.csv"), shard_path, 2, 2) == -1)
+
+def test_sharded_merge_other_candidates(tmp_path):
+    primary_df, _ = write_test_datasets(tmp_path)
+    candidates = load_candidates(str(tmp_path / "primary.csv"))
+    shard_path, export_path = str(tmp_path / "shards"), str(tmp_path / "output.csv")
+    run_shard_matching(candidates, str(tmp_path / "secondary.csv"), shard_path, 0, 2)
+    # the second shard is matched against another primary dataset
+    primary_df.iloc[:2].to_csv(tmp_path / "other_primary.csv", index=False)
+    run_shard_matching(load_candidates(str(tmp_path / "other_primary.csv")), str(tmp_path / "secondary.csv"), shard_path, 1, 2)
+    assert(merge_shard_results(str(tmp_path / "secondary.csv"), shard_path, export_path, 2) == {})
+    run_shard_matching(candidates, str(tmp_path / "secondary.csv"), shard_path, 1, 2)
+    assert(merge_shard_results(str(tmp_path / "secondary.csv"), shard_path, export_path, 2, candidates=candidates) != {})
+    assert(os.path.exists(export_path))
+    other_candidates = load_candidates(str(tmp_path / "other_primary.csv"))
+    assert(merge_shard_results(str(tmp_path / "secondary.csv"), shard_path, export_path, 2, candidates=other_candidates) == {})
+
+def test_sharded_merge_no_partial_export(tmp_path):
+    write_test_datasets(tmp_path)
+    candidates = load_candidates(str(tmp_path / "primary.csv"))
+    shard_path, export_path = str(tmp_path / "shards"), str(tmp_path / "output.csv")
+    for shard_id in range(2):
+        run_shard_matching(candidates, str(tmp_path / "secondary.csv"), shard_path, shard_id, 2)
+    # the last secondary name is missing from its shard results, the merge stops after its first chunks
+    for shard_id in range(2):
+        results_path = get_shard_file_paths(shard_path, shard_id, 2)[0]
+        shard_results = pd.read_parquet(results_path)
+        shard_results[shard_results["search_name_normalized"] != "micheal jackson"].to_parquet(results_path, index=False)
+    assert(merge_shard_results(str(tmp_path / "secondary.csv"), shard_path, export_path, 2, chunk_size=2) == {})
+    assert(sorted(path.name for path in tmp_path.iterdir()) == ["primary.csv", "secondary.csv", "shards"])
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from fuzzy_matcher.matcher.tfidf_index import (
+    fit_tfidf_index,
+    vectorize_queries,
+    load_or_build_tfidf_index,
+    process_top_k_tfidf_match,
+    process_best_tfidf_match,
+    process_best_rerank_match,
+)
+from fuzzy_matcher.matcher.match_datasets import process_best_fuzzy_match_streaming
+from fuzzy_matcher.pipelines.match_engine import (
+    run_matching_pipeline,
+    get_candidates,
+    get_batch_matcher_options,
+    match_preprocessed_records,
+)
+from fuzzy_matcher.matcher.match_datasets import preprocess_dataframe
+import fuzzy_matcher.matcher.tfidf_index as tfidf
+
+
+CANDIDATES = ["mike jackson", "james hetfield", "sting", "john lenon", "drake", "curtis jackson"]
+
+def test_tfidf_vectors_normalized():
+    tfidf_index = fit_tfidf_index(CANDIDATES)
+    norms = np.sqrt(tfidf_index["matrix"].multiply(tfidf_index["matrix"]).sum(axis=1)).A1
+    assert(np.allclose(norms, 1.0))
+    query_vectors = vectorize_queries(["mike jackson", "xq"], tfidf_index)
+    # same string gets the same vector, unknown n-grams are ignored
+    assert(np.allclose((query_vectors[0] - tfidf_index["matrix"][0]).toarray(), 0))
+    assert(query_vectors[1].nnz == 0)
+
+def test_tfidf_top_k_match():
+    tfidf_index = fit_tfidf_index(CANDIDATES)
+    matched_df = process_top_k_tfidf_match(["michael jackson", "xq"], tfidf_index, k=2, chunk_size=1)
+    assert(list(matched_df.columns) == ["string_to_match", "match_rank", "similarity_score", "matched_string", "match_index"])
+    assert(matched_df["matched_string"].iloc[:2].tolist() == ["mike jackson", "curtis jackson"])
+    assert(matched_df["match_rank"].tolist() == [1, 2, 1])
+    assert(matched_df["similarity_score"].iloc[0] > matched_df["similarity_score"].iloc[1])
+    assert(matched_df["match_index"].iloc[2] == -1)
+
+def test_tfidf_top_k_transposed_once():
+    tfidf_index = fit_tfidf_index(CANDIDATES)
+    transposed_matrix = tfidf_index["transposed_matrix"]
+    assert((transposed_matrix != tfidf_index["matrix"].T).nnz == 0)
+    # the scoring calls use the transposed matrix of the index, and never transpose the candidates again
+    tfidf_index["matrix"] = None
+    matched_df = process_top_k_tfidf_match(["michael jackson"], tfidf_index, k=1)
+    assert(matched_df["matched_string"].tolist() == ["mike jackson"])
+    assert(tfidf_index["transposed_matrix"] is transposed_matrix)
+
+def test_tfidf_best_match_cutoff():
+    tfidf_index = fit_tfidf_index(CANDIDATES)
+    matched_df = process_best_tfidf_match(["john lenon", "michael jackson"], tfidf_index, score_cutoff=99)
+    assert(list(matched_df.columns) == ["string_to_match", "similarity_score", "matched_string", "match_index"])
+    assert(matched_df["match_index"].tolist() == [3, -1])
+    assert(abs(matched_df["similarity_score"].iloc[0] - 100) < 1e-3)
+
+def test_tfidf_index_persisted(tmp_path):
+    index_path = str(tmp_path / "tfidf.npz")
+    tfidf_index = load_or_build_tfidf_index(CANDIDATES, index_path)
+    loaded_index = load_or_build_tfidf_index(CANDIDATES, index_path)
+    assert(loaded_index["fingerprint"] == tfidf_index["fingerprint"])
+    assert(list(loaded_index["candidates"]) == CANDIDATES)
+    assert((loaded_index["matrix"] != tfidf_index["matrix"]).nnz == 0)
+    assert((loaded_index["transposed_matrix"] != tfidf_index["matrix"].T).nnz == 0)
+    refitted_index = load_or_build_tfidf_index(CANDIDATES[:3], index_path)
+    assert(list(refitted_index["candidates"]) == CANDIDATES[:3])
+
+def test_tfidf_matching_pipeline():
+    primary_df = pd.DataFrame({"first_name": ["Michael", "John"], "last_name": ["Jackson", "Lenon"]})
+    secondary_df = pd.DataFrame({"first_name": ["Micheal", "John"], "last_name": ["Jackson", "Lenon"]})
+    final_df = run_matching_pipeline(primary_df, secondary_df, matcher="tfidf")
+    assert(final_df["mapping_source"].tolist() == ["fuzzy_matching_tfidf", "direct_join"])
+    assert(final_df["match_name_normalized"].iloc[0] == "michael jackson")
+
+def test_tfidf_index_fitted_once(monkeypatch):
+    primary_df = pd.DataFrame({"first_name": ["Michael", "John"], "last_name": ["Jackson", "Lenon"]})
+    secondary_df = preprocess_dataframe(pd.DataFrame({"first_name": ["Micheal", "Jon"], "last_name": ["Jackson", "Lenon"]}))
+    candidates = get_candidates(preprocess_dataframe(primary_df))
+    fits = []
+    monkeypatch.setattr(tfidf, "fit_tfidf_index", lambda *args: fits.append(args) or fit_tfidf_index(*args))
+    for matcher in ["tfidf", "rerank"]:
+        matcher_options = get_batch_matcher_options(matcher, candidates, {"ngram_size": 2})
+        assert(get_batch_matcher_options(matcher, candidates, matcher_options)["tfidf_index"] is matcher_options["tfidf_index"])
+        for _ in range(2):
+            final_df = match_preprocessed_records(secondary_df, candidates, matcher=matcher, matcher_options=matcher_options)
+            assert(final_df["match_name_normalized"].tolist() == ["michael jackson", "john lenon"])
+    assert(len(fits) == 2)
+    # the pipeline fits the model once for all its matcher calls
+    run_matching_pipeline(primary_df, secondary_df, matcher="tfidf")
+    assert(len(fits) == 3)
+
+def test_rerank_match_agrees_with_batch():
+    tfidf_index = fit_tfidf_index(CANDIDATES)
+    queries = ["jackson michael", "jon lennon", "drak", "xq"]
+    stats = {}
+    rerank_df = process_best_rerank_match(queries, tfidf_index, top_n=2, stats=stats)
+    batch_df = process_best_fuzzy_match_streaming(queries, CANDIDATES)
+    assert(list(rerank_df.columns) == list(batch_df.columns))
+    assert(rerank_df["match_index"].tolist() == batch_df["match_index"].tolist())
+    assert(np.allclose(rerank_df["similarity_score"], batch_df["similarity_score"]))
+    # only the retrieved candidates are reranked
+    assert(stats["candidates_scored"] <= 2 * len(queries))
@@ -0,0 +1,38 @@
+import pandas as pd
+from fuzzy_matcher.benchmark.benchmark_matchers import generate_benchmark_datasets
+from fuzzy_matcher.benchmark.tune_matchers import (
+    get_evaluation_queries,
+    run_tuning,
+    get_pareto_front,
+    get_cheapest_configuration,
+)
+
+
+def test_get_pareto_front():
+    report = pd.DataFrame({
+        "recall": [0.9, 0.8, 0.95, 0.8],
+        "queries_per_sec": [100.0, 200.0, 50.0, 150.0],
+    })
+    assert(get_pareto_front(report).tolist() == [True, True, True, False])
+
+def test_get_cheapest_configuration():
+    report = pd.DataFrame({
+        "strategy": ["batch", "indexed"],
+        "recall": [0.95, 0.85],
+        "queries_per_sec": [100.0, 500.0],
+    })
+    assert(get_cheapest_configuration(report, 0.9)["strategy"] == "batch")
+    assert(get_cheapest_configuration(report, 0.99) == {})
+
+def test_run_tuning(tmp_path):
+    names_df = pd.DataFrame({
+        "first_name": ["Michael", "Curtis", "Johnathan", "Mary"],
+        "last_name": ["Jackson", "Smithson", "Lenon", "Leeroy"]
+    })
+    primary_path, secondary_path = generate_benchmark_datasets(names_df, 4, 1.0, 3, str(tmp_path))
+    candidates, queries = get_evaluation_queries(primary_path, secondary_path)
+    assert(queries.shape[0] > 0)
+    assert(queries["expected_match"].isin(candidates["full_name_processed"]).all())
+    report = run_tuning(candidates, queries, [("batch", {"score_cutoff": 70}), ("indexed", {"min_shared_ratio": 0.5})])
+    assert(report.shape[0] == 2)
+    assert(report["recall"].between(0, 1).all())